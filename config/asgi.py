@@ -0,0 +1,21 @@
+"""
+ASGI config for klasse project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+for ASGI servers such as uvicorn or daphne:
+
+    uvicorn config.asgi:application
+"""
+
+import os
+
+from configurations.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("DJANGO_CONFIGURATION", "Production")
+
+wsgi_application = get_wsgi_application()
+
+from config.handlers import ASGIHandler  # noqa: E402 isort:skip
+
+application = ASGIHandler(wsgi_application)
@@ -0,0 +1,166 @@
+from collections import namedtuple
+
+from graphene.utils.str_converters import to_snake_case
+from graphql.error import GraphQLError
+from graphql.language import ast
+from graphql.type.definition import GraphQLList, GraphQLNonNull, get_named_type
+
+from django.conf import settings
+
+Complexity = namedtuple("Complexity", ("depth", "nodes", "cost"))
+
+# Estimated number of items of list fields without a multiplier annotation
+DEFAULT_MULTIPLIER = 10
+
+
+def get_field_cost(parent_type, name, field_type, selection_set):
+    """
+    Return the cost and the multiplier of a field, as annotated in the
+    ``field_costs`` of the Graphene type defining it.
+
+    By default scalar fields are free, object fields cost one and list fields
+    are expected to hold ``DEFAULT_MULTIPLIER`` items.
+    """
+    graphene_type = getattr(parent_type, "graphene_type", None)
+    annotation = getattr(graphene_type, "field_costs", {}).get(to_snake_case(name), {})
+
+    if isinstance(field_type, GraphQLNonNull):
+        field_type = field_type.of_type
+
+    is_list = isinstance(field_type, GraphQLList)
+
+    return (
+        annotation.get("cost", 1 if selection_set else 0),
+        annotation.get("multiplier", DEFAULT_MULTIPLIER if is_list else 1),
+    )
+
+
+class ComplexityAnalyzer(object):
+    """
+    Measure the depth, the number of fields and the cost of the operations of a
+    validated document, without executing them.
+
+    Fragments are measured once per type they are spread into, so documents
+    nesting fragments don't take exponential time to measure.
+    """
+
+    def __init__(self, schema, document_ast):
+        self.schema = schema
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document_ast.definitions
+            if isinstance(definition, ast.FragmentDefinition)
+        }
+        self._measured_fragments = {}
+
+    def get_root_type(self, operation):
+        return {
+            "query": self.schema.get_query_type,
+            "mutation": self.schema.get_mutation_type,
+            "subscription": self.schema.get_subscription_type,
+        }[operation]()
+
+    def get_fragment_type(self, fragment, parent_type):
+        if fragment.type_condition is None:
+            return parent_type
+
+        return self.schema.get_type(fragment.type_condition.name.value)
+
+    def measure_operation(self, operation):
+        return self.measure(
+            self.get_root_type(operation.operation), operation.selection_set
+        )
+
+    def measure(self, parent_type, selection_set):
+        depth = nodes = cost = 0
+
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                measured = self.measure_field(parent_type, selection)
+            elif isinstance(selection, ast.FragmentSpread):
+                measured = self.measure_fragment(parent_type, selection.name.value)
+            else:
+                measured = self.measure(
+                    self.get_fragment_type(selection, parent_type),
+                    selection.selection_set,
+                )
+
+            depth = max(depth, measured.depth)
+            nodes += measured.nodes
+            cost += measured.cost
+
+        return Complexity(depth, nodes, cost)
+
+    def measure_fragment(self, parent_type, name):
+        fragment = self.fragments[name]
+        fragment_type = self.get_fragment_type(fragment, parent_type)
+        key = (name, fragment_type.name)
+
+        if key not in self._measured_fragments:
+            self._measured_fragments[key] = self.measure(
+                fragment_type, fragment.selection_set
+            )
+
+        return self._measured_fragments[key]
+
+    def measure_field(self, parent_type, field):
+        name = field.name.value
+        field_def = getattr(parent_type, "fields", {}).get(name)
+
+        # Introspection and __typename are free
+        if field_def is None or name.startswith("__"):
+            return Complexity(0, 0, 0)
+
+        selections = Complexity(0, 0, 0)
+
+        if field.selection_set:
+            selections = self.measure(
+                get_named_type(field_def.type), field.selection_set
+            )
+
+        cost, multiplier = get_field_cost(
+            parent_type, name, field_def.type, field.selection_set
+        )
+
+        return Complexity(
+            selections.depth + 1,
+            selections.nodes + 1,
+            multiplier * (cost + selections.cost),
+        )
+
+
+def analyze(schema, document_ast):
+    """
+    Return the complexity of every operation of a validated document, keyed by
+    the operation name.
+    """
+    analyzer = ComplexityAnalyzer(schema, document_ast)
+    complexity = {}
+
+    for definition in document_ast.definitions:
+        if isinstance(definition, ast.OperationDefinition):
+            name = definition.name.value if definition.name else None
+            complexity[name] = analyzer.measure_operation(definition)
+
+    return complexity
+
+
+def get_complexity_errors(complexity):
+    """
+    Return an error for every limit of ``GRAPHQL_COMPLEXITY`` exceeded.
+    """
+    errors = []
+
+    for name, value in complexity._asdict().items():
+        limit = settings.GRAPHQL_COMPLEXITY["MAX_{}".format(name.upper())]
+
+        if limit is not None and value > limit:
+            errors.append(
+                GraphQLError(
+                    "Query {} of {} exceeds the maximum of {}".format(
+                        name, value, limit
+                    )
+                )
+            )
+
+    return errors
@@ -0,0 +1,197 @@
+"""
+PostgreSQL backend checking persistent connections before reusing them, and
+optionally sharing a pool of connections between the threads of a process.
+
+    DATABASES = {
+        "default": {
+            "ENGINE": "config.db",
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": True,
+            "POOL": {"MAX_SIZE": 10, "TIMEOUT": 30},
+            ...
+        }
+    }
+"""
+import os
+import queue
+import threading
+
+from psycopg2 import extensions
+
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool(object):
+    """
+    Connections shared by the threads of a process. At most ``max_size``
+    connections are checked out at once, threads wait up to ``timeout``
+    seconds for one to be returned. Idle connections failing ``check`` are
+    discarded instead of being handed out.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=30, check=None):
+        self.connect = connect
+        self.timeout = timeout
+        self.check = check
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def get(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError("Timed out waiting for a pooled database connection")
+
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    return self.connect()
+
+                if self.check is None or self.check(connection):
+                    return connection
+
+                connection.close()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def put(self, connection):
+        try:
+            if not connection.closed:
+                status = connection.get_transaction_status()
+
+                if status == extensions.TRANSACTION_STATUS_IDLE:
+                    self._idle.put(connection)
+                elif status != extensions.TRANSACTION_STATUS_UNKNOWN:
+                    connection.rollback()
+                    self._idle.put(connection)
+                else:
+                    connection.close()
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def is_usable(connection):
+    try:
+        connection.cursor().execute("SELECT 1")
+    except base.Database.Error:
+        return False
+    else:
+        return True
+
+
+def get_pool(alias, name, connect, max_size=10, timeout=30, check=False):
+    # Connections must not be shared with forked processes, nor outlive a
+    # change of database, as when tests create theirs
+    key = (os.getpid(), alias, name)
+
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                connect, max_size, timeout, is_usable if check else None
+            )
+
+        return _pools[key]
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get("CONN_HEALTH_CHECKS", False)
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get("POOL")
+
+        if not options:
+            return None
+
+        return get_pool(
+            self.alias,
+            self.settings_dict["NAME"],
+            self.connect_to_database,
+            check=self.health_check_enabled,
+            **{key.lower(): value for key, value in options.items()}
+        )
+
+    def connect_to_database(self):
+        return super(DatabaseWrapper, self).get_new_connection(
+            self.get_connection_params()
+        )
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+
+        if pool is None:
+            return super(DatabaseWrapper, self).get_new_connection(conn_params)
+
+        connection = pool.get()
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+
+        return connection
+
+    def connect(self):
+        super(DatabaseWrapper, self).connect()
+        # Fresh and pooled connections were just used
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        self.check_health()
+        super(DatabaseWrapper, self).ensure_connection()
+
+    def check_health(self):
+        """
+        Close a persistent connection once per request if it no longer
+        works, e.g. after the server restarted, rather than fail the first
+        query.
+        """
+        if (
+            self.connection is None
+            or self.health_check_done
+            or not self.health_check_enabled
+            or self.in_atomic_block
+        ):
+            return
+
+        if not self.is_usable():
+            self.close()
+
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super(DatabaseWrapper, self).close_if_unusable_or_obsolete()
+        # Called at the start and end of every request
+        self.health_check_done = False
+
+    def _close(self):
+        pool = self.pool
+
+        if pool is None:
+            return super(DatabaseWrapper, self)._close()
+
+        with self.wrap_database_errors:
+            pool.put(self.connection)
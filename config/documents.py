@@ -0,0 +1,122 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from graphql import Source, parse, validate
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .complexity import analyze
+from .response_cache import analyze_max_ages
+
+CompiledDocument = namedtuple(
+    "CompiledDocument",
+    ("document_ast", "errors", "complexity", "max_ages", "query_hash"),
+)
+
+DocumentCacheInfo = namedtuple(
+    "DocumentCacheInfo", ("hits", "misses", "evictions", "size", "max_entries")
+)
+
+
+def get_query_hash(query):
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+
+def compile_document(schema, query):
+    """
+    Parse, validate and measure a document. Syntax errors are raised, validation
+    errors are returned along with the document.
+    """
+    document_ast = parse(Source(query, name="GraphQL request"))
+    errors = validate(schema, document_ast)
+
+    if errors:
+        return CompiledDocument(document_ast, errors, {}, {}, get_query_hash(query))
+
+    return CompiledDocument(
+        document_ast,
+        errors,
+        analyze(schema, document_ast),
+        analyze_max_ages(schema, document_ast),
+        get_query_hash(query),
+    )
+
+
+class DocumentCache(object):
+    """
+    Thread-safe LRU of compiled documents keyed by the hash of their text.
+    """
+
+    def __init__(self, max_entries=500):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                document = self._documents[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._documents.move_to_end(key)
+            self.hits += 1
+
+            return document
+
+    def set(self, key, document):
+        with self._lock:
+            self._documents[key] = document
+            self._documents.move_to_end(key)
+
+            while len(self._documents) > self.max_entries:
+                self._documents.popitem(last=False)
+                self.evictions += 1
+
+        return document
+
+    def get_or_compile(self, schema, query):
+        key = get_query_hash(query)
+        document = self.get(key)
+
+        if document is None:
+            document = self.set(key, compile_document(schema, query))
+
+        return document
+
+    def info(self):
+        with self._lock:
+            return DocumentCacheInfo(
+                self.hits,
+                self.misses,
+                self.evictions,
+                len(self._documents),
+                self.max_entries,
+            )
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+@lru_cache(maxsize=None)
+def get_document_cache(schema):
+    """
+    Return the cache of ad-hoc documents validated against the given schema.
+    """
+    return DocumentCache(max_entries=settings.GRAPHQL_DOCUMENT_CACHE["MAX_ENTRIES"])
+
+
+@receiver(setting_changed)
+def reset_document_cache(setting, **kwargs):
+    if setting == "GRAPHQL_DOCUMENT_CACHE":
+        get_document_cache.cache_clear()
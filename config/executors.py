@@ -0,0 +1,170 @@
+import asyncio
+from functools import partial
+from inspect import isasyncgen
+
+from asgiref.sync import SyncToAsync
+from graphene.types.resolver import attr_resolver
+from graphql.execution import execute
+from graphql.execution.executors.asyncio import AsyncioExecutor
+from rx import Observable
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import close_old_connections
+from django.db.models import Manager, Model, QuerySet
+
+
+class DatabaseSyncToAsync(SyncToAsync):
+    """
+    Run a synchronous callable in the thread pool, closing the database
+    connections of the worker thread that are broken or past their lifetime
+    around the call, like the request signals do for WSGI workers.
+    """
+
+    def thread_handler(self, loop, *args, **kwargs):
+        close_old_connections()
+
+        try:
+            return super(DatabaseSyncToAsync, self).thread_handler(
+                loop, *args, **kwargs
+            )
+        finally:
+            close_old_connections()
+
+
+database_sync_to_async = DatabaseSyncToAsync
+
+
+def is_unloaded_relation(root, info):
+    """
+    Return whether a field reads a related object of a model instance that
+    isn't loaded yet, through the default resolver.
+    """
+    if not isinstance(root, Model):
+        return False
+
+    resolver = info.parent_type.fields[info.field_name].resolver
+
+    if not isinstance(resolver, partial) or resolver.func is not attr_resolver:
+        return False
+
+    try:
+        field = root._meta.get_field(resolver.args[0])
+    except FieldDoesNotExist:
+        return False
+
+    return (
+        field.name == resolver.args[0]
+        and (field.many_to_one or field.one_to_one)
+        and not field.is_cached(root)
+    )
+
+
+class DatabaseSyncToAsyncMiddleware(object):
+    """
+    Graphene middleware running the database queries of resolvers in the
+    thread pool, so the event loop stays free for other requests meanwhile.
+
+    Root fields, which load the objects of an operation along with whatever
+    the optimizer prefetches for it, and nested fields reading a related
+    object that isn't loaded yet resolve in the thread pool. Other nested
+    fields resolve on the event loop, and the querysets they return are
+    evaluated in the thread pool. Nested resolvers must not query the
+    database themselves: they return querysets or load through DataLoaders,
+    whose batches run in the thread pool, see ``klasse.users.loaders``.
+
+    ``run`` wraps callables to run in the thread pool, returning a callable
+    returning an awaitable, as ``database_sync_to_async`` does.
+    """
+
+    def __init__(self, run=database_sync_to_async):
+        self.run = run
+
+    def evaluate(self, value):
+        """
+        Evaluate an unevaluated queryset in the thread pool, returning an
+        awaitable of its objects. Other values are returned as is.
+        """
+        if isinstance(value, Manager):
+            value = value.all()
+
+        if isinstance(value, QuerySet) and value._result_cache is None:
+            return self.run(list)(value)
+
+        return value
+
+    def resolve(self, next, root, info, **args):
+        schema = info.schema
+
+        if info.parent_type in (
+            schema.get_query_type(),
+            schema.get_mutation_type(),
+        ) or is_unloaded_relation(root, info):
+            return self.run(lambda: next(root, info, **args).get())()
+
+        return next(root, info, **args).then(self.evaluate)
+
+
+class ObservableAsyncioExecutor(AsyncioExecutor):
+    """
+    Asyncio executor turning the async generators returned by subscription
+    resolvers into observables with ``to_observable``.
+    """
+
+    def execute(self, fn, *args, **kwargs):
+        result = fn(*args, **kwargs)
+
+        if isasyncgen(result):
+            return to_observable(result)
+
+        return super(ObservableAsyncioExecutor, self).execute(lambda: result)
+
+
+async def execute_async(schema, document_ast, **options):
+    """
+    Execute a validated document with the asyncio executor and return its
+    result, without blocking the event loop on resolvers returning awaitables.
+    """
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+
+    promise = execute(
+        schema,
+        document_ast,
+        executor=ObservableAsyncioExecutor(loop),
+        return_promise=True,
+        **options
+    )
+    promise.then(future.set_result, future.set_exception)
+
+    return await future
+
+
+async def iterate(asyncgen, observer):
+    loop = asyncio.get_event_loop()
+
+    # The end is notified once the iteration is done, so observers disposing
+    # of the subscription as they are notified don't cancel it
+    try:
+        async for item in asyncgen:
+            observer.on_next(item)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        loop.call_soon(observer.on_error, e)
+    else:
+        loop.call_soon(observer.on_completed)
+
+
+def to_observable(asyncgen):
+    """
+    Return an observable of the items of an async generator returned by a
+    subscription resolver. Disposing of the subscription cancels the
+    iteration, closing the generator at the ``await`` it is suspended on.
+    """
+
+    def subscribe(observer):
+        task = asyncio.ensure_future(iterate(asyncgen, observer))
+
+        return lambda: task.done() or task.cancel()
+
+    return Observable.create(subscribe)
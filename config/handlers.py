@@ -0,0 +1,282 @@
+import io
+import sys
+
+from asgiref.wsgi import WsgiToAsgi
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import reverse
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+
+from .executors import database_sync_to_async
+from .subscriptions import SubscriptionConnection
+from .views import AsyncGraphQLView
+
+
+def get_environ(scope, body):
+    """
+    Return the WSGI environ of an HTTP or WebSocket connection scope, with the
+    whole body of the request.
+    """
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        # Native strings hold the bytes of the path as latin-1 under WSGI
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("ascii"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": "HTTP/{}".format(scope["http_version"]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+
+        if name not in ("CONTENT_LENGTH", "CONTENT_TYPE"):
+            name = "HTTP_{}".format(name)
+
+        value = value.decode("latin1")
+
+        # Repeated headers are joined, as HTTP servers do for WSGI
+        if name in environ:
+            value = "{},{}".format(environ[name], value)
+
+        environ[name] = value
+
+    # The body was read whole, chunked requests included
+    environ["CONTENT_LENGTH"] = str(len(body))
+
+    return environ
+
+
+def get_request(scope, body):
+    request = WSGIRequest(get_environ(scope, body))
+    # Runs blocking callables, database queries included, in the thread pool
+    request.run = database_sync_to_async
+
+    return request
+
+
+async def send_response(send, response):
+    headers = [
+        (name.encode("latin1"), value.encode("latin1"))
+        for name, value in response.items()
+    ]
+    headers.extend(
+        (b"Set-Cookie", cookie.output(header="").strip().encode("latin1"))
+        for cookie in response.cookies.values()
+    )
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": headers,
+        }
+    )
+    await send({"type": "http.response.body", "body": response.content})
+
+
+def convert_exception_to_response(get_response):
+    """
+    Wrap an asynchronous ``get_response()``, turning its exceptions into
+    responses as Django does for every middleware.
+    """
+
+    async def inner(request):
+        try:
+            return await get_response(request)
+        except Exception as exc:
+            return response_for_exception(request, exc)
+
+    return inner
+
+
+class MiddlewareMixinAdapter(object):
+    """
+    Run the ``process_request()`` and ``process_response()`` hooks of an old
+    style middleware around an asynchronous ``get_response()``. The hooks run
+    on the event loop, so they must not block.
+    """
+
+    def __init__(self, middleware, get_response):
+        self.middleware = middleware()
+        self.get_response = get_response
+
+    async def __call__(self, request):
+        response = None
+
+        if hasattr(self.middleware, "process_request"):
+            response = self.middleware.process_request(request)
+
+        if response is None:
+            response = await self.get_response(request)
+
+        if hasattr(self.middleware, "process_response"):
+            response = self.middleware.process_response(request, response)
+
+        return response
+
+
+class GraphQLHandler(object):
+    """
+    ASGI application serving the GraphQL endpoint with ``AsyncGraphQLView``,
+    through the ``MIDDLEWARE`` of the project.
+
+    Middleware declaring ``async_capable`` wrap the view as they are, others
+    must be ``MiddlewareMixin`` subclasses, whose hooks are run around it.
+    """
+
+    def __init__(self):
+        self.view = AsyncGraphQLView()
+        # As routed by config.urls
+        self.callback = csrf_exempt(self.view.dispatch_async)
+        self.view_middleware = []
+        self.get_response = self.load_middleware()
+
+    def load_middleware(self):
+        get_response = convert_exception_to_response(self.get_view_response)
+
+        for middleware_path in reversed(settings.MIDDLEWARE):
+            middleware = import_string(middleware_path)
+
+            try:
+                if getattr(middleware, "async_capable", False):
+                    instance = middleware(get_response)
+                elif issubclass(middleware, MiddlewareMixin):
+                    instance = MiddlewareMixinAdapter(middleware, get_response)
+                else:
+                    raise ImproperlyConfigured(
+                        "Middleware {} can't run around the asynchronous GraphQL "
+                        "view, make it a MiddlewareMixin".format(middleware_path)
+                    )
+            except MiddlewareNotUsed:
+                continue
+
+            if hasattr(instance, "middleware") and hasattr(
+                instance.middleware, "process_view"
+            ):
+                self.view_middleware.insert(0, instance.middleware.process_view)
+
+            get_response = convert_exception_to_response(instance)
+
+        return get_response
+
+    async def get_view_response(self, request):
+        for process_view in self.view_middleware:
+            response = process_view(request, self.callback, (), {})
+
+            if response is not None:
+                return response
+
+        return await self.callback(request)
+
+    def __call__(self, scope):
+        async def instance(receive, send):
+            await self.handle(scope, receive, send)
+
+        return instance
+
+    async def handle(self, scope, receive, send):
+        body = b""
+
+        while True:
+            message = await receive()
+
+            if message["type"] == "http.disconnect":
+                return
+
+            body += message.get("body", b"")
+
+            if not message.get("more_body"):
+                break
+
+        response = await self.get_response(get_request(scope, body))
+
+        await send_response(send, response)
+
+
+class SubscriptionHandler(object):
+    """
+    ASGI application serving GraphQL operations, subscriptions included, over
+    WebSocket connections speaking the graphql-ws protocol.
+    """
+
+    subprotocol = "graphql-ws"
+
+    def __init__(self):
+        self.schema = AsyncGraphQLView().schema
+
+    def __call__(self, scope):
+        async def instance(receive, send):
+            await self.handle(scope, receive, send)
+
+        return instance
+
+    async def handle(self, scope, receive, send):
+        message = await receive()
+
+        if message["type"] != "websocket.connect":
+            return
+
+        if self.subprotocol not in scope.get("subprotocols", [self.subprotocol]):
+            await send({"type": "websocket.close", "code": 1002})
+            return
+
+        await send({"type": "websocket.accept", "subprotocol": self.subprotocol})
+
+        # WebSocket handshakes are GET requests
+        request = get_request(dict(scope, method="GET", http_version="1.1"), b"")
+        connection = SubscriptionConnection(self.schema, request, send)
+
+        try:
+            while True:
+                message = await receive()
+
+                if message["type"] == "websocket.disconnect":
+                    break
+
+                if not await connection.receive(message.get("text")):
+                    await send({"type": "websocket.close", "code": 1000})
+                    break
+        finally:
+            connection.close()
+
+
+class ASGIHandler(object):
+    """
+    ASGI application serving GraphQL requests asynchronously, subscriptions
+    over WebSocket, and all other requests with the WSGI application in the
+    thread pool.
+    """
+
+    def __init__(self, wsgi_application):
+        self.graphql = GraphQLHandler()
+        self.subscriptions = SubscriptionHandler()
+        self.wsgi = WsgiToAsgi(wsgi_application)
+        self.graphql_path = reverse("graphql")
+
+    def __call__(self, scope):
+        if scope["path"] == self.graphql_path:
+            if scope["type"] == "http":
+                return self.graphql(scope)
+
+            if scope["type"] == "websocket":
+                return self.subscriptions(scope)
+
+        return self.wsgi(scope)
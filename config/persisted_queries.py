@@ -0,0 +1,114 @@
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .documents import DocumentCache, compile_document, get_query_hash
+
+
+class PersistedQueryStore(object):
+    """
+    Parsed and validated documents keyed by the SHA-256 hash of their text.
+
+    Documents from the manifest are kept for the lifetime of the process, while
+    automatically registered ones are bounded by ``max_entries`` and shared with
+    other workers through the Django cache for ``timeout`` seconds. Documents
+    longer than ``max_query_length`` characters are executed but not stored.
+    """
+
+    def __init__(
+        self,
+        schema,
+        documents=None,
+        cache_alias="default",
+        max_entries=1000,
+        timeout=86400,
+        max_query_length=10000,
+    ):
+        self.schema = schema
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        self.max_query_length = max_query_length
+        self._manifest = {}
+        self._registered = DocumentCache(max_entries=max_entries)
+
+        for query_hash, query in (documents or {}).items():
+            if get_query_hash(query) != query_hash:
+                raise ValueError(
+                    "Hash mismatch for persisted query {}".format(query_hash)
+                )
+
+            self._manifest[query_hash] = compile_document(schema, query)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def make_key(self, query_hash):
+        return "persisted-query:{}".format(query_hash)
+
+    def get(self, query_hash):
+        """
+        Return the compiled document for a hash, or ``None`` when it is unknown.
+        """
+        if query_hash in self._manifest:
+            return self._manifest[query_hash]
+
+        document = self._registered.get(query_hash)
+
+        if document is not None:
+            return document
+
+        query = self.cache.get(self.make_key(query_hash))
+
+        if query is None:
+            return None
+
+        return self._registered.set(query_hash, compile_document(self.schema, query))
+
+    def register(self, query_hash, query):
+        """
+        Compile and store a document sent along with its hash. Documents that
+        don't match their hash, fail validation or are too long are not stored.
+        """
+        if get_query_hash(query) != query_hash:
+            raise ValueError("Provided sha256Hash does not match query")
+
+        document = compile_document(self.schema, query)
+
+        if not document.errors and len(query) <= self.max_query_length:
+            self.cache.set(self.make_key(query_hash), query, self.timeout)
+            self._registered.set(query_hash, document)
+
+        return document
+
+
+def load_documents(path):
+    if not path:
+        return {}
+
+    with open(path) as manifest:
+        return json.load(manifest)
+
+
+@lru_cache(maxsize=None)
+def get_persisted_query_store(schema):
+    config = settings.GRAPHQL_PERSISTED_QUERIES
+
+    return PersistedQueryStore(
+        schema,
+        documents=load_documents(config["DOCUMENTS"]),
+        cache_alias=config["CACHE_ALIAS"],
+        max_entries=config["MAX_ENTRIES"],
+        timeout=config["TIMEOUT"],
+        max_query_length=config["MAX_QUERY_LENGTH"],
+    )
+
+
+@receiver(setting_changed)
+def reset_persisted_query_store(setting, **kwargs):
+    if setting == "GRAPHQL_PERSISTED_QUERIES":
+        get_persisted_query_store.cache_clear()
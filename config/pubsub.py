@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from klasse.users.events import message_published
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription(object):
+    """
+    Messages published on a channel, iterated asynchronously on the event loop
+    that subscribed. When the subscriber falls ``max_queue_size`` messages
+    behind, new messages are dropped.
+    """
+
+    def __init__(self, broker, channel, loop, max_queue_size=0):
+        self.broker = broker
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning(
+                "Dropped a message on %s for a slow subscriber", self.channel
+            )
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker(object):
+    """
+    Publish messages to the subscribers of the current process. Messages can
+    be published from any thread, and are handed to every event loop with
+    subscribers on the channel in a single callback. Messages published by
+    other processes, WSGI workers included, never reach them.
+    """
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscriptions = defaultdict(lambda: defaultdict(set))
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        loop = asyncio.get_event_loop()
+        subscription = Subscription(self, channel, loop, self.max_queue_size)
+
+        with self._lock:
+            if channel not in self._subscriptions:
+                self.add_channel(channel)
+
+            self._subscriptions[channel][loop].add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            loops = self._subscriptions.get(subscription.channel, {})
+            subscriptions = loops.get(subscription.loop, set())
+            subscriptions.discard(subscription)
+
+            if not subscriptions:
+                loops.pop(subscription.loop, None)
+
+            if not loops and subscription.channel in self._subscriptions:
+                del self._subscriptions[subscription.channel]
+                self.remove_channel(subscription.channel)
+
+    def add_channel(self, channel):
+        """
+        Called with the lock held when a channel gets its first subscriber.
+        """
+
+    def remove_channel(self, channel):
+        """
+        Called with the lock held when a channel loses its last subscriber.
+        """
+
+    def publish(self, channel, message):
+        with self._lock:
+            loops = [
+                (loop, list(subscriptions))
+                for loop, subscriptions in self._subscriptions.get(channel, {}).items()
+            ]
+
+        for loop, subscriptions in loops:
+            if loop.is_closed():
+                continue
+
+            loop.call_soon_threadsafe(self.deliver, subscriptions, message)
+
+    @staticmethod
+    def deliver(subscriptions, message):
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def count(self, channel):
+        with self._lock:
+            return sum(map(len, self._subscriptions.get(channel, {}).values()))
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publish JSON messages through the pub/sub channels of a server speaking
+    the Redis protocol, reaching the subscribers of every process. A thread of
+    each process listens to the channels its local subscribers are on and
+    hands them the messages, reconnecting ``retry_delay`` seconds after losing
+    the connection. Messages published in between are lost. Requires the
+    ``redis`` package.
+    """
+
+    def __init__(
+        self,
+        url="redis://localhost:6379/0",
+        key_prefix="pubsub",
+        max_queue_size=100,
+        retry_delay=1,
+    ):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisBroker requires the redis package")
+
+        super(RedisBroker, self).__init__(max_queue_size)
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+        self.retry_delay = retry_delay
+        self._listener = None
+        self._pubsub = None
+
+    def make_channel(self, channel):
+        return "{}:{}".format(self.key_prefix, channel)
+
+    def subscribe(self, channel):
+        with self._lock:
+            # Started again if it ever died, e.g. killed by a fork
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self.run, daemon=True)
+                self._listener.start()
+
+        return super(RedisBroker, self).subscribe(channel)
+
+    def run(self):
+        while True:
+            try:
+                self.listen()
+            except Exception:
+                logger.exception(
+                    "Lost the connection to the broker, reconnecting in %s seconds",
+                    self.retry_delay,
+                )
+
+            time.sleep(self.retry_delay)
+
+    def add_channel(self, channel):
+        # Subscribed again by the listener once it has reconnected
+        if self._pubsub is not None:
+            try:
+                self._pubsub.subscribe(self.make_channel(channel))
+            except Exception:
+                logger.exception("Subscribing to %s failed", channel)
+
+    def remove_channel(self, channel):
+        if self._pubsub is not None:
+            try:
+                self._pubsub.unsubscribe(self.make_channel(channel))
+            except Exception:
+                logger.exception("Unsubscribing from %s failed", channel)
+
+    def listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        prefix_length = len(self.make_channel(""))
+
+        try:
+            with self._lock:
+                # The prefix alone is never published to, and keeps the
+                # connection listening while no channel has subscribers
+                pubsub.subscribe(
+                    self.make_channel(""),
+                    *[self.make_channel(channel) for channel in self._subscriptions]
+                )
+                self._pubsub = pubsub
+
+            for message in pubsub.listen():
+                channel = message["channel"].decode("utf-8")[prefix_length:]
+                super(RedisBroker, self).publish(channel, json.loads(message["data"]))
+        finally:
+            with self._lock:
+                self._pubsub = None
+
+            pubsub.close()
+
+    def publish(self, channel, message):
+        self.client.publish(self.make_channel(channel), json.dumps(message))
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    config = settings.GRAPHQL_SUBSCRIPTIONS
+    backend = import_string(config["BROKER"])
+    options = {key.lower(): value for key, value in config.get("OPTIONS", {}).items()}
+
+    return backend(**options)
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    if setting == "GRAPHQL_SUBSCRIPTIONS":
+        get_broker.cache_clear()
+
+
+@receiver(message_published)
+def publish_message(channel, message, **kwargs):
+    get_broker().publish(channel, message)
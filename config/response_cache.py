@@ -0,0 +1,185 @@
+"""
+Whole-response cache of GraphQL queries.
+
+Responses are cached per document, operation, variables and viewer, for the
+shortest ``field_max_ages`` of the fields they select. Keys carry the
+generation of the viewer in the user cache, so saving or deleting the viewer
+invalidates them.
+"""
+import hashlib
+import json
+from collections import namedtuple
+
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import ast
+from graphql.type.definition import get_named_type
+from graphql.utils.get_operation_ast import get_operation_ast
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.encoding import force_bytes
+from django.utils.http import parse_etags, quote_etag
+
+from klasse.users.caching import get_generation
+
+from .complexity import ComplexityAnalyzer
+
+# Max age of fields without an annotation: not cached
+DEFAULT_MAX_AGE = 0
+
+CachePolicy = namedtuple("CachePolicy", ("key", "max_age"))
+
+CachedResponse = namedtuple("CachedResponse", ("etag", "content"))
+
+
+def get_field_max_age(parent_type, name):
+    """
+    Return the seconds a field may be cached for, as annotated in the
+    ``field_max_ages`` of the Graphene type defining it.
+    """
+    graphene_type = getattr(parent_type, "graphene_type", None)
+
+    return getattr(graphene_type, "field_max_ages", {}).get(
+        to_snake_case(name), DEFAULT_MAX_AGE
+    )
+
+
+def min_max_age(*max_ages):
+    max_ages = [max_age for max_age in max_ages if max_age is not None]
+
+    return min(max_ages) if max_ages else None
+
+
+class MaxAgeAnalyzer(ComplexityAnalyzer):
+    """
+    Measure the max age of the operations of a validated document: the
+    shortest of its fields, or ``None`` when no field bounds it.
+    """
+
+    def measure(self, parent_type, selection_set):
+        max_age = None
+
+        for selection in selection_set.selections:
+            if isinstance(selection, ast.Field):
+                measured = self.measure_field(parent_type, selection)
+            elif isinstance(selection, ast.FragmentSpread):
+                measured = self.measure_fragment(parent_type, selection.name.value)
+            else:
+                measured = self.measure(
+                    self.get_fragment_type(selection, parent_type),
+                    selection.selection_set,
+                )
+
+            max_age = min_max_age(max_age, measured)
+
+        return max_age
+
+    def measure_field(self, parent_type, field):
+        name = field.name.value
+        field_def = getattr(parent_type, "fields", {}).get(name)
+
+        # Introspection and __typename don't depend on the data
+        if field_def is None:
+            return None
+
+        max_age = get_field_max_age(parent_type, name)
+
+        if field.selection_set:
+            max_age = min_max_age(
+                max_age,
+                self.measure(get_named_type(field_def.type), field.selection_set),
+            )
+
+        return max_age
+
+
+def analyze_max_ages(schema, document_ast):
+    """
+    Return the max age of every operation of a validated document, keyed by
+    the operation name.
+    """
+    analyzer = MaxAgeAnalyzer(schema, document_ast)
+    max_ages = {}
+
+    for definition in document_ast.definitions:
+        if isinstance(definition, ast.OperationDefinition):
+            name = definition.name.value if definition.name else None
+            max_ages[name] = analyzer.measure_operation(definition)
+
+    return max_ages
+
+
+def get_cache():
+    return caches[settings.GRAPHQL_RESPONSE_CACHE["CACHE_ALIAS"]]
+
+
+def get_cache_policy(request, document, operation_name, variables):
+    """
+    Return the cache policy of an operation, or ``None`` when its response is
+    not cached. Only queries are cached.
+    """
+    if not settings.GRAPHQL_RESPONSE_CACHE["ENABLED"]:
+        return None
+
+    operation_ast = get_operation_ast(document.document_ast, operation_name)
+
+    if operation_ast is None or operation_ast.operation != "query":
+        return None
+
+    name = operation_ast.name.value if operation_ast.name else None
+    max_age = document.max_ages[name]
+
+    if not max_age:
+        return None
+
+    user_id = generation = None
+
+    if request.user.is_authenticated:
+        user_id = str(request.user.pk)
+        generation = get_generation(request.user.pk)
+
+    key = json.dumps(
+        [document.query_hash, name, variables, user_id, generation],
+        sort_keys=True,
+        cls=DjangoJSONEncoder,
+    )
+
+    return CachePolicy(
+        "graphql:response:{}".format(hashlib.sha256(force_bytes(key)).hexdigest()),
+        max_age,
+    )
+
+
+def get_cached_response(policy):
+    return get_cache().get(policy.key)
+
+
+def set_cached_response(policy, content):
+    cached_response = CachedResponse(
+        quote_etag(hashlib.sha1(force_bytes(content)).hexdigest()), content
+    )
+    get_cache().set(policy.key, cached_response, policy.max_age)
+
+    return cached_response
+
+
+def patch_response(request, response, cached_response):
+    """
+    Add the ETag of a cached response, and replace it with a 304 when a GET
+    request already has it. Clients revalidate every time, so they see the
+    writes invalidating the cache.
+    """
+    if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+
+    if request.method == "GET" and cached_response.etag in if_none_match:
+        response.status_code = 304
+        response.content = b""
+        del response["Content-Type"]
+
+    response["ETag"] = cached_response.etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Authorization"])
+
+    return response
@@ -0,0 +1,155 @@
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from jwt import InvalidTokenError
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from klasse.users.middleware import get_jwt_token
+from klasse.users.utils import jwt_decode_handler
+
+from .executors import database_sync_to_async
+
+_state = threading.local()
+
+
+def get_read_database():
+    return getattr(_state, "database", None)
+
+
+@contextmanager
+def read_from(database):
+    """
+    Send the reads of the current thread within the block to ``database``,
+    or to the primary when it is ``None``.
+    """
+    previous = get_read_database()
+    _state.database = database
+
+    try:
+        yield
+    finally:
+        _state.database = previous
+
+
+def reading_from(database, func):
+    """
+    Wrap a callable so its reads go to ``database``, in whichever thread it is
+    called.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with read_from(database):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def reading_sync_to_async(database):
+    """
+    Return a ``database_sync_to_async`` sending the reads of the callables it
+    runs in the thread pool to ``database``, for every resolver and DataLoader
+    batch of an operation.
+    """
+    return lambda func: database_sync_to_async(reading_from(database, func))
+
+
+class ReplicaRouter(object):
+    """
+    Database router sending reads to the replica chosen for the current
+    GraphQL operation, see ``route_operation()``, and everything else to the
+    primary database. Replicas are never migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        return get_read_database() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = [DEFAULT_DB_ALIAS] + settings.DATABASE_ROUTING["REPLICAS"]
+
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_ROUTING["REPLICAS"]:
+            return False
+
+        return None
+
+
+def get_subject(request):
+    token = get_jwt_token(request)
+
+    if not token:
+        return None
+
+    try:
+        return str(jwt_decode_handler(token)["user_id"])
+    except (InvalidTokenError, KeyError):
+        return None
+
+
+def get_pin_key(subject):
+    return "routing:primary:{}".format(subject)
+
+
+def get_replica(request, operation):
+    """
+    Return the replica to read a GraphQL operation from, or ``None`` for the
+    primary. Only queries go to replicas, unless the subject of the request
+    ran a mutation within the read-your-writes window.
+    """
+    config = settings.DATABASE_ROUTING
+
+    if operation != "query" or not config["REPLICAS"]:
+        return None
+
+    subject = get_subject(request)
+    cache = caches[config["CACHE_ALIAS"]]
+
+    if subject is not None and cache.get(get_pin_key(subject)):
+        return None
+
+    # Spreads the load, no security implications
+    return random.choice(config["REPLICAS"])  # nosec
+
+
+def pin_to_primary(request):
+    """
+    Read the queries of the subject of the request from the primary for the
+    read-your-writes window, so they see what its mutations wrote.
+    """
+    config = settings.DATABASE_ROUTING
+
+    if not config["REPLICAS"] or not config["READ_YOUR_WRITES"]:
+        return
+
+    subject = get_subject(request)
+
+    if subject is not None:
+        caches[config["CACHE_ALIAS"]].set(
+            get_pin_key(subject), True, config["READ_YOUR_WRITES"]
+        )
+
+
+@contextmanager
+def route_operation(request, operation):
+    """
+    Route the reads of a GraphQL operation executed within the block.
+    """
+    with read_from(get_replica(request, operation)):
+        try:
+            yield
+        finally:
+            if operation == "mutation":
+                pin_to_primary(request)
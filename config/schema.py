@@ -2,17 +2,21 @@ import graphene
 from graphene_django.debug import DjangoDebug
 
 from klasse.users.mutations import UserMutation
-from klasse.users.schema import UserType
+from klasse.users.optimizer import optimize_instance
+from klasse.users.schema import UserQuery, UserSubscription, UserType
 
 
-class Query(graphene.ObjectType):
+class Query(UserQuery, graphene.ObjectType):
     viewer = graphene.Field(UserType)
     debug = graphene.Field(DjangoDebug, name="__debug")
 
+    # The viewer's fields set how long it is cached, see config.response_cache
+    field_max_ages = {"viewer": 60}
+
     @staticmethod
     def resolve_viewer(cls, info):
         if info.context.user.is_authenticated:
-            return info.context.user
+            return optimize_instance(info.context.user, info)
 
         return None
 
@@ -21,4 +25,8 @@ class Mutation(UserMutation, graphene.ObjectType):
     pass
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+class Subscription(UserSubscription, graphene.ObjectType):
+    pass
+
+
+schema = graphene.Schema(query=Query, mutation=Mutation, subscription=Subscription)
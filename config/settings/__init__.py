@@ -1,2 +1,3 @@
 from .local import *  # noqa
+from .production import *  # noqa
 from .test import *  # noqa
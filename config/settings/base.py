@@ -63,6 +63,85 @@ class Base(Configuration):
         }
     }
 
+    # Cache
+    # https://docs.djangoproject.com/en/1.11/topics/cache/
+    # In-process by default, so only for a single worker. Production uses
+    # memcached, shared by all workers, so invalidations and other shared state
+    # reach them all.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "klasse",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+    # Reads of GraphQL queries go to one of the REPLICAS database aliases, all
+    # other traffic to the default database. After a mutation, the queries of
+    # the same JWT subject read from the default database for READ_YOUR_WRITES
+    # seconds, longer than the replication lag. The window is shared through
+    # CACHE_ALIAS; use a cache shared by all workers.
+    DATABASE_ROUTERS = ["config.routers.ReplicaRouter"]
+
+    DATABASE_ROUTING = {"REPLICAS": [], "READ_YOUR_WRITES": 5, "CACHE_ALIAS": "default"}
+
+    # Authentication
+    # https://docs.djangoproject.com/en/1.11/topics/auth/customizing/#specifying-authentication-backends
+
+    AUTHENTICATION_BACKENDS = ["klasse.users.backends.ModelBackend"]
+
+    # Password hashing
+    # https://docs.djangoproject.com/en/1.11/topics/auth/passwords/#how-django-stores-passwords
+    # New hashes use the first hasher, replacing Django's PBKDF2 one under the same
+    # algorithm name. The others still verify, and upgrade, existing hashes.
+
+    PASSWORD_HASHERS = [
+        "klasse.users.hashers.BudgetedPBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+        "django.contrib.auth.hashers.Argon2PasswordHasher",
+        "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+        "django.contrib.auth.hashers.BCryptPasswordHasher",
+    ]
+
+    # Passwords are hashed by a pool of WORKERS processes, 0 hashes in the request
+    # thread, which waits for the hash either way. When MAX_PENDING hashes are
+    # queued or running, requests wait up to TIMEOUT seconds for a slot before
+    # they are rejected.
+    # The PBKDF2 iterations are calibrated to take TARGET_MS on this machine, but
+    # never fall below MIN_ITERATIONS. Stored hashes more than TOLERANCE off the
+    # target are re-hashed on login.
+    PASSWORD_HASHING = {
+        "WORKERS": os.cpu_count() or 1,
+        "MAX_PENDING": 32,
+        "TIMEOUT": 5,
+        "TARGET_MS": 100,
+        "TOLERANCE": 0.25,
+        "MIN_ITERATIONS": 100000,
+    }
+
+    # Throttling
+    # Login, registration and password reset attempts are counted in sliding
+    # windows per client IP and per email address, and rejected before any
+    # password is hashed once a rate is exceeded. Rates are "<count>/<s|m|h|d>".
+    # Counters are kept in-process by klasse.users.throttling.LocalThrottleStore,
+    # shared through CACHES by DjangoThrottleStore, or kept in a Redis protocol
+    # server by RedisThrottleStore (OPTIONS: URL).
+    # Client IPs are read from REMOTE_ADDR, or behind TRUSTED_PROXIES reverse
+    # proxies from the CLIENT_IP_HEADER they append to, e.g.
+    # "HTTP_X_FORWARDED_FOR". Only set it when every request passes them.
+    THROTTLING = {
+        "STORE": "klasse.users.throttling.LocalThrottleStore",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+        "CLIENT_IP_HEADER": None,
+        "TRUSTED_PROXIES": 1,
+        "RATES": {
+            "login": {"ip": "30/m", "email": "5/m"},
+            "register": {"ip": "10/h"},
+            "password_reset": {"ip": "10/h", "email": "3/h"},
+        },
+    }
+
     # Password validation
     # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -111,7 +190,145 @@ class Base(Configuration):
 
     AUTH_USER_MODEL = "users.User"
 
+    # Email outbox
+    # Emails are queued in the database by the mutations and sent in batches by
+    # `manage.py send_queued_emails`, or by a background thread when WORKER is
+    # "thread". Failed emails are retried after RETRY_DELAY seconds, doubling on
+    # every attempt, up to MAX_ATTEMPTS.
+    EMAIL_OUTBOX = {
+        "WORKER": None,
+        "BATCH_SIZE": 100,
+        "MAX_ATTEMPTS": 5,
+        "RETRY_DELAY": 60,
+        "POLL_INTERVAL": 30,
+    }
+
+    # User export
+    # Exports stream users from the database CHUNK_SIZE rows at a time.
+    USER_EXPORT = {"CHUNK_SIZE": 2000}
+
+    # JWT token cache
+    # Verified tokens are cached as user snapshots, so authenticated requests skip
+    # the user lookup. klasse.users.tokens.DjangoTokenCache shares entries and
+    # their invalidations through CACHES (OPTIONS: ALIAS, KEY_PREFIX).
+    # LocalTokenCache (OPTIONS: MAX_ENTRIES) keeps them in-process, so only use
+    # it with a single worker process. Set BACKEND to None to disable the cache.
+    JWT_TOKEN_CACHE = {
+        "BACKEND": "klasse.users.tokens.DjangoTokenCache",
+        "TIMEOUT": 300,
+        "OPTIONS": {"ALIAS": "default"},
+    }
+
+    # User cache
+    # Users read by id or email, as when authenticating requests, are cached in
+    # CACHE_ALIAS for TIMEOUT seconds. Saving or deleting a user invalidates its
+    # entries. Keys carry VERSION: bump it when the cached fields change. A miss
+    # is loaded from the database by a single worker while the others wait for
+    # its result, for up to LOCK_TIMEOUT seconds.
+    USER_CACHE = {
+        "ENABLED": True,
+        "CACHE_ALIAS": "default",
+        "TIMEOUT": 300,
+        "VERSION": 1,
+        "LOCK_TIMEOUT": 5,
+    }
+
+    # Claims user
+    # When ENABLED, tokens carry the user id, is_active, is_staff and the user's
+    # token version as claims, and requests are authenticated from them without
+    # loading the user. Tokens are revoked by bumping the version, which is
+    # cached for TIMEOUT seconds in CACHE_ALIAS; use a cache shared by all workers.
+    JWT_CLAIMS_USER = {"ENABLED": False, "CACHE_ALIAS": "default", "TIMEOUT": 300}
+
+    # Refresh tokens
+    # Refresh tokens are valid for LIFETIME seconds. Expired tokens are deleted
+    # PURGE_BATCH_SIZE rows at a time by the purge_refresh_tokens command.
+    REFRESH_TOKENS = {"LIFETIME": 60 * 60 * 24 * 14, "PURGE_BATCH_SIZE": 1000}
+
+    # JWT signing keys
+    # Tokens are signed with the private key of SIGNING_KEY and carry its KID in
+    # their header; they are verified with the public key of the KID they carry.
+    # Every key of KEYS is a dict with a KID, an ALGORITHM (RS256 or ES256, see
+    # PyJWT) and PEM encoded PRIVATE_KEY and/or PUBLIC_KEY. The public keys are
+    # served at /.well-known/jwks.json, cached by clients for JWKS_MAX_AGE seconds.
+    # Without a SIGNING_KEY tokens are signed with HS256 and SECRET_KEY, and
+    # tokens without a KID are only accepted while ACCEPT_HS256 is set.
+    #
+    # To rotate keys without rejecting valid tokens: add the new key to KEYS and
+    # wait JWKS_MAX_AGE seconds, then make it the SIGNING_KEY, and remove the old
+    # key once the tokens it signed have expired.
+    JWT_KEYS = {
+        "SIGNING_KEY": None,
+        "KEYS": [],
+        "ACCEPT_HS256": True,
+        "JWKS_MAX_AGE": 300,
+    }
+
     # Graphene
     # Settings for Graphene are all namespaced in the GRAPHENE setting.
 
-    GRAPHENE = {"SCHEMA": "config.schema.schema"}
+    GRAPHENE = {
+        "SCHEMA": "config.schema.schema",
+        "MIDDLEWARE": ("config.tracing.TracingMiddleware",),
+    }
+
+    # Resolver tracing
+    # A SAMPLE_RATE fraction of the operations is traced in the Apollo tracing
+    # format, with the SQL time of every field. Traces are returned in the
+    # response extensions when EXTENSIONS is enabled, and appended to the JSON
+    # lines file at SINK when it is set.
+    GRAPHQL_TRACING = {"SAMPLE_RATE": 0.0, "EXTENSIONS": False, "SINK": None}
+
+    # Parsed and validated ad-hoc documents are kept in a per-process LRU, keyed
+    # by the hash of the query text.
+    GRAPHQL_DOCUMENT_CACHE = {"MAX_ENTRIES": 500}
+
+    # Query complexity
+    # Operations are measured when their document is compiled: DEPTH is the
+    # deepest nesting of fields, NODES the number of fields and COST the estimated
+    # number of objects resolved, following the field_costs of the types.
+    # Operations over a limit are rejected before execution, None disables it.
+    GRAPHQL_COMPLEXITY = {"MAX_DEPTH": 10, "MAX_NODES": 250, "MAX_COST": 5000}
+
+    # Response cache
+    # When ENABLED, the responses of queries are cached in CACHE_ALIAS, per
+    # document, variables and viewer, for the shortest max age of their fields
+    # as annotated in the field_max_ages of the types; fields without one are not
+    # cached. Saving the viewer invalidates its responses. Responses carry an
+    # ETag, and GET requests sending it in If-None-Match get a 304.
+    GRAPHQL_RESPONSE_CACHE = {"ENABLED": False, "CACHE_ALIAS": "default"}
+
+    # Connections are paginated on keys rather than offsets. Pages hold
+    # DEFAULT_PAGE_SIZE items unless first or last asks for up to MAX_PAGE_SIZE.
+    GRAPHQL_PAGINATION = {"DEFAULT_PAGE_SIZE": 20, "MAX_PAGE_SIZE": 100}
+
+    # Persisted queries
+    # DOCUMENTS points to a JSON manifest mapping SHA-256 hashes to query text,
+    # which is parsed and validated once at startup. In ALLOWLIST mode only those
+    # documents are executed; AUTOMATIC enables registration of new documents by
+    # clients (automatic persisted queries), shared through CACHE_ALIAS for
+    # TIMEOUT seconds. Documents over MAX_QUERY_LENGTH characters are executed
+    # without being registered.
+    GRAPHQL_PERSISTED_QUERIES = {
+        "DOCUMENTS": None,
+        "ALLOWLIST": False,
+        "AUTOMATIC": True,
+        "CACHE_ALIAS": "default",
+        "MAX_ENTRIES": 1000,
+        "TIMEOUT": 86400,
+        "MAX_QUERY_LENGTH": 10000,
+    }
+
+    # Subscriptions
+    # Subscriptions are served over WebSocket by config.asgi, using the graphql-ws
+    # protocol. Events reach the subscribers through the BROKER:
+    # config.pubsub.LocalBroker only reaches the subscribers of the process
+    # publishing them, so it misses the changes made by WSGI workers and other
+    # ASGI processes. config.pubsub.RedisBroker reaches those of all processes.
+    # Subscribers falling MAX_QUEUE_SIZE events behind miss the next ones.
+    # Idle connections are sent a keep alive message every KEEP_ALIVE seconds.
+    GRAPHQL_SUBSCRIPTIONS = {
+        "BROKER": "config.pubsub.LocalBroker",
+        "OPTIONS": {"MAX_QUEUE_SIZE": 100},
+        "KEEP_ALIVE": 30,
+    }
@@ -16,10 +16,22 @@ class Local(Base):
     # https://docs.djangoproject.com/en/1.11/topics/email/
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
+    @property
+    def EMAIL_OUTBOX(self):
+        return dict(super(Local, self).EMAIL_OUTBOX, WORKER="thread")
+
     @property
     def GRAPHENE(self):
         graphene = super(Local, self).GRAPHENE
 
-        graphene["MIDDLEWARE"] = ("graphene_django.debug.DjangoDebugMiddleware",)
+        return dict(
+            graphene,
+            MIDDLEWARE=graphene["MIDDLEWARE"]
+            + ("graphene_django.debug.DjangoDebugMiddleware",),
+        )
 
-        return graphene
+    @property
+    def GRAPHQL_TRACING(self):
+        return dict(
+            super(Local, self).GRAPHQL_TRACING, SAMPLE_RATE=1.0, EXTENSIONS=True
+        )
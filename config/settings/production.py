@@ -0,0 +1,94 @@
+from configurations import values
+
+from config.settings.base import Base
+
+
+class Production(Base):
+
+    # SECURITY WARNING: keep the secret key used in production secret!
+    SECRET_KEY = values.SecretValue()
+
+    # SECURITY WARNING: don't run with debug turned on in production!
+    DEBUG = False
+
+    ALLOWED_HOSTS = values.ListValue([])
+
+    # CACHE CONFIGURATION
+    # ------------------------------------------------------------------------------
+    # memcached, shared by all workers, at the DJANGO_CACHE_LOCATIONS servers. The
+    # user cache, token revocations, throttling counters and read-your-writes
+    # windows must reach every worker
+    CACHE_LOCATIONS = values.ListValue(["127.0.0.1:11211"])
+    CACHE_KEY_PREFIX = values.Value("klasse")
+
+    @property
+    def CACHES(self):
+        return {
+            "default": {
+                "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+                "LOCATION": self.CACHE_LOCATIONS,
+                "KEY_PREFIX": self.CACHE_KEY_PREFIX,
+            }
+        }
+
+    # THROTTLING CONFIGURATION
+    # ------------------------------------------------------------------------------
+    # Counters kept in the memcached CACHES, so rates apply across workers
+    THROTTLING = dict(
+        Base.THROTTLING,
+        STORE="klasse.users.throttling.DjangoThrottleStore",
+        OPTIONS={"ALIAS": "default"},
+    )
+
+    # SUBSCRIPTIONS CONFIGURATION
+    # ------------------------------------------------------------------------------
+    # Redis pub/sub at DJANGO_PUBSUB_URL, so events published by any worker reach
+    # the subscribers of every ASGI process
+    PUBSUB_URL = values.Value("redis://localhost:6379/0")
+
+    @property
+    def GRAPHQL_SUBSCRIPTIONS(self):
+        return dict(
+            Base.GRAPHQL_SUBSCRIPTIONS,
+            BROKER="config.pubsub.RedisBroker",
+            OPTIONS=dict(Base.GRAPHQL_SUBSCRIPTIONS["OPTIONS"], URL=self.PUBSUB_URL),
+        )
+
+    # DATABASE CONFIGURATION
+    # ------------------------------------------------------------------------------
+    # PostgreSQL, configured with the DJANGO_DATABASE_* environment variables
+    DATABASE_NAME = values.Value("klasse")
+    DATABASE_USER = values.Value("klasse")
+    DATABASE_PASSWORD = values.Value("")
+    DATABASE_HOST = values.Value("localhost")
+    DATABASE_PORT = values.Value("5432")
+
+    # Seconds to keep connections open between requests, None for unlimited.
+    # Persistent connections are checked once per request before being reused
+    CONN_MAX_AGE = values.IntegerValue(600)
+
+    # Share this many connections between the threads of each process instead
+    # of keeping one per thread, 0 to disable. Connections are returned to the
+    # pool at the end of every request, so CONN_MAX_AGE no longer applies
+    DATABASE_POOL_SIZE = values.IntegerValue(0)
+    DATABASE_POOL_TIMEOUT = values.IntegerValue(30)
+
+    @property
+    def DATABASES(self):
+        pool_size = self.DATABASE_POOL_SIZE
+
+        return {
+            "default": {
+                "ENGINE": "config.db",
+                "NAME": self.DATABASE_NAME,
+                "USER": self.DATABASE_USER,
+                "PASSWORD": self.DATABASE_PASSWORD,
+                "HOST": self.DATABASE_HOST,
+                "PORT": self.DATABASE_PORT,
+                "CONN_MAX_AGE": 0 if pool_size else self.CONN_MAX_AGE,
+                "CONN_HEALTH_CHECKS": True,
+                "POOL": {"MAX_SIZE": pool_size, "TIMEOUT": self.DATABASE_POOL_TIMEOUT}
+                if pool_size
+                else None,
+            }
+        }
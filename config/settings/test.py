@@ -45,6 +45,11 @@ class Test(Base):
     # Use fast password hasher so tests run faster
     PASSWORD_HASHERS = ("django.contrib.auth.hashers.MD5PasswordHasher",)
 
+    # Hash in the test process instead of a process pool
+    @property
+    def PASSWORD_HASHING(self):
+        return dict(super(Test, self).PASSWORD_HASHING, WORKERS=0)
+
     # DATABASE CONFIGURATION
     # ------------------------------------------------------------------------------
     DATABASES = {
@@ -0,0 +1,221 @@
+import asyncio
+import json
+
+from graphene_django.views import GraphQLView
+from graphql.execution import ExecutionResult
+from graphql.utils.get_operation_ast import get_operation_ast
+from rx import Observable
+
+from django.conf import settings
+
+from klasse.users.loaders import Loaders
+from klasse.users.middleware import get_user
+
+from .complexity import get_complexity_errors
+from .documents import get_document_cache
+from .executors import (
+    DatabaseSyncToAsyncMiddleware,
+    database_sync_to_async,
+    execute_async,
+)
+from .pubsub import get_broker
+from .routers import get_replica, pin_to_primary, reading_sync_to_async
+
+# Messages of the graphql-ws protocol, as spoken by subscriptions-transport-ws
+GQL_CONNECTION_INIT = "connection_init"
+GQL_CONNECTION_ACK = "connection_ack"
+GQL_CONNECTION_ERROR = "connection_error"
+GQL_CONNECTION_KEEP_ALIVE = "ka"
+GQL_CONNECTION_TERMINATE = "connection_terminate"
+GQL_START = "start"
+GQL_DATA = "data"
+GQL_ERROR = "error"
+GQL_COMPLETE = "complete"
+GQL_STOP = "stop"
+
+
+def format_result(result):
+    payload = {"data": result.data}
+
+    if result.errors:
+        payload["errors"] = [GraphQLView.format_error(e) for e in result.errors]
+
+    return payload
+
+
+class SubscriptionConnection(object):
+    """
+    A WebSocket connection speaking the graphql-ws protocol. Operations are
+    executed with the user authenticated by the ``Authorization`` header of
+    the handshake or of the ``connection_init`` payload.
+    """
+
+    def __init__(self, schema, request, send):
+        self.schema = schema
+        self.request = request
+        self._send = send
+        self.operations = {}
+        self.keep_alive = None
+
+    async def send(self, type, id=None, payload=None):
+        message = {"type": type}
+
+        if id is not None:
+            message["id"] = id
+
+        if payload is not None:
+            message["payload"] = payload
+
+        await self._send({"type": "websocket.send", "text": json.dumps(message)})
+
+    def send_soon(self, type, id=None, payload=None):
+        asyncio.ensure_future(self.send(type, id, payload))
+
+    async def receive(self, text):
+        try:
+            message = json.loads(text)
+            type, id = message["type"], message.get("id")
+        except (TypeError, ValueError, KeyError):
+            await self.send(GQL_ERROR, payload={"message": "Invalid message."})
+            return True
+
+        if type == GQL_CONNECTION_INIT:
+            await self.init(message.get("payload") or {})
+        elif type == GQL_START:
+            await self.start(id, message.get("payload") or {})
+        elif type == GQL_STOP:
+            self.stop(id)
+        elif type == GQL_CONNECTION_TERMINATE:
+            return False
+        else:
+            await self.send(
+                GQL_ERROR, id, {"message": "Unknown message type {}.".format(type)}
+            )
+
+        return True
+
+    async def init(self, payload):
+        authorization = payload.get("Authorization") or payload.get("authToken")
+
+        if authorization:
+            self.request.META["HTTP_AUTHORIZATION"] = authorization
+
+        self.request.user = await database_sync_to_async(get_user)(self.request)
+
+        await self.send(GQL_CONNECTION_ACK)
+
+        interval = settings.GRAPHQL_SUBSCRIPTIONS["KEEP_ALIVE"]
+
+        if interval and self.keep_alive is None:
+            await self.send(GQL_CONNECTION_KEEP_ALIVE)
+            self.keep_alive = asyncio.ensure_future(self.send_keep_alive(interval))
+
+    async def send_keep_alive(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await self.send(GQL_CONNECTION_KEEP_ALIVE)
+
+    async def start(self, id, payload):
+        if not hasattr(self.request, "user"):
+            await self.send(GQL_ERROR, id, {"message": "Connection not initialized."})
+            return
+
+        if id in self.operations:
+            self.stop(id)
+
+        result = await self.execute(
+            payload.get("query"), payload.get("variables"), payload.get("operationName")
+        )
+
+        if isinstance(result, Observable):
+            self.operations[id] = result.subscribe(
+                lambda result: self.send_soon(GQL_DATA, id, format_result(result)),
+                lambda error: self.fail(id, error),
+                lambda: self.complete(id),
+            )
+            return
+
+        if result.invalid:
+            await self.send(GQL_ERROR, id, format_result(result))
+        else:
+            await self.send(GQL_DATA, id, format_result(result))
+            await self.send(GQL_COMPLETE, id)
+
+    async def execute(self, query, variables, operation_name):
+        try:
+            document = get_document_cache(self.schema).get_or_compile(
+                self.schema, query or ""
+            )
+        except Exception as e:
+            return ExecutionResult(errors=[e], invalid=True)
+
+        if document.errors:
+            return ExecutionResult(errors=document.errors, invalid=True)
+
+        operation_ast = get_operation_ast(document.document_ast, operation_name)
+        operation = operation_ast.operation if operation_ast else None
+        routing = bool(settings.DATABASE_ROUTING["REPLICAS"])
+        read_database = None
+        middleware = None
+
+        if operation_ast:
+            name = operation_ast.name.value if operation_ast.name else None
+            errors = get_complexity_errors(document.complexity[name])
+
+            if errors:
+                return ExecutionResult(errors=errors, invalid=True)
+
+        if routing:
+            read_database = await database_sync_to_async(get_replica)(
+                self.request, operation
+            )
+
+        run = reading_sync_to_async(read_database)
+
+        # Subscription resolvers return async generators, which middleware
+        # would wrap in promises
+        if operation_ast and operation != "subscription":
+            middleware = [DatabaseSyncToAsyncMiddleware(run)]
+
+        # Loaders cache what they load, so operations don't share them.
+        # Subscription resolvers read the broker and the runner as they start.
+        self.request.loaders = Loaders(run=run)
+        self.request.broker = get_broker()
+        self.request.run = run
+
+        try:
+            return await execute_async(
+                self.schema,
+                document.document_ast,
+                variable_values=variables,
+                operation_name=operation_name,
+                context_value=self.request,
+                middleware=middleware,
+                allow_subscriptions=True,
+            )
+        except Exception as e:
+            return ExecutionResult(errors=[e], invalid=True)
+        finally:
+            if routing and operation == "mutation":
+                await database_sync_to_async(pin_to_primary)(self.request)
+
+    def fail(self, id, error):
+        self.operations.pop(id, None)
+        self.send_soon(GQL_ERROR, id, {"message": str(error)})
+
+    def complete(self, id):
+        self.operations.pop(id, None)
+        self.send_soon(GQL_COMPLETE, id)
+
+    def stop(self, id):
+        operation = self.operations.pop(id, None)
+
+        if operation is not None:
+            operation.dispose()
+
+    def close(self):
+        for id in list(self.operations):
+            self.stop(id)
+
+        if self.keep_alive is not None:
+            self.keep_alive.cancel()
@@ -0,0 +1,90 @@
+import pytest
+from graphql import parse
+
+from config.complexity import Complexity, analyze, get_complexity_errors
+from config.schema import schema
+
+
+def measure(query, operation_name=None):
+    return analyze(schema, parse(query))[operation_name]
+
+
+def test_scalar_fields():
+    assert measure("{ viewer { email firstName } }") == Complexity(2, 3, 1)
+
+
+def test_list_multipliers():
+    query = "{ viewer { groups { name userSet { email } } } }"
+
+    # viewer: 1 * (1 + groups: 5 * (1 + userSet: 100 * 1))
+    assert measure(query) == Complexity(4, 5, 506)
+
+
+def test_default_multiplier():
+    query = "{ viewer { groups { permissions { name } } } }"
+
+    assert measure(query) == Complexity(4, 4, 1 + 5 * (1 + 20))
+
+
+def test_fragments():
+    query = """
+        query Viewer {
+            viewer { ...User groups { ... on GroupType { userSet { ...User } } } }
+        }
+
+        fragment User on UserType { email groups { name } }
+    """
+
+    assert measure(query, "Viewer") == Complexity(5, 9, 1 + 5 + 5 * (1 + 100 * (1 + 5)))
+
+
+def test_nested_fragments():
+    fragments = "".join(
+        "fragment F{} on UserType {{ ...F{} ...F{} }}".format(i, i + 1, i + 1)
+        for i in range(30)
+    )
+    query = "{ viewer { ...F0 } }" + fragments + "fragment F30 on UserType { email }"
+
+    assert measure(query) == Complexity(2, 1 + 2 ** 30, 1)
+
+
+def test_introspection():
+    assert measure("{ __schema { types { name fields { name } } } }") == (0, 0, 0)
+
+
+def test_operations():
+    complexity = analyze(
+        schema,
+        parse(
+            """
+            query Viewer { viewer { email } }
+            mutation Login { login(email: "", password: "") { success } }
+            """
+        ),
+    )
+
+    assert complexity == {"Viewer": (2, 2, 1), "Login": (2, 2, 1)}
+
+
+@pytest.mark.parametrize(
+    "complexity, errors",
+    [
+        (Complexity(2, 2, 1), []),
+        (Complexity(11, 2, 1), ["Query depth of 11 exceeds the maximum of 10"]),
+        (
+            Complexity(2, 300, 6000),
+            [
+                "Query nodes of 300 exceeds the maximum of 250",
+                "Query cost of 6000 exceeds the maximum of 5000",
+            ],
+        ),
+    ],
+)
+def test_get_complexity_errors(complexity, errors):
+    assert [str(e) for e in get_complexity_errors(complexity)] == errors
+
+
+def test_get_complexity_errors_disabled(settings):
+    settings.GRAPHQL_COMPLEXITY = dict(settings.GRAPHQL_COMPLEXITY, MAX_DEPTH=None)
+
+    assert not get_complexity_errors(Complexity(100, 2, 1))
@@ -0,0 +1,180 @@
+import threading
+from io import StringIO
+from unittest import mock
+
+import pytest
+from psycopg2 import extensions
+
+from django.core.management import call_command
+from django.db import OperationalError
+
+from config.db.base import ConnectionPool, DatabaseWrapper, close_pools
+
+
+class Connection(object):
+    def __init__(self, status=extensions.TRANSACTION_STATUS_IDLE):
+        self.closed = 0
+        self.isolation_level = None
+        self.status = status
+        self.rolled_back = False
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rolled_back = True
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def test_pool_reuses_connections():
+    pool = ConnectionPool(Connection, max_size=2)
+
+    connection = pool.get()
+    pool.put(connection)
+
+    assert pool.get() is connection
+
+
+def test_pool_rolls_back_transactions():
+    pool = ConnectionPool(Connection)
+
+    connection = pool.get()
+    connection.status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.put(connection)
+
+    assert connection.rolled_back
+    assert pool.get() is connection
+
+
+def test_pool_discards_broken_connections():
+    pool = ConnectionPool(Connection)
+
+    connection = pool.get()
+    connection.status = extensions.TRANSACTION_STATUS_UNKNOWN
+    pool.put(connection)
+
+    assert connection.closed
+    assert pool.get() is not connection
+
+
+def test_pool_checks_idle_connections():
+    pool = ConnectionPool(Connection, check=lambda connection: False)
+
+    connection = pool.get()
+    pool.put(connection)
+
+    assert pool.get() is not connection
+    assert connection.closed
+
+
+def test_pool_timeout():
+    pool = ConnectionPool(Connection, max_size=1, timeout=0.01)
+    connection = pool.get()
+
+    with pytest.raises(OperationalError):
+        pool.get()
+
+    pool.put(connection)
+
+    assert pool.get() is connection
+
+
+def test_pool_threads():
+    pool = ConnectionPool(Connection, max_size=4)
+    connections = set()
+
+    def worker():
+        for _ in range(100):
+            connection = pool.get()
+            connections.add(connection)
+            pool.put(connection)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert len(connections) <= 4
+
+
+@pytest.fixture
+def wrapper(db):
+    wrapper = DatabaseWrapper(
+        {
+            "NAME": "klasse",
+            "CONN_MAX_AGE": None,
+            "CONN_HEALTH_CHECKS": True,
+            "AUTOCOMMIT": True,
+            "OPTIONS": {},
+        }
+    )
+    wrapper.connection = mock.Mock()
+    wrapper.autocommit = True
+
+    yield wrapper
+
+    close_pools()
+
+
+def test_health_check(wrapper):
+    connection = wrapper.connection
+    wrapper.close_if_unusable_or_obsolete()
+
+    with mock.patch.object(wrapper, "is_usable", return_value=True) as is_usable:
+        wrapper.check_health()
+        wrapper.check_health()
+
+    # Once per request
+    assert is_usable.call_count == 1
+    assert wrapper.connection is connection
+
+
+def test_health_check_closes_unusable_connection(wrapper):
+    connection = wrapper.connection
+    wrapper.close_if_unusable_or_obsolete()
+
+    with mock.patch.object(wrapper, "is_usable", return_value=False):
+        wrapper.check_health()
+
+    connection.close.assert_called_once_with()
+    assert wrapper.connection is None
+
+
+def test_health_check_disabled(wrapper):
+    wrapper.settings_dict["CONN_HEALTH_CHECKS"] = False
+    wrapper.close_if_unusable_or_obsolete()
+
+    with mock.patch.object(wrapper, "is_usable") as is_usable:
+        wrapper.check_health()
+
+    assert not is_usable.called
+
+
+def test_pooled_close_returns_connection(wrapper):
+    wrapper.settings_dict.update(CONN_HEALTH_CHECKS=False, POOL={"MAX_SIZE": 1})
+
+    with mock.patch.object(wrapper, "connect_to_database", side_effect=Connection):
+        connection = wrapper.connection = wrapper.get_new_connection({})
+        wrapper.close()
+
+        assert wrapper.connection is None
+        assert not connection.closed
+        assert wrapper.get_new_connection({}) is connection
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_command():
+    stdout = StringIO()
+
+    call_command("benchmark_connections", requests=20, threads=2, stdout=stdout)
+
+    lines = stdout.getvalue().splitlines()
+
+    assert [line.split()[0] for line in lines] == ["new", "persistent"]
+    assert lines[1].split()[-2] == "2"
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+from graphql.error import GraphQLSyntaxError
+
+from config.documents import (
+    DocumentCache,
+    compile_document,
+    get_document_cache,
+    get_query_hash,
+)
+from config.schema import schema
+
+QUERY = "query { viewer { email } }"
+
+
+def test_compile_document():
+    document = compile_document(schema, QUERY)
+
+    assert document.document_ast.definitions
+    assert document.errors == []
+    assert document.complexity == {None: (2, 2, 1)}
+
+
+def test_compile_document_validation_errors():
+    document = compile_document(schema, "query { viewer { unknown } }")
+
+    assert len(document.errors) == 1
+    assert document.complexity == {}
+
+
+def test_compile_document_syntax_error():
+    with pytest.raises(GraphQLSyntaxError):
+        compile_document(schema, "query {")
+
+
+def test_document_cache_hits_and_misses():
+    document_cache = DocumentCache()
+
+    document = document_cache.get_or_compile(schema, QUERY)
+
+    assert document_cache.get_or_compile(schema, QUERY) is document
+    assert document_cache.get(get_query_hash(QUERY)) is document
+    assert document_cache.info() == (2, 1, 0, 1, 500)
+
+
+def test_document_cache_eviction():
+    document_cache = DocumentCache(max_entries=2)
+    document_cache.set("a", 1)
+    document_cache.set("b", 2)
+    document_cache.get("a")
+    document_cache.set("c", 3)
+
+    assert document_cache.get("b") is None
+    assert document_cache.get("a") == 1
+    assert document_cache.info().evictions == 1
+    assert document_cache.info().size == 2
+
+
+def test_document_cache_threads():
+    document_cache = DocumentCache(max_entries=10)
+
+    def worker(offset):
+        for i in range(1000):
+            key = (offset + i) % 20
+            if document_cache.get(key) is None:
+                document_cache.set(key, key)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    info = document_cache.info()
+
+    assert info.hits + info.misses == 4000
+    assert info.size == 10
+
+
+def test_get_document_cache_max_entries(settings):
+    settings.GRAPHQL_DOCUMENT_CACHE = {"MAX_ENTRIES": 3}
+
+    assert get_document_cache(schema).max_entries == 3
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+import graphene
+import pytest
+from graphene_django.types import DjangoObjectType
+from graphql import parse
+
+from django.contrib.auth.models import Group, Permission
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import QuerySet
+
+from config.executors import DatabaseSyncToAsyncMiddleware, execute_async
+from config.handlers import GraphQLHandler
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+class PermissionNode(DjangoObjectType):
+    class Meta:
+        model = Permission
+        only_fields = ("id", "codename", "content_type")
+
+
+class ContentTypeNode(DjangoObjectType):
+    class Meta:
+        model = ContentType
+        only_fields = ("id", "model")
+
+    permissions = graphene.List(PermissionNode)
+
+    def resolve_permissions(self, info):
+        return self.permission_set.order_by("codename")
+
+
+class Query(graphene.ObjectType):
+    permission = graphene.Field(PermissionNode, id=graphene.ID())
+    content_type = graphene.Field(ContentTypeNode, id=graphene.ID())
+
+    def resolve_permission(self, info, id):
+        return Permission.objects.get(pk=id)
+
+    def resolve_content_type(self, info, id):
+        return ContentType.objects.get(pk=id)
+
+
+schema = graphene.Schema(query=Query)
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+
+    yield loop
+
+    loop.close()
+
+
+@pytest.fixture
+def query_threads():
+    """
+    The threads querysets are evaluated in.
+    """
+    threads = []
+    fetch_all = QuerySet._fetch_all
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            threads.append(threading.current_thread())
+
+        fetch_all(self)
+
+    with mock.patch.object(QuerySet, "_fetch_all", _fetch_all):
+        yield threads
+
+
+def execute(loop, query, variables):
+    return loop.run_until_complete(
+        execute_async(
+            schema,
+            parse(query),
+            variable_values=variables,
+            middleware=[DatabaseSyncToAsyncMiddleware()],
+        )
+    )
+
+
+def test_unloaded_relation(loop, query_threads):
+    permission = Permission.objects.select_related("content_type").first()
+    query = "query ($id: ID) { permission(id: $id) { contentType { model } } }"
+
+    del query_threads[:]
+    result = execute(loop, query, {"id": permission.pk})
+
+    assert not result.errors
+    assert result.data == {
+        "permission": {"contentType": {"model": permission.content_type.model}}
+    }
+    assert len(query_threads) == 2
+    assert threading.main_thread() not in query_threads
+
+
+def test_querysets(loop, query_threads):
+    content_type = ContentType.objects.get(app_label="auth", model="group")
+    permissions = [
+        {"codename": codename}
+        for codename in content_type.permission_set.order_by("codename").values_list(
+            "codename", flat=True
+        )
+    ]
+    query = "query ($id: ID) { contentType(id: $id) { permissions { codename } } }"
+
+    del query_threads[:]
+    result = execute(loop, query, {"id": content_type.pk})
+
+    assert not result.errors
+    assert result.data == {"contentType": {"permissions": permissions}}
+    assert len(query_threads) == 2
+    assert threading.main_thread() not in query_threads
+
+
+def test_loaders(loop, user, token, query_threads):
+    user.groups.add(Group.objects.create(name="Staff"))
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "POST",
+        "path": "/graphql",
+        "query_string": b"",
+        "server": ("testserver", 80),
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"authorization", token.encode("ascii")),
+        ],
+    }
+    sent = []
+
+    async def receive():
+        return {
+            "type": "http.request",
+            "body": json.dumps(
+                {"query": "query { viewer { groups { name } } }"}
+            ).encode(),
+        }
+
+    async def send(message):
+        sent.append(message)
+
+    del query_threads[:]
+    loop.run_until_complete(GraphQLHandler()(scope)(receive, send))
+
+    assert json.loads(sent[1]["body"])["data"] == {
+        "viewer": {"groups": [{"name": "Staff"}]}
+    }
+    assert query_threads
+    assert threading.main_thread() not in query_threads
@@ -0,0 +1,208 @@
+import asyncio
+import json
+from io import StringIO
+from urllib.parse import urlencode
+
+import pytest
+
+from django.core.management import call_command
+
+from config.handlers import ASGIHandler, get_environ
+
+QUERY = "query { viewer { email } }"
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+
+    yield loop
+
+    loop.close()
+
+
+def wsgi_application(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+
+    return [environ["PATH_INFO"].encode("ascii")]
+
+
+def request(loop, method, path, body=b"", headers=(), query_string=b""):
+    messages = [
+        {"type": "http.request", "body": body[:10], "more_body": True},
+        {"type": "http.request", "body": body[10:]},
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "path": path,
+        "query_string": query_string,
+        "headers": list(headers),
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 50000),
+    }
+
+    loop.run_until_complete(ASGIHandler(wsgi_application)(scope)(receive, send))
+
+    start, body = sent[0], b"".join(message.get("body", b"") for message in sent[1:])
+
+    return start["status"], dict(start["headers"]), body
+
+
+def post(loop, data, headers=()):
+    return request(
+        loop,
+        "POST",
+        "/graphql",
+        json.dumps(data).encode("utf-8"),
+        headers=[(b"content-type", b"application/json")] + list(headers),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_graphql_request(loop, user, token):
+    status, headers, body = post(
+        loop, {"query": QUERY}, headers=[(b"authorization", token.encode("ascii"))]
+    )
+
+    assert status == 200
+    assert headers[b"Content-Type"] == b"application/json"
+    assert json.loads(body)["data"] == {"viewer": {"email": "user@example.com"}}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_graphql_request_anonymous(loop):
+    status, _, body = post(loop, {"query": QUERY})
+
+    assert status == 200
+    assert json.loads(body)["data"] == {"viewer": None}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_graphql_mutation(loop, user):
+    query = """
+        mutation Login($email: String!, $password: String!) {
+            login(email: $email, password: $password) {
+                success
+            }
+        }
+    """
+    user.is_active = True
+    user.save()
+
+    status, _, body = post(
+        loop,
+        {
+            "query": query,
+            "variables": {"email": "user@example.com", "password": "password"},
+        },
+    )
+
+    assert status == 200
+    assert json.loads(body)["data"] == {"login": {"success": True}}
+
+
+def test_graphql_invalid_query(loop):
+    status, _, body = post(loop, {"query": "query { unknown }"})
+
+    assert status == 400
+    assert "errors" in json.loads(body)
+
+
+def test_graphql_mutation_over_get(loop):
+    status, _, _ = request(
+        loop,
+        "GET",
+        "/graphql",
+        query_string=urlencode(
+            {"query": 'mutation { logout(refreshToken: "a") { success } }'}
+        ).encode("ascii"),
+    )
+
+    assert status == 405
+
+
+def test_graphql_method_not_allowed(loop):
+    status, _, body = request(loop, "PUT", "/graphql")
+
+    assert status == 405
+    assert json.loads(body)["errors"]
+
+
+def test_cors_preflight(loop, settings):
+    settings.CORS_ORIGIN_ALLOW_ALL = True
+
+    status, headers, _ = request(
+        loop,
+        "OPTIONS",
+        "/graphql",
+        headers=[
+            (b"origin", b"https://example.com"),
+            (b"access-control-request-method", b"POST"),
+        ],
+    )
+
+    assert status == 200
+    assert headers[b"Access-Control-Allow-Origin"] == b"*"
+
+
+def test_disallowed_host(loop):
+    status, _, _ = post(loop, {"query": QUERY}, headers=[(b"host", b"example.com")])
+
+    assert status == 400
+
+
+def test_get_environ():
+    environ = get_environ(
+        {
+            "type": "http",
+            "http_version": "1.1",
+            "method": "POST",
+            "path": "/caf\u00e9",
+            "query_string": b"a=1",
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"accept", b"text/html"),
+                (b"accept", b"application/json"),
+            ],
+            "server": ("example.com", 8000),
+            "client": ("127.0.0.1", 50000),
+        },
+        b"body",
+    )
+
+    assert environ["PATH_INFO"] == "/caf\u00c3\u00a9"
+    assert environ["QUERY_STRING"] == "a=1"
+    assert environ["CONTENT_TYPE"] == "application/json"
+    assert environ["CONTENT_LENGTH"] == "4"
+    assert environ["HTTP_ACCEPT"] == "text/html,application/json"
+    assert (environ["SERVER_NAME"], environ["SERVER_PORT"]) == ("example.com", "8000")
+    assert environ["REMOTE_ADDR"] == "127.0.0.1"
+    assert environ["wsgi.input"].read() == b"body"
+
+
+def test_wsgi_request(loop):
+    status, _, body = request(loop, "GET", "/users/export")
+
+    assert status == 200
+    assert body == b"/users/export"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_command():
+    stdout = StringIO()
+
+    call_command("benchmark_asgi", requests=20, latency=0.01, stdout=stdout)
+
+    lines = stdout.getvalue().splitlines()
+
+    assert [line.split()[0] for line in lines] == ["wsgi", "asgi"]
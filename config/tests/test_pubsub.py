@@ -0,0 +1,205 @@
+import asyncio
+import threading
+from unittest import mock
+
+import pytest
+
+from django.core.exceptions import ImproperlyConfigured
+
+from config.pubsub import LocalBroker, RedisBroker, get_broker
+from klasse.users.events import publish
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    yield loop
+
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def receive(loop, subscription):
+    return loop.run_until_complete(asyncio.wait_for(subscription.__anext__(), 1))
+
+
+def test_publish(loop):
+    broker = LocalBroker()
+    subscription = broker.subscribe("user:1")
+    other = broker.subscribe("user:2")
+
+    broker.publish("user:1", {"id": "1"})
+
+    assert receive(loop, subscription) == {"id": "1"}
+    assert other.queue.empty()
+
+
+def test_publish_from_thread(loop):
+    broker = LocalBroker()
+    subscription = broker.subscribe("user:1")
+
+    thread = threading.Thread(target=broker.publish, args=("user:1", {"id": "1"}))
+    thread.start()
+    thread.join()
+
+    assert receive(loop, subscription) == {"id": "1"}
+
+
+def test_fan_out(loop):
+    broker = LocalBroker()
+    subscriptions = [broker.subscribe("user:1") for _ in range(5000)]
+
+    with mock.patch.object(
+        loop, "call_soon_threadsafe", wraps=loop.call_soon_threadsafe
+    ) as call_soon_threadsafe:
+        thread = threading.Thread(target=broker.publish, args=("user:1", {"id": "1"}))
+        thread.start()
+        thread.join()
+
+    # A single callback hands the message to all subscribers of the loop
+    assert call_soon_threadsafe.call_count == 1
+
+    loop.run_until_complete(asyncio.sleep(0))
+
+    assert all(subscription.queue.qsize() == 1 for subscription in subscriptions)
+
+
+def test_unsubscribe(loop):
+    broker = LocalBroker()
+    subscription = broker.subscribe("user:1")
+    other = broker.subscribe("user:1")
+
+    subscription.close()
+
+    assert broker.count("user:1") == 1
+
+    other.close()
+
+    assert broker.count("user:1") == 0
+    assert not broker._subscriptions
+
+    broker.publish("user:1", {"id": "1"})
+
+
+def test_slow_subscriber(loop):
+    broker = LocalBroker(max_queue_size=2)
+    subscription = broker.subscribe("user:1")
+
+    for index in range(3):
+        broker.publish("user:1", {"id": index})
+
+    loop.run_until_complete(asyncio.sleep(0))
+
+    assert receive(loop, subscription) == {"id": 0}
+    assert receive(loop, subscription) == {"id": 1}
+    assert subscription.queue.empty()
+
+
+def test_get_broker(settings):
+    assert get_broker() is get_broker()
+
+    settings.GRAPHQL_SUBSCRIPTIONS = dict(
+        settings.GRAPHQL_SUBSCRIPTIONS, OPTIONS={"MAX_QUEUE_SIZE": 5}
+    )
+
+    assert get_broker().max_queue_size == 5
+
+
+def test_redis_broker_requires_redis():
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        with pytest.raises(ImproperlyConfigured):
+            RedisBroker()
+    else:
+        pytest.skip("redis is installed")
+
+
+def test_publish_failure(caplog):
+    with mock.patch("config.pubsub.get_broker") as get_broker:
+        get_broker.return_value.publish.side_effect = ConnectionError("Lost")
+
+        publish("user:1", {"id": "1"})
+
+    assert "Publishing to user:1 failed: Lost" in caplog.text
+
+
+def test_redis_broker_channels(loop):
+    listening = threading.Event()
+    stop = threading.Event()
+
+    def listen():
+        listening.set()
+        stop.wait(1)
+        # Ends the listener thread
+        raise SystemExit
+
+    redis = mock.Mock()
+    pubsub = redis.Redis.from_url.return_value.pubsub.return_value
+    pubsub.listen = listen
+
+    with mock.patch.dict("sys.modules", {"redis": redis}):
+        broker = RedisBroker()
+
+    subscription = broker.subscribe("user:1")
+    listening.wait(1)
+    other = broker.subscribe("user:1")
+
+    # Only the channels with subscribers are listened to
+    channels = [
+        channel for call in pubsub.subscribe.call_args_list for channel in call[0]
+    ]
+    assert sorted(channels) == ["pubsub:", "pubsub:user:1"]
+
+    subscription.close()
+
+    assert not pubsub.unsubscribe.called
+
+    other.close()
+
+    pubsub.unsubscribe.assert_called_once_with("pubsub:user:1")
+
+    stop.set()
+    broker._listener.join(1)
+
+
+def test_redis_broker_reconnects(loop):
+    listens = []
+    stop = threading.Event()
+
+    def listen():
+        listens.append(threading.current_thread())
+
+        if len(listens) == 1:
+            raise ConnectionError("Lost the connection")
+
+        if len(listens) == 2:
+            return iter([{"channel": b"pubsub:user:1", "data": b'{"id": "1"}'}])
+
+        stop.wait(1)
+        # Ends the listener thread
+        raise SystemExit
+
+    redis = mock.Mock()
+    pubsub = redis.Redis.from_url.return_value.pubsub.return_value
+    pubsub.listen = listen
+
+    with mock.patch.dict("sys.modules", {"redis": redis}):
+        broker = RedisBroker(retry_delay=0.01)
+
+    subscription = broker.subscribe("user:1")
+
+    assert receive(loop, subscription) == {"id": "1"}
+
+    stop.set()
+    broker._listener.join(1)
+    broker.subscribe("user:1")
+    broker._listener.join(1)
+
+    # The dead listener was replaced
+    assert len(listens) == 4
+    assert len(set(listens)) == 2
+    # The channels with subscribers are subscribed to again on reconnecting
+    assert pubsub.subscribe.call_args == mock.call("pubsub:", "pubsub:user:1")
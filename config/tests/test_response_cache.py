@@ -0,0 +1,254 @@
+import asyncio
+import json
+
+import pytest
+from graphql import parse
+
+from django.urls import reverse
+
+from config.handlers import GraphQLHandler
+from config.response_cache import analyze_max_ages
+from config.schema import schema
+
+QUERY = "query { viewer { firstName } }"
+
+MUTATION = """
+mutation {
+    update(firstName: "Mark") {
+        user { firstName }
+    }
+}
+"""
+
+
+@pytest.fixture
+def response_cache(settings, user_cache):
+    settings.GRAPHQL_RESPONSE_CACHE = dict(
+        settings.GRAPHQL_RESPONSE_CACHE, ENABLED=True
+    )
+    # Load the viewer from the database on every request
+    settings.JWT_TOKEN_CACHE = dict(settings.JWT_TOKEN_CACHE, BACKEND=None)
+    settings.USER_CACHE = dict(settings.USER_CACHE, ENABLED=False)
+
+    return user_cache
+
+
+@pytest.fixture
+def active_user(user):
+    user.is_active = True
+    user.save()
+
+    return user
+
+
+def post(client, query, token, **extra):
+    return client.post(
+        reverse("graphql"),
+        json.dumps({"query": query}),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=token,
+        **extra
+    )
+
+
+def get_first_name(response):
+    return response.json()["data"]["viewer"]["firstName"]
+
+
+def rename(django_user_model, user, first_name):
+    # Without signals, so the cache is not invalidated
+    django_user_model.objects.filter(pk=user.pk).update(first_name=first_name)
+
+
+@pytest.mark.parametrize(
+    "query,max_ages",
+    [
+        (QUERY, {None: 60}),
+        ("query { viewer { email groups { name } } }", {None: 0}),
+        ("query { users { edges { node { email } } } }", {None: 0}),
+        ("query { __debug { sql { rawSql } } viewer { email } }", {None: 0}),
+        ("query { __schema { queryType { name } } }", {None: None}),
+        (
+            "query A { viewer { ...F } } fragment F on UserType { id __typename }",
+            {"A": 60},
+        ),
+        (MUTATION, {None: 0}),
+    ],
+)
+def test_analyze_max_ages(query, max_ages):
+    assert analyze_max_ages(schema, parse(query)) == max_ages
+
+
+def test_cached(client, django_user_model, active_user, token, response_cache):
+    response = post(client, QUERY, token)
+    rename(django_user_model, active_user, "Mark")
+    cached_response = post(client, QUERY, token)
+
+    assert get_first_name(cached_response) == "John"
+    assert cached_response["ETag"] == response["ETag"]
+    assert cached_response["Cache-Control"] == "private, no-cache"
+
+
+def test_invalidated_by_user_writes(client, active_user, token, response_cache):
+    post(client, QUERY, token)
+
+    active_user.first_name = "Mark"
+    active_user.save()
+
+    assert get_first_name(post(client, QUERY, token)) == "Mark"
+
+
+def test_keyed_by_variables(
+    client, django_user_model, active_user, token, response_cache
+):
+    query = "query Viewer($id: Boolean!) { viewer { firstName id @include(if: $id) } }"
+    data = {"query": query, "variables": {"id": False}}
+
+    client.post(
+        reverse("graphql"),
+        json.dumps(data),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=token,
+    )
+    rename(django_user_model, active_user, "Mark")
+    data["variables"] = {"id": True}
+    response = client.post(
+        reverse("graphql"),
+        json.dumps(data),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=token,
+    )
+
+    assert get_first_name(response) == "Mark"
+
+
+def test_anonymous_viewer(client, response_cache):
+    response = client.get(reverse("graphql"), {"query": QUERY})
+
+    assert response.json()["data"] == {"viewer": None}
+    assert "ETag" in response
+
+
+def test_mutations_bypass(client, active_user, token, response_cache):
+    response = post(client, MUTATION, token)
+
+    assert not response.json().get("errors")
+    assert "ETag" not in response
+    assert get_first_name(post(client, QUERY, token)) == "Mark"
+
+
+def test_uncacheable_fields(
+    client, django_user_model, active_user, token, response_cache
+):
+    query = "query { viewer { firstName groups { name } } }"
+
+    post(client, query, token)
+    rename(django_user_model, active_user, "Mark")
+    response = post(client, query, token)
+
+    assert get_first_name(response) == "Mark"
+    assert "ETag" not in response
+
+
+def test_not_modified(client, django_user_model, active_user, token, response_cache):
+    etag = post(client, QUERY, token)["ETag"]
+    response = client.get(
+        reverse("graphql"),
+        {"query": QUERY},
+        HTTP_AUTHORIZATION=token,
+        HTTP_IF_NONE_MATCH=etag,
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response["ETag"] == etag
+
+    active_user.first_name = "Mark"
+    active_user.save()
+    response = client.get(
+        reverse("graphql"),
+        {"query": QUERY},
+        HTTP_AUTHORIZATION=token,
+        HTTP_IF_NONE_MATCH=etag,
+    )
+
+    assert response.status_code == 200
+    assert get_first_name(response) == "Mark"
+
+
+def test_traces_not_cached(
+    client, django_user_model, active_user, token, response_cache, settings
+):
+    settings.GRAPHQL_TRACING = dict(
+        settings.GRAPHQL_TRACING, SAMPLE_RATE=1.0, EXTENSIONS=True
+    )
+
+    response = post(client, QUERY, token)
+    rename(django_user_model, active_user, "Mark")
+    cached_response = post(client, QUERY, token)
+
+    assert "tracing" in response.json()["extensions"]
+    assert get_first_name(cached_response) == "John"
+    assert cached_response.json()["extensions"] == {
+        "complexity": response.json()["extensions"]["complexity"]
+    }
+
+
+def test_disabled(
+    client, django_user_model, active_user, token, response_cache, settings
+):
+    settings.GRAPHQL_RESPONSE_CACHE = dict(
+        settings.GRAPHQL_RESPONSE_CACHE, ENABLED=False
+    )
+
+    post(client, QUERY, token)
+    rename(django_user_model, active_user, "Mark")
+    response = post(client, QUERY, token)
+
+    assert get_first_name(response) == "Mark"
+    assert "ETag" not in response
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async(django_user_model, active_user, token, response_cache):
+    def request():
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": "POST",
+            "path": "/graphql",
+            "query_string": b"",
+            "server": ("testserver", 80),
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"authorization", token.encode()),
+            ],
+        }
+        sent = []
+
+        async def receive():
+            return {
+                "type": "http.request",
+                "body": json.dumps({"query": QUERY}).encode(),
+            }
+
+        async def send(message):
+            sent.append(message)
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(GraphQLHandler()(scope)(receive, send))
+        finally:
+            loop.close()
+
+        return sent
+
+    response = request()
+    rename(django_user_model, active_user, "Mark")
+    cached_response = request()
+
+    assert json.loads(cached_response[1]["body"]) == json.loads(response[1]["body"])
+    assert dict(cached_response[0]["headers"])[b"ETag"] == (
+        dict(response[0]["headers"])[b"ETag"]
+    )
@@ -0,0 +1,261 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+
+from config.handlers import GraphQLHandler, SubscriptionHandler
+from config.routers import (
+    ReplicaRouter,
+    get_read_database,
+    read_from,
+    reading_sync_to_async,
+)
+from klasse.users.utils import jwt_encode_handler, jwt_payload_handler
+
+from .test_subscriptions import WebSocket
+
+QUERY = "query { users { edges { node { firstName } } } }"
+
+MUTATION = """
+mutation {
+    update(firstName: "Mark") {
+        user { firstName }
+    }
+}
+"""
+
+
+@pytest.fixture
+def replica(tmpdir, settings, transactional_db):
+    """
+    A second SQLite file, holding a copy of the user under another name.
+    """
+    connections.databases["replica"] = dict(
+        connections.databases["default"], NAME=str(tmpdir.join("replica.sqlite3"))
+    )
+
+    with connections["replica"].schema_editor() as editor:
+        editor.create_model(Group)
+        editor.create_model(get_user_model())
+
+    settings.DATABASE_ROUTING = dict(settings.DATABASE_ROUTING, REPLICAS=["replica"])
+    cache.clear()
+
+    yield "replica"
+
+    connections["replica"].close()
+    del connections["replica"]
+    del connections.databases["replica"]
+
+
+@pytest.fixture
+def staff_user(user):
+    user.is_active = True
+    user.is_staff = True
+    user.save()
+
+    return user
+
+
+@pytest.fixture
+def replica_user(replica, staff_user):
+    replica_user = get_user_model().objects.get(pk=staff_user.pk)
+    replica_user.first_name = "Stale"
+    replica_user.save(using=replica, force_insert=True)
+
+    return replica_user
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    yield loop
+
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+def get_first_names(response):
+    return [edge["node"]["firstName"] for edge in response["data"]["users"]["edges"]]
+
+
+def post(client, query, token=None):
+    extra = {"HTTP_AUTHORIZATION": token} if token else {}
+
+    return client.post(
+        reverse("graphql"),
+        json.dumps({"query": query}),
+        content_type="application/json",
+        **extra
+    )
+
+
+def test_router():
+    router = ReplicaRouter()
+    User = get_user_model()
+
+    assert router.db_for_read(User) == "default"
+
+    with read_from("replica"):
+        assert router.db_for_read(User) == "replica"
+        assert router.db_for_write(User) == "default"
+
+    assert get_read_database() is None
+
+
+def test_router_allow_migrate(settings):
+    settings.DATABASE_ROUTING = dict(settings.DATABASE_ROUTING, REPLICAS=["replica"])
+    router = ReplicaRouter()
+
+    assert router.allow_migrate("default", "users") is None
+    assert router.allow_migrate("replica", "users") is False
+
+
+def test_query_reads_replica(client, replica_user, token):
+    response = post(client, QUERY, token)
+
+    assert get_first_names(response.json()) == ["Stale"]
+
+
+def test_query_without_replicas(client, staff_user, token):
+    response = post(client, QUERY, token)
+
+    assert get_first_names(response.json()) == ["John"]
+
+
+def test_mutation_pins_primary(client, replica_user, token):
+    response = post(client, MUTATION, token)
+
+    assert not response.json().get("errors")
+    assert get_user_model().objects.get(pk=replica_user.pk).first_name == "Mark"
+
+    # Read your writes
+    response = post(client, QUERY, token)
+
+    assert get_first_names(response.json()) == ["Mark"]
+
+
+def test_mutation_pins_subject_only(client, replica_user, token, django_user_model):
+    other_user = django_user_model.objects.create_user(
+        first_name="Jane",
+        last_name="Doe",
+        email="other@example.com",
+        password="password",
+        is_active=True,
+        is_staff=True,
+    )
+    other_replica_user = django_user_model.objects.get(pk=other_user.pk)
+    other_replica_user.save(using="replica", force_insert=True)
+    other_token = "Bearer {}".format(
+        jwt_encode_handler(jwt_payload_handler(other_user))
+    )
+
+    post(client, MUTATION, token)
+    response = post(client, QUERY, other_token)
+
+    assert sorted(get_first_names(response.json())) == ["Jane", "Stale"]
+
+
+def test_read_your_writes_disabled(client, settings, replica_user, token):
+    settings.DATABASE_ROUTING = dict(settings.DATABASE_ROUTING, READ_YOUR_WRITES=0)
+
+    post(client, MUTATION, token)
+    response = post(client, QUERY, token)
+
+    assert get_first_names(response.json()) == ["Stale"]
+
+
+def post_async(loop, query, token):
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "POST",
+        "path": "/graphql",
+        "query_string": b"",
+        "server": ("testserver", 80),
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"authorization", token.encode()),
+        ],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps({"query": query}).encode()}
+
+    async def send(message):
+        sent.append(message)
+
+    loop.run_until_complete(GraphQLHandler()(scope)(receive, send))
+
+    return json.loads(sent[1]["body"])
+
+
+def test_async_query_reads_replica(loop, replica_user, token):
+    assert get_first_names(post_async(loop, QUERY, token)) == ["Stale"]
+
+
+def test_async_nested_reads_replica(loop, replica_user, token):
+    group = Group.objects.using("replica").create(name="Replica")
+    get_user_model().groups.through.objects.using("replica").create(
+        user=replica_user, group=group
+    )
+    query = "query { users { edges { node { groups { name } } } } }"
+
+    response = post_async(loop, query, token)
+
+    assert response["data"]["users"]["edges"] == [
+        {"node": {"groups": [{"name": "Replica"}]}}
+    ]
+
+    # Through the DataLoaders
+    with mock.patch("klasse.users.schema.get_prefetched", return_value=None):
+        response = post_async(loop, query, token)
+
+    assert response["data"]["users"]["edges"] == [
+        {"node": {"groups": [{"name": "Replica"}]}}
+    ]
+
+
+def test_reading_sync_to_async(loop):
+    run = reading_sync_to_async("replica")
+
+    assert loop.run_until_complete(run(get_read_database)()) == "replica"
+    assert get_read_database() is None
+
+
+def execute_websocket(websocket, query):
+    websocket.send_json({"type": "start", "id": "1", "payload": {"query": query}})
+    message = websocket.receive_json()
+
+    assert websocket.receive_json() == {"type": "complete", "id": "1"}
+
+    return message["payload"]
+
+
+def test_websocket_query_reads_replica(loop, replica_user, token):
+    websocket = WebSocket(loop, SubscriptionHandler())
+    websocket.connect(token)
+
+    assert get_first_names(execute_websocket(websocket, QUERY)) == ["Stale"]
+
+    websocket.disconnect()
+
+
+def test_websocket_mutation_pins_primary(loop, replica_user, token):
+    websocket = WebSocket(loop, SubscriptionHandler())
+    websocket.connect(token)
+
+    assert not execute_websocket(websocket, MUTATION).get("errors")
+    assert get_first_names(execute_websocket(websocket, QUERY)) == ["Mark"]
+
+    websocket.disconnect()
@@ -0,0 +1,253 @@
+import asyncio
+import json
+
+import pytest
+
+from config.handlers import SubscriptionHandler
+from config.pubsub import get_broker
+from klasse.users.events import get_user_channel, publish_user_changed
+
+SUBSCRIPTION = "subscription { viewerChanged { firstName } }"
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    yield loop
+
+    asyncio.set_event_loop(None)
+    loop.close()
+
+
+class WebSocket(object):
+    def __init__(self, loop, handler, headers=()):
+        self.loop = loop
+        self.incoming = asyncio.Queue()
+        self.outgoing = asyncio.Queue()
+        scope = {
+            "type": "websocket",
+            "path": "/graphql",
+            "query_string": b"",
+            "headers": list(headers),
+            "subprotocols": ["graphql-ws"],
+        }
+        self.task = loop.create_task(
+            handler(scope)(self.incoming.get, self.outgoing.put)
+        )
+        self.incoming.put_nowait({"type": "websocket.connect"})
+
+    def receive(self):
+        return self.loop.run_until_complete(asyncio.wait_for(self.outgoing.get(), 2))
+
+    def receive_json(self):
+        return json.loads(self.receive()["text"])
+
+    def send_json(self, message):
+        self.incoming.put_nowait(
+            {"type": "websocket.receive", "text": json.dumps(message)}
+        )
+
+    def connect(self, token=None):
+        assert self.receive() == {
+            "type": "websocket.accept",
+            "subprotocol": "graphql-ws",
+        }
+
+        self.send_json(
+            {
+                "type": "connection_init",
+                "payload": {"Authorization": token} if token else {},
+            }
+        )
+
+        assert self.receive_json() == {"type": "connection_ack"}
+        assert self.receive_json() == {"type": "ka"}
+
+    def disconnect(self):
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+        self.loop.run_until_complete(self.task)
+
+
+@pytest.fixture
+def active_user(user):
+    user.is_active = True
+    user.save()
+
+    return user
+
+
+@pytest.mark.django_db(transaction=True)
+def test_subscription(loop, active_user, token):
+    websocket = WebSocket(loop, SubscriptionHandler())
+    websocket.connect(token)
+    websocket.send_json(
+        {"type": "start", "id": "1", "payload": {"query": SUBSCRIPTION}}
+    )
+
+    # Let the subscription start before publishing
+    loop.run_until_complete(asyncio.sleep(0.01))
+    assert get_broker().count(get_user_channel(active_user.pk)) == 1
+
+    active_user.first_name = "Mark"
+    active_user.save()
+    publish_user_changed(active_user)
+
+    assert websocket.receive_json() == {
+        "type": "data",
+        "id": "1",
+        "payload": {"data": {"viewerChanged": {"firstName": "Mark"}}},
+    }
+
+    websocket.send_json({"type": "stop", "id": "1"})
+    loop.run_until_complete(asyncio.sleep(0.01))
+
+    assert get_broker().count(get_user_channel(active_user.pk)) == 0
+
+    websocket.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_subscription_revoked(loop, active_user, token):
+    websocket = WebSocket(loop, SubscriptionHandler())
+    websocket.connect(token)
+    websocket.send_json(
+        {"type": "start", "id": "1", "payload": {"query": SUBSCRIPTION}}
+    )
+    loop.run_until_complete(asyncio.sleep(0.01))
+
+    # Revokes the tokens, and notifies the subscribers
+    active_user.set_password("new password")
+    active_user.save()
+
+    assert websocket.receive_json() == {
+        "type": "data",
+        "id": "1",
+        "payload": {
+            "data": {"viewerChanged": None},
+            "errors": [{"message": "Token revoked"}],
+        },
+    }
+    assert websocket.receive_json() == {"type": "complete", "id": "1"}
+    loop.run_until_complete(asyncio.sleep(0.01))
+    assert get_broker().count(get_user_channel(active_user.pk)) == 0
+
+    websocket.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_subscription_fan_out(loop, active_user, token):
+    handler = SubscriptionHandler()
+    websockets = [WebSocket(loop, handler) for _ in range(1000)]
+
+    for index, websocket in enumerate(websockets):
+        websocket.connect(token)
+        websocket.send_json(
+            {"type": "start", "id": str(index), "payload": {"query": SUBSCRIPTION}}
+        )
+
+    loop.run_until_complete(asyncio.sleep(0.1))
+    assert get_broker().count(get_user_channel(active_user.pk)) == 1000
+
+    publish_user_changed(active_user)
+
+    for index, websocket in enumerate(websockets):
+        assert websocket.receive_json() == {
+            "type": "data",
+            "id": str(index),
+            "payload": {"data": {"viewerChanged": {"firstName": "John"}}},
+        }
+
+    for websocket in websockets:
+        websocket.disconnect()
+
+    assert get_broker().count(get_user_channel(active_user.pk)) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_subscription_anonymous(loop):
+    websocket = WebSocket(loop, SubscriptionHandler())
+    websocket.connect()
+    websocket.send_json(
+        {"type": "start", "id": "1", "payload": {"query": SUBSCRIPTION}}
+    )
+
+    message = websocket.receive_json()
+
+    assert message["type"] == "data"
+    assert message["payload"]["data"] is None
+    assert message["payload"]["errors"][0]["message"] == "Not allowed"
+    assert websocket.receive_json() == {"type": "complete", "id": "1"}
+
+    websocket.disconnect()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_query(loop, active_user, token):
+    websocket = WebSocket(loop, SubscriptionHandler())
+    websocket.connect(token)
+    websocket.send_json(
+        {"type": "start", "id": "1", "payload": {"query": "{ viewer { email } }"}}
+    )
+
+    assert websocket.receive_json() == {
+        "type": "data",
+        "id": "1",
+        "payload": {"data": {"viewer": {"email": "user@example.com"}}},
+    }
+    assert websocket.receive_json() == {"type": "complete", "id": "1"}
+
+    websocket.disconnect()
+
+
+def test_invalid_query(loop, db):
+    websocket = WebSocket(loop, SubscriptionHandler())
+    websocket.connect()
+    websocket.send_json(
+        {"type": "start", "id": "1", "payload": {"query": "{ unknown }"}}
+    )
+
+    message = websocket.receive_json()
+
+    assert message["type"] == "error"
+    assert message["id"] == "1"
+
+    websocket.disconnect()
+
+
+def test_start_before_init(loop):
+    websocket = WebSocket(loop, SubscriptionHandler())
+    websocket.receive()
+    websocket.send_json(
+        {"type": "start", "id": "1", "payload": {"query": SUBSCRIPTION}}
+    )
+
+    assert websocket.receive_json()["type"] == "error"
+
+    websocket.disconnect()
+
+
+def test_connection_terminate(loop):
+    websocket = WebSocket(loop, SubscriptionHandler())
+    websocket.receive()
+    websocket.send_json({"type": "connection_terminate"})
+
+    assert websocket.receive() == {"type": "websocket.close", "code": 1000}
+
+    loop.run_until_complete(websocket.task)
+
+
+def test_unsupported_subprotocol(loop):
+    scope = {"type": "websocket", "path": "/graphql", "subprotocols": ["graphql-ts"]}
+    sent = []
+
+    async def receive():
+        return {"type": "websocket.connect"}
+
+    async def send(message):
+        sent.append(message)
+
+    loop.run_until_complete(SubscriptionHandler()(scope)(receive, send))
+
+    assert sent == [{"type": "websocket.close", "code": 1002}]
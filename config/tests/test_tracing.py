@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import pytest
+
+from django.contrib.auth.models import Group
+from django.urls import reverse
+
+from config.handlers import GraphQLHandler
+from config.schema import schema
+from config.tracing import Trace, TracingMiddleware, tracing
+
+QUERY = "query Viewer { viewer { email groups { name } } }"
+
+
+@pytest.fixture
+def traced(settings):
+    settings.GRAPHQL_TRACING = dict(
+        settings.GRAPHQL_TRACING, SAMPLE_RATE=1.0, EXTENSIONS=True
+    )
+
+    return settings.GRAPHQL_TRACING
+
+
+@pytest.fixture
+def groups(user):
+    groups = [Group.objects.create(name=name) for name in ("Admins", "Staff")]
+    user.groups.set(groups)
+
+    return groups
+
+
+def get_resolvers(trace):
+    return [
+        (tuple(resolver["path"]), resolver["parentType"], resolver["returnType"])
+        for resolver in trace["execution"]["resolvers"]
+    ]
+
+
+def test_tracing_extension(client, token, groups, traced):
+    response = client.get(
+        reverse("graphql"), {"query": QUERY}, HTTP_AUTHORIZATION=token
+    )
+    trace = response.json()["extensions"]["tracing"]
+
+    assert trace["version"] == 1
+    assert trace["startTime"].endswith("Z")
+    assert sorted(get_resolvers(trace)) == [
+        (("viewer",), "Query", "UserType"),
+        (("viewer", "email"), "UserType", "String!"),
+        (("viewer", "groups"), "UserType", "[GroupType]"),
+        (("viewer", "groups", 0, "name"), "GroupType", "String!"),
+        (("viewer", "groups", 1, "name"), "GroupType", "String!"),
+    ]
+
+    for resolver in trace["execution"]["resolvers"]:
+        assert 0 <= resolver["startOffset"] <= trace["duration"]
+        assert resolver["duration"] >= 0
+
+    resolvers = {tuple(r["path"]): r for r in trace["execution"]["resolvers"]}
+
+    # The groups are prefetched onto the viewer
+    assert resolvers[("viewer",)]["sqlDuration"] > 0
+    assert resolvers[("viewer", "groups")]["sqlDuration"] == 0
+    assert trace["sqlDuration"] >= resolvers[("viewer",)]["sqlDuration"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_tracing_extension_async(token, groups, traced):
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "POST",
+        "path": "/graphql",
+        "query_string": b"",
+        "server": ("testserver", 80),
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"authorization", token.encode()),
+        ],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps({"query": QUERY}).encode()}
+
+    async def send(message):
+        sent.append(message)
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        loop.run_until_complete(GraphQLHandler()(scope)(receive, send))
+    finally:
+        loop.close()
+
+    trace = json.loads(sent[1]["body"])["extensions"]["tracing"]
+
+    # Recorded in the worker threads running the queries
+    assert trace["sqlDuration"] > 0
+
+
+def test_tracing_extension_disabled(client, traced, settings):
+    settings.GRAPHQL_TRACING = dict(traced, EXTENSIONS=False)
+
+    response = client.get(reverse("graphql"), {"query": QUERY})
+
+    assert "tracing" not in response.json()["extensions"]
+
+
+def test_tracing_not_sampled(client):
+    response = client.get(reverse("graphql"), {"query": QUERY})
+
+    assert "tracing" not in response.json()["extensions"]
+
+
+def test_tracing_sink(client, traced, settings, tmpdir):
+    sink = tmpdir.join("traces.jsonl")
+    settings.GRAPHQL_TRACING = dict(traced, EXTENSIONS=False, SINK=str(sink))
+
+    client.get(reverse("graphql"), {"query": QUERY})
+    client.get(reverse("graphql"), {"query": QUERY})
+
+    records = [json.loads(line) for line in sink.readlines()]
+
+    assert len(records) == 2
+    assert records[0]["operationName"] is None
+    assert get_resolvers(records[0]["tracing"]) == [(("viewer",), "Query", "UserType")]
+
+
+def test_tracing_errors(rf, traced):
+    request = rf.get("/graphql/")
+
+    with tracing(request) as trace:
+        result = schema.execute(
+            QUERY, context_value=request, middleware=[TracingMiddleware()]
+        )
+
+    assert result.errors
+    assert trace.duration is not None
+    assert trace.resolvers[0]["duration"] >= 0
+    assert not hasattr(request, "graphql_trace")
+
+
+def test_trace_paths():
+    trace = Trace()
+    group = Group(name="Staff")
+    groups = [Group(name="Admins"), group]
+
+    trace.end_resolver({"path": ["groups"], "startOffset": 0}, groups)
+
+    assert trace._paths[id(group)] == ["groups", 1]
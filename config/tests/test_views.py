@@ -0,0 +1,221 @@
+import json
+from unittest import mock
+
+import pytest
+
+from django.core.cache import cache
+from django.urls import reverse
+
+from config.documents import get_document_cache, get_query_hash
+from config.persisted_queries import PersistedQueryStore
+from config.schema import schema
+
+QUERY = "query { viewer { email } }"
+
+
+@pytest.fixture
+def persisted_queries(settings, tmpdir):
+    cache.clear()
+
+    manifest = tmpdir.join("persisted_queries.json")
+    manifest.write(json.dumps({get_query_hash(QUERY): QUERY}))
+
+    settings.GRAPHQL_PERSISTED_QUERIES = dict(
+        settings.GRAPHQL_PERSISTED_QUERIES, DOCUMENTS=str(manifest)
+    )
+
+    return settings.GRAPHQL_PERSISTED_QUERIES
+
+
+def post(client, data, **extra):
+    return client.post(
+        reverse("graphql"), json.dumps(data), content_type="application/json", **extra
+    )
+
+
+def extensions(query_hash):
+    return {"persistedQuery": {"version": 1, "sha256Hash": query_hash}}
+
+
+def test_persisted_query(client, user, token, persisted_queries):
+    response = post(
+        client,
+        {"extensions": extensions(get_query_hash(QUERY))},
+        HTTP_AUTHORIZATION=token,
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"] == {"viewer": {"email": user.email}}
+
+
+def test_persisted_query_get(client, persisted_queries):
+    response = client.get(
+        reverse("graphql"),
+        {"extensions": json.dumps(extensions(get_query_hash(QUERY)))},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["data"] == {"viewer": None}
+
+
+def test_persisted_query_not_found(client, persisted_queries):
+    query = "query { viewer { firstName } }"
+
+    response = post(client, {"extensions": extensions(get_query_hash(query))})
+
+    assert response.status_code == 200
+    assert response.json()["errors"] == [{"message": "PersistedQueryNotFound"}]
+
+
+def test_automatic_persisted_query(client, persisted_queries):
+    query = "query { viewer { lastName } }"
+    query_hash = get_query_hash(query)
+
+    response = post(client, {"query": query, "extensions": extensions(query_hash)})
+
+    assert response.json()["data"] == {"viewer": None}
+
+    response = post(client, {"extensions": extensions(query_hash)})
+
+    assert response.json()["data"] == {"viewer": None}
+
+
+def test_automatic_persisted_query_expires(client, settings, persisted_queries):
+    settings.GRAPHQL_PERSISTED_QUERIES = dict(persisted_queries, TIMEOUT=60)
+
+    query = "query { viewer { lastName } }"
+    query_hash = get_query_hash(query)
+
+    store_cache = mock.Mock()
+    store_cache.get.return_value = None
+
+    with mock.patch.object(
+        PersistedQueryStore,
+        "cache",
+        new_callable=mock.PropertyMock,
+        return_value=store_cache,
+    ):
+        post(client, {"query": query, "extensions": extensions(query_hash)})
+
+    store_cache.set.assert_called_once_with(
+        "persisted-query:{}".format(query_hash), query, 60
+    )
+
+
+def test_automatic_persisted_query_too_long(client, settings, persisted_queries):
+    settings.GRAPHQL_PERSISTED_QUERIES = dict(persisted_queries, MAX_QUERY_LENGTH=20)
+
+    query = "query { viewer { lastName } }"
+    query_hash = get_query_hash(query)
+
+    response = post(client, {"query": query, "extensions": extensions(query_hash)})
+
+    assert response.json()["data"] == {"viewer": None}
+
+    response = post(client, {"extensions": extensions(query_hash)})
+
+    assert response.json()["errors"] == [{"message": "PersistedQueryNotFound"}]
+
+
+def test_automatic_persisted_query_hash_mismatch(client, persisted_queries):
+    response = post(
+        client, {"query": QUERY, "extensions": extensions(get_query_hash("query"))}
+    )
+
+    assert response.status_code == 400
+
+
+def test_automatic_persisted_query_invalid(client, persisted_queries):
+    query = "query { viewer { unknown } }"
+    query_hash = get_query_hash(query)
+
+    response = post(client, {"query": query, "extensions": extensions(query_hash)})
+
+    assert response.status_code == 400
+
+    response = post(client, {"extensions": extensions(query_hash)})
+
+    assert response.json()["errors"] == [{"message": "PersistedQueryNotFound"}]
+
+
+def test_allowlist(client, settings, persisted_queries):
+    settings.GRAPHQL_PERSISTED_QUERIES = dict(persisted_queries, ALLOWLIST=True)
+
+    query = "query { viewer { lastName } }"
+
+    response = post(client, {"query": query})
+
+    assert response.status_code == 400
+
+    response = post(
+        client, {"query": query, "extensions": extensions(get_query_hash(query))}
+    )
+
+    assert response.json()["errors"] == [{"message": "PersistedQueryNotSupported"}]
+
+    response = post(client, {"extensions": extensions(get_query_hash(QUERY))})
+
+    assert response.json()["data"] == {"viewer": None}
+
+
+def test_mutation_over_get(client, persisted_queries):
+    query = 'mutation { login(email: "", password: "") { success } }'
+    query_hash = get_query_hash(query)
+
+    post(client, {"query": query, "extensions": extensions(query_hash)})
+
+    response = client.get(
+        reverse("graphql"), {"extensions": json.dumps(extensions(query_hash))}
+    )
+
+    assert response.status_code == 405
+
+
+def test_document_cache(client):
+    document_cache = get_document_cache(schema)
+    document_cache.clear()
+
+    client.get(reverse("graphql"), {"query": QUERY})
+    response = client.get(reverse("graphql"), {"query": QUERY})
+
+    assert response.json()["data"] == {"viewer": None}
+    assert document_cache.info()[:3] == (1, 1, 0)
+
+
+def test_document_cache_syntax_error(client):
+    response = client.get(reverse("graphql"), {"query": "query {"})
+
+    assert response.status_code == 400
+    assert get_document_cache(schema).get(get_query_hash("query {")) is None
+
+
+def test_document_cache_validation_error(client):
+    query = "query { viewer { unknown } }"
+
+    client.get(reverse("graphql"), {"query": query})
+    response = client.get(reverse("graphql"), {"query": query})
+
+    assert response.status_code == 400
+    assert "unknown" in response.json()["errors"][0]["message"]
+
+
+def test_complexity_extensions(client):
+    response = client.get(reverse("graphql"), {"query": QUERY})
+
+    assert response.json()["extensions"] == {
+        "complexity": {"depth": 2, "nodes": 2, "cost": 1}
+    }
+
+
+def test_complexity_limits(client, settings):
+    settings.GRAPHQL_COMPLEXITY = dict(settings.GRAPHQL_COMPLEXITY, MAX_COST=500)
+
+    query = "query { viewer { groups { userSet { email } } } }"
+
+    response = client.get(reverse("graphql"), {"query": query})
+
+    assert response.status_code == 400
+    assert response.json() == {
+        "errors": [{"message": "Query cost of 506 exceeds the maximum of 500"}],
+        "extensions": {"complexity": {"depth": 4, "nodes": 4, "cost": 506}},
+    }
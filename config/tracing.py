@@ -0,0 +1,230 @@
+import json
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache, partial, wraps
+
+from promise import Promise
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.models import QuerySet
+from django.dispatch import receiver
+from django.utils import timezone
+
+SCALARS = (str, bytes, int, float, bool)
+
+
+def format_time(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class Trace(object):
+    """
+    Resolver timings of an operation, in the Apollo tracing format. Durations
+    and offsets are in nanoseconds.
+
+    The SQL time of a query is added to the field whose resolver started last.
+    Queries may be recorded from several threads, see ``recording_sql()``.
+    Before graphql-core exposes the response path to middleware, paths are
+    rebuilt from the objects returned by parent fields, so an object appearing
+    at several places in the response is reported under the last one.
+    """
+
+    def __init__(self):
+        self.start_time = timezone.now()
+        self.start = time.perf_counter()
+        self.end_time = None
+        self.duration = None
+        self.sql_duration = 0
+        self.resolvers = []
+        self._paths = {}
+        self._current = None
+        self._lock = threading.Lock()
+
+    def get_offset(self):
+        return int((time.perf_counter() - self.start) * 1e9)
+
+    def get_path(self, root, info):
+        path = getattr(info, "path", None)
+
+        if path is not None:
+            return list(path)
+
+        field_ast = info.field_asts[0]
+        key = field_ast.alias.value if field_ast.alias else info.field_name
+
+        return self._paths.get(id(root), []) + [key]
+
+    def start_resolver(self, root, info):
+        self._current = {
+            "path": self.get_path(root, info),
+            "parentType": info.parent_type.name,
+            "fieldName": info.field_name,
+            "returnType": str(info.return_type),
+            "startOffset": self.get_offset(),
+            "duration": None,
+            "sqlDuration": 0,
+        }
+        self.resolvers.append(self._current)
+
+        return self._current
+
+    def end_resolver(self, resolver, value):
+        resolver["duration"] = self.get_offset() - resolver["startOffset"]
+
+        if isinstance(value, (list, tuple, QuerySet)):
+            for index, item in enumerate(value):
+                self._paths[id(item)] = resolver["path"] + [index]
+        elif value is not None and not isinstance(value, SCALARS):
+            self._paths[id(value)] = resolver["path"]
+
+        return value
+
+    def fail_resolver(self, resolver, error):
+        self.end_resolver(resolver, None)
+
+        raise error
+
+    def record_sql(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = int((time.perf_counter() - start) * 1e9)
+
+            with self._lock:
+                self.sql_duration += duration
+
+                if self._current is not None:
+                    self._current["sqlDuration"] += duration
+
+    def finish(self):
+        self.duration = self.get_offset()
+        self.end_time = timezone.now()
+
+    def as_extension(self):
+        return {
+            "version": 1,
+            "startTime": format_time(self.start_time),
+            "endTime": format_time(self.end_time),
+            "duration": self.duration,
+            "sqlDuration": self.sql_duration,
+            "execution": {"resolvers": self.resolvers},
+        }
+
+
+class TracingMiddleware(object):
+    """
+    Graphene middleware recording the timings of every resolver of the
+    operations sampled by ``tracing()``. Other operations only pay for an
+    attribute lookup per field.
+    """
+
+    def resolve(self, next, root, info, **args):
+        trace = getattr(info.context, "graphql_trace", None)
+
+        if trace is None:
+            return next(root, info, **args)
+
+        resolver = trace.start_resolver(root, info)
+
+        try:
+            result = next(root, info, **args)
+        except Exception as e:
+            trace.fail_resolver(resolver, e)
+
+        return Promise.resolve(result).then(
+            partial(trace.end_resolver, resolver),
+            partial(trace.fail_resolver, resolver),
+        )
+
+
+class JSONLinesSink(object):
+    """
+    Append traces to a file, one JSON document per line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, cls=DjangoJSONEncoder)
+
+        with self._lock, open(self.path, "a") as sink:
+            sink.write(line + "\n")
+
+
+@lru_cache(maxsize=None)
+def get_trace_sink():
+    path = settings.GRAPHQL_TRACING["SINK"]
+
+    return JSONLinesSink(path) if path else None
+
+
+@receiver(setting_changed)
+def reset_trace_sink(setting, **kwargs):
+    if setting == "GRAPHQL_TRACING":
+        get_trace_sink.cache_clear()
+
+
+def is_sampled():
+    # Sampling, no security implications
+    return random.random() < settings.GRAPHQL_TRACING["SAMPLE_RATE"]  # nosec
+
+
+@contextmanager
+def record_sql(trace):
+    """
+    Record the SQL queries of the current thread within the block.
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(trace.record_sql))
+
+        yield
+
+
+def recording_sql(trace, func):
+    """
+    Wrap a callable so its SQL queries are recorded, in whichever thread it is
+    called. Connections are per thread, so ``tracing()`` only records those of
+    the thread executing the operation.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with record_sql(trace):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def tracing(context, operation_name=None):
+    """
+    Trace the execution of an operation when it is sampled, yielding the trace
+    or ``None``. Finished traces are written to the configured sink.
+    """
+    if context is None or not is_sampled():
+        yield None
+        return
+
+    trace = context.graphql_trace = Trace()
+
+    try:
+        with record_sql(trace):
+            yield trace
+    finally:
+        trace.finish()
+        del context.graphql_trace
+
+    sink = get_trace_sink()
+
+    if sink is not None:
+        sink.write({"operationName": operation_name, "tracing": trace.as_extension()})
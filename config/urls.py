@@ -1,14 +1,19 @@
-from graphene_django.views import GraphQLView
-
 from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path
 from django.views.decorators.csrf import csrf_exempt
 
+# Hands the messages published by the apps to the broker
+from config import pubsub  # noqa: F401
+from config.views import PersistedQueryView
+from klasse.users.views import export_users, jwks
+
 urlpatterns = [
     path(
         "graphql",
-        csrf_exempt(GraphQLView.as_view(graphiql=settings.DEBUG)),
+        csrf_exempt(PersistedQueryView.as_view(graphiql=settings.DEBUG)),
         name="graphql",
-    )
+    ),
+    path("users/export", export_users, name="export_users"),
+    path(".well-known/jwks.json", jwks, name="jwks"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,483 @@
+import json
+
+from graphene_django.views import GraphQLView, HttpError
+from graphql.error import GraphQLError
+from graphql.execution import ExecutionResult
+from graphql.utils.get_operation_ast import get_operation_ast
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+
+from klasse.users.loaders import Loaders
+
+from .complexity import get_complexity_errors
+from .documents import get_document_cache
+from .executors import (
+    DatabaseSyncToAsyncMiddleware,
+    database_sync_to_async,
+    execute_async,
+)
+from .persisted_queries import get_persisted_query_store
+from .response_cache import (
+    CachedResponse,
+    get_cache_policy,
+    get_cached_response,
+    patch_response,
+    set_cached_response,
+)
+from .routers import get_replica, pin_to_primary, reading_sync_to_async, route_operation
+from .tracing import recording_sql, tracing
+
+
+class PersistedQueryError(GraphQLError):
+    pass
+
+
+def get_operation_type(document, operation_name):
+    operation_ast = get_operation_ast(document.document_ast, operation_name)
+
+    return operation_ast.operation if operation_ast else None
+
+
+class ExtendedExecutionResult(ExecutionResult):
+    """
+    Execution result with the ``extensions`` entry of the response.
+    """
+
+    __slots__ = ("extensions",)
+
+    def __init__(self, data=None, errors=None, invalid=False, extensions=None):
+        super(ExtendedExecutionResult, self).__init__(data, errors, invalid)
+        self.extensions = extensions
+
+
+class CachedGraphQLView(GraphQLView):
+    """
+    GraphQL view that keeps parsed and validated documents in an LRU cache, so
+    repeated queries go straight to execution.
+
+    Operations exceeding the ``GRAPHQL_COMPLEXITY`` limits are rejected before
+    execution, and the complexity of every operation is returned in the
+    ``extensions`` of the response, along with the resolver timings of sampled
+    operations when ``GRAPHQL_TRACING["EXTENSIONS"]`` is enabled.
+
+    When ``GRAPHQL_RESPONSE_CACHE`` is enabled, the responses of queries are
+    cached and returned with an ETag, see ``config.response_cache``.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super(CachedGraphQLView, self).dispatch(request, *args, **kwargs)
+
+        return self.patch_response(request, response)
+
+    def patch_response(self, request, response):
+        cached_response = getattr(request, "cached_response", None)
+
+        if cached_response is None or response.status_code != 200:
+            return response
+
+        return patch_response(request, response, cached_response)
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        request.cache_policy = request.cached_response = None
+
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+
+        if isinstance(execution_result, CachedResponse):
+            return execution_result.content, 200
+
+        result, status_code = self.format_response(
+            request, execution_result, id, show_graphiql
+        )
+
+        if self.is_cacheable(request, execution_result, status_code):
+            request.cached_response = set_cached_response(
+                request.cache_policy,
+                self.get_cached_content(request, execution_result, id, result),
+            )
+
+        return result, status_code
+
+    def is_cacheable(self, request, execution_result, status_code):
+        return (
+            request.cache_policy is not None
+            and status_code == 200
+            and not execution_result.errors
+        )
+
+    def get_cached_content(self, request, execution_result, id, result):
+        """
+        Return the content to cache for a formatted response. Traces time a
+        single execution, so they are left out rather than replayed by hits.
+        """
+        extensions = getattr(execution_result, "extensions", None) or {}
+
+        if "tracing" not in extensions:
+            return result
+
+        execution_result = ExtendedExecutionResult(
+            execution_result.data,
+            execution_result.errors,
+            execution_result.invalid,
+            extensions={
+                key: value for key, value in extensions.items() if key != "tracing"
+            },
+        )
+
+        return self.format_response(request, execution_result, id)[0]
+
+    def get_cached_response(
+        self, request, document, variables, operation_name, show_graphiql=False
+    ):
+        """
+        Return the cached response of an operation, if any, keeping its cache
+        policy on the request. Batches are not cached.
+        """
+        if self.batch or show_graphiql:
+            return None
+
+        request.cache_policy = get_cache_policy(
+            request, document, operation_name, variables
+        )
+
+        if request.cache_policy is None:
+            return None
+
+        request.cached_response = get_cached_response(request.cache_policy)
+
+        return request.cached_response
+
+    def format_response(self, request, execution_result, id, show_graphiql=False):
+        if not execution_result:
+            return None, 200
+
+        status_code = 200
+        response = {}
+
+        if execution_result.errors:
+            response["errors"] = [self.format_error(e) for e in execution_result.errors]
+
+        if execution_result.invalid:
+            status_code = 400
+        else:
+            response["data"] = execution_result.data
+
+        if getattr(execution_result, "extensions", None):
+            response["extensions"] = execution_result.extensions
+
+        if self.batch:
+            response["id"] = id
+            response["status"] = status_code
+
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def get_document(self, request, data, query, show_graphiql=False):
+        if not query:
+            if show_graphiql:
+                return None
+
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        return get_document_cache(self.schema).get_or_compile(self.schema, query)
+
+    def get_operation(self, request, data, query, operation_name, show_graphiql=False):
+        """
+        Return the document of the operation to execute along with the
+        extensions of its response, or the result of a rejected operation.
+        """
+        try:
+            document = self.get_document(request, data, query, show_graphiql)
+        except PersistedQueryError as e:
+            return None, None, ExecutionResult(errors=[e])
+        except HttpError:
+            raise
+        except Exception as e:
+            return None, None, ExecutionResult(errors=[e], invalid=True)
+
+        if document is None:
+            return None, None, None
+
+        if document.errors:
+            return None, None, ExecutionResult(errors=document.errors, invalid=True)
+
+        operation_ast = get_operation_ast(document.document_ast, operation_name)
+
+        if request.method.lower() == "get":
+            if operation_ast and operation_ast.operation != "query":
+                if show_graphiql:
+                    return None, None, None
+
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["POST"],
+                        "Can only perform a {} operation from a POST request.".format(
+                            operation_ast.operation
+                        ),
+                    )
+                )
+
+        extensions = {}
+
+        if operation_ast:
+            name = operation_ast.name.value if operation_ast.name else None
+            complexity = document.complexity[name]
+            extensions["complexity"] = complexity._asdict()
+            errors = get_complexity_errors(complexity)
+
+            if errors:
+                return (
+                    None,
+                    None,
+                    ExtendedExecutionResult(
+                        errors=errors, invalid=True, extensions=extensions
+                    ),
+                )
+
+        return document, extensions, None
+
+    def get_execution_result(self, result, trace, extensions):
+        if trace is not None and settings.GRAPHQL_TRACING["EXTENSIONS"]:
+            extensions["tracing"] = trace.as_extension()
+
+        return ExtendedExecutionResult(
+            result.data, result.errors, result.invalid, extensions=extensions
+        )
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        document, extensions, result = self.get_operation(
+            request, data, query, operation_name, show_graphiql
+        )
+
+        if document is None:
+            return result
+
+        cached_response = self.get_cached_response(
+            request, document, variables, operation_name, show_graphiql
+        )
+
+        if cached_response is not None:
+            return cached_response
+
+        context = self.get_context(request)
+        operation = get_operation_type(document, operation_name)
+
+        with tracing(context, operation_name) as trace, route_operation(
+            request, operation
+        ):
+            try:
+                result = self.execute(
+                    document.document_ast,
+                    root_value=self.get_root_value(request),
+                    variable_values=variables,
+                    operation_name=operation_name,
+                    context_value=context,
+                    middleware=self.get_middleware(request),
+                    executor=self.executor,
+                )
+            except Exception as e:
+                return ExecutionResult(errors=[e], invalid=True)
+
+        return self.get_execution_result(result, trace, extensions)
+
+
+class PersistedQueryView(CachedGraphQLView):
+    """
+    GraphQL view that accepts the SHA-256 hash of a persisted document instead
+    of its text, following the automatic persisted queries protocol.
+
+    Persisted documents are parsed and validated once, so requests for them go
+    straight to execution. In allowlist mode only the documents listed in the
+    manifest are executed.
+    """
+
+    def get_persisted_query_hash(self, request, data):
+        extensions = request.GET.get("extensions") or data.get("extensions")
+
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+
+        persisted_query = (extensions or {}).get("persistedQuery")
+
+        if not persisted_query:
+            return None
+
+        if persisted_query.get("version") != 1:
+            raise HttpError(
+                HttpResponseBadRequest("Unsupported persisted query version.")
+            )
+
+        return persisted_query.get("sha256Hash")
+
+    def get_document(self, request, data, query, show_graphiql=False):
+        config = settings.GRAPHQL_PERSISTED_QUERIES
+        store = get_persisted_query_store(self.schema)
+        query_hash = self.get_persisted_query_hash(request, data)
+
+        if query_hash is None:
+            if config["ALLOWLIST"]:
+                raise HttpError(
+                    HttpResponseBadRequest("Only persisted queries are allowed.")
+                )
+
+            return super(PersistedQueryView, self).get_document(
+                request, data, query, show_graphiql
+            )
+
+        document = store.get(query_hash)
+
+        if document is not None:
+            return document
+
+        if config["ALLOWLIST"] or not config["AUTOMATIC"]:
+            raise PersistedQueryError("PersistedQueryNotSupported")
+
+        if not query:
+            raise PersistedQueryError("PersistedQueryNotFound")
+
+        try:
+            return store.register(query_hash, query)
+        except ValueError as e:
+            raise HttpError(HttpResponseBadRequest(str(e)))
+
+
+class AsyncGraphQLView(PersistedQueryView):
+    """
+    GraphQL view for the ASGI handler. Operations are executed by the asyncio
+    executor, with the database queries of resolvers running in the thread
+    pool, so a worker serves other requests while waiting on the database.
+
+    GraphiQL is only served by the WSGI view.
+    """
+
+    def get_middleware(self, request):
+        # Innermost, so the tracing middleware times the thread pool hop too
+        return [DatabaseSyncToAsyncMiddleware(request.run)] + list(
+            self.middleware or ()
+        )
+
+    def get_run(self, read_database, trace):
+        """
+        Return the thread pool runner of an operation, sending its reads to
+        ``read_database`` and recording its SQL queries in ``trace``.
+        """
+        run = reading_sync_to_async(read_database)
+
+        if trace is None:
+            return run
+
+        return lambda func: run(recording_sql(trace, func))
+
+    async def dispatch_async(self, request):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["GET", "POST"], "GraphQL only supports GET and POST requests."
+                    )
+                )
+
+            data = self.parse_body(request)
+
+            if self.batch:
+                responses = [
+                    await self.get_response_async(request, entry) for entry in data
+                ]
+                result = "[{}]".format(",".join(response[0] for response in responses))
+                status_code = max(response[1] for response in responses)
+            else:
+                result, status_code = await self.get_response_async(request, data)
+
+            return self.patch_response(
+                request,
+                HttpResponse(
+                    status=status_code, content=result, content_type="application/json"
+                ),
+            )
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(
+                request, {"errors": [self.format_error(e)]}
+            )
+
+            return response
+
+    async def get_response_async(self, request, data):
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        request.cache_policy = request.cached_response = None
+
+        execution_result = await self.execute_graphql_request_async(
+            request, data, query, variables, operation_name
+        )
+
+        if isinstance(execution_result, CachedResponse):
+            return execution_result.content, 200
+
+        result, status_code = self.format_response(request, execution_result, id)
+
+        if self.is_cacheable(request, execution_result, status_code):
+            request.cached_response = await database_sync_to_async(set_cached_response)(
+                request.cache_policy,
+                self.get_cached_content(request, execution_result, id, result),
+            )
+
+        return result, status_code
+
+    async def execute_graphql_request_async(
+        self, request, data, query, variables, operation_name
+    ):
+        document, extensions, result = self.get_operation(
+            request, data, query, operation_name
+        )
+
+        if document is None:
+            return result
+
+        if settings.GRAPHQL_RESPONSE_CACHE["ENABLED"]:
+            cached_response = await database_sync_to_async(self.get_cached_response)(
+                request, document, variables, operation_name
+            )
+
+            if cached_response is not None:
+                return cached_response
+
+        context = self.get_context(request)
+        operation = get_operation_type(document, operation_name)
+        routing = bool(settings.DATABASE_ROUTING["REPLICAS"])
+        read_database = None
+
+        if routing:
+            read_database = await database_sync_to_async(get_replica)(
+                request, operation
+            )
+
+        with tracing(context, operation_name) as trace:
+            # Resolvers and the batches of the DataLoaders run in the thread pool
+            request.run = self.get_run(read_database, trace)
+            context.loaders = Loaders(run=request.run)
+
+            try:
+                result = await execute_async(
+                    self.schema,
+                    document.document_ast,
+                    root_value=self.get_root_value(request),
+                    variable_values=variables,
+                    operation_name=operation_name,
+                    context_value=context,
+                    middleware=self.get_middleware(request),
+                )
+            except Exception as e:
+                return ExecutionResult(errors=[e], invalid=True)
+            finally:
+                if routing and operation == "mutation":
+                    await database_sync_to_async(pin_to_primary)(request)
+
+        return self.get_execution_result(result, trace, extensions)
@@ -1,9 +1,41 @@
 import pytest
 
+from django.conf import settings
+from django.core.cache import caches
+
 from config.schema import schema as graphql_schema
+from klasse.users.throttling import get_throttle_store
+from klasse.users.tokens import get_token_cache
 from klasse.users.utils import jwt_encode_handler, jwt_payload_handler
 
 
+@pytest.fixture(autouse=True)
+def token_cache():
+    token_cache = get_token_cache()
+
+    if token_cache is not None:
+        token_cache.clear()
+
+    return token_cache
+
+
+@pytest.fixture(autouse=True)
+def user_cache():
+    # Rows are removed without signals between transactional tests
+    user_cache = caches[settings.USER_CACHE["CACHE_ALIAS"]]
+    user_cache.clear()
+
+    return user_cache
+
+
+@pytest.fixture(autouse=True)
+def throttle_store():
+    throttle_store = get_throttle_store()
+    throttle_store.clear()
+
+    return throttle_store
+
+
 @pytest.fixture(scope="session")
 def schema():
     return graphql_schema
@@ -0,0 +1,32 @@
+from django.contrib.auth import backends, get_user_model
+
+from .hashing import check_password, get_hashing_service
+from .identity import get_identity_map
+
+
+class ModelBackend(backends.ModelBackend):
+    """
+    Authenticate against the user model, verifying passwords in the hashing
+    service instead of the request thread. Users are looked up in the identity
+    map of the request, when there is one, which loads them from the primary
+    database unless the request is authenticated by the same user.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+
+        try:
+            if request is not None:
+                user = get_identity_map(request).get_by_email(username)
+            else:
+                user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user.
+            get_hashing_service().make_password(password)
+        else:
+            if check_password(user, password) and self.user_can_authenticate(user):
+                return user
@@ -0,0 +1,211 @@
+"""
+Cache-aside reads of users by id and by email.
+
+Users are cached as snapshots of their fields under ``users:<VERSION>:id:<pk>``,
+tagged with the generation of the user at ``users:<VERSION>:generation:<pk>``
+when they were loaded. Saving or deleting a user replaces its generation, so
+older snapshots are ignored, including those written back by reads racing with
+the change. Emails map to the id of their user under
+``users:<VERSION>:email:<hash>``, and are checked against the snapshot.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router, transaction
+from django.utils.encoding import force_bytes
+
+from .managers import get_normalized_email
+
+# Seconds between checks for the result of another worker's load
+LOCK_POLL_INTERVAL = 0.01
+
+
+def get_cache():
+    return caches[settings.USER_CACHE["CACHE_ALIAS"]]
+
+
+def make_key(kind, value):
+    return "users:{}:{}:{}".format(settings.USER_CACHE["VERSION"], kind, value)
+
+
+def get_id_key(pk):
+    return make_key("id", pk)
+
+
+def get_generation_key(pk):
+    return make_key("generation", pk)
+
+
+def get_email_key(normalized_email):
+    return make_key("email", hashlib.sha1(force_bytes(normalized_email)).hexdigest())
+
+
+def single_flight(key, read, load):
+    """
+    Return ``read()``, or the result of ``load()`` when it returns ``None``.
+    Only one caller at a time loads a key, across all workers sharing the
+    cache; the others poll ``read()`` meanwhile, and load it themselves after
+    ``LOCK_TIMEOUT`` seconds.
+    """
+    value = read()
+
+    if value is not None:
+        return value
+
+    cache = get_cache()
+    lock_key = "{}:lock".format(key)
+    lock_timeout = settings.USER_CACHE["LOCK_TIMEOUT"]
+    deadline = time.monotonic() + lock_timeout
+
+    while not cache.add(lock_key, True, lock_timeout):
+        if time.monotonic() >= deadline:
+            return load()
+
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = read()
+
+        if value is not None:
+            return value
+
+    try:
+        # Loaded by the previous holder of the lock
+        value = read()
+
+        return load() if value is None else value
+    finally:
+        cache.delete(lock_key)
+
+
+def get_generation(pk):
+    cache = get_cache()
+    key = get_generation_key(pk)
+    generation = cache.get(key)
+
+    if generation is None:
+        generation = uuid.uuid4().hex
+
+        if not cache.add(key, generation, settings.USER_CACHE["TIMEOUT"]):
+            generation = cache.get(key)
+
+    return generation
+
+
+def get_primary_manager():
+    # Replicas may lag behind the invalidations
+    User = get_user_model()
+
+    return User._default_manager.db_manager(router.db_for_write(User))
+
+
+def is_cacheable(manager):
+    # Rows read within a transaction may be rolled back
+    return not transaction.get_connection(manager.db).in_atomic_block
+
+
+def get_user_by_id(pk):
+    """
+    Return the user with the given primary key, from the cache when possible.
+    Raise ``DoesNotExist`` when there is no such user.
+    """
+    User = get_user_model()
+    config = settings.USER_CACHE
+
+    if not config["ENABLED"]:
+        return User._default_manager.get(pk=pk)
+
+    cache = get_cache()
+    key, generation_key = get_id_key(pk), get_generation_key(pk)
+
+    def read():
+        entries = cache.get_many([key, generation_key])
+        entry, generation = entries.get(key), entries.get(generation_key)
+
+        if entry is None or generation is None or entry[0] != generation:
+            return None
+
+        return User.from_db(*entry[1])
+
+    def load():
+        manager = get_primary_manager()
+        generation = get_generation(pk)
+        user = manager.get(pk=pk)
+
+        if is_cacheable(manager):
+            field_names = [field.attname for field in User._meta.concrete_fields]
+            snapshot = (
+                user._state.db,
+                field_names,
+                [getattr(user, field_name) for field_name in field_names],
+            )
+            cache.set(key, (generation, snapshot), config["TIMEOUT"])
+
+        return user
+
+    return single_flight(key, read, load)
+
+
+def get_user_by_email(email):
+    """
+    Return the user with the given email address, compared in normalized form,
+    from the cache when possible. Raise ``DoesNotExist`` when there is no such
+    user.
+    """
+    User = get_user_model()
+    config = settings.USER_CACHE
+
+    if not config["ENABLED"]:
+        return User._default_manager.get_by_email(email)
+
+    cache = get_cache()
+    normalized_email = get_normalized_email(email)
+    key = get_email_key(normalized_email)
+    pk = cache.get(key)
+
+    if pk is not None:
+        try:
+            user = get_user_by_id(pk)
+        except User.DoesNotExist:
+            pass
+        else:
+            # The address may have moved to another user since
+            if user.normalized_email == normalized_email:
+                return user
+
+        cache.delete(key)
+
+    def load():
+        manager = get_primary_manager()
+        pk = (
+            manager.filter(normalized_email=normalized_email)
+            .values_list("pk", flat=True)
+            .first()
+        )
+
+        if pk is None:
+            raise User.DoesNotExist("User matching query does not exist.")
+
+        if is_cacheable(manager):
+            cache.set(key, pk, config["TIMEOUT"])
+
+        return pk
+
+    return get_user_by_id(single_flight(key, lambda: cache.get(key), load))
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Receiver of ``post_save`` and ``post_delete``, replacing the generation of
+    the user so its cached snapshots are ignored.
+    """
+    cache = get_cache()
+    key = get_generation_key(instance.pk)
+    timeout = settings.USER_CACHE["TIMEOUT"]
+
+    # Replace it again once the change is committed, in case the previous
+    # row was read and cached by another request in between.
+    cache.set(key, uuid.uuid4().hex, timeout)
+    transaction.on_commit(lambda: cache.set(key, uuid.uuid4().hex, timeout))
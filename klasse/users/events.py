@@ -0,0 +1,70 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.dispatch import Signal
+
+# Sent with the messages to hand to the subscribers of a channel, see
+# config.pubsub
+message_published = Signal(providing_args=["channel", "message"])
+
+logger = logging.getLogger(__name__)
+
+
+def get_user_channel(pk):
+    return "user:{}".format(pk)
+
+
+def publish(channel, message):
+    """
+    Send ``message_published``, logging failures instead of raising them, as
+    the change was already committed.
+    """
+    responses = message_published.send_robust(
+        sender=get_user_model(), channel=channel, message=message
+    )
+
+    for receiver, response in responses:
+        if isinstance(response, Exception):
+            logger.error(
+                "Publishing to %s failed: %s", channel, response, exc_info=response
+            )
+
+
+def publish_user_changed(user):
+    """
+    Notify the subscribers of the user once the current transaction commits.
+    """
+    channel = get_user_channel(user.pk)
+    message = {"id": str(user.pk), "token_version": user.token_version}
+
+    transaction.on_commit(lambda: publish(channel, message))
+
+
+async def iter_user_changes(broker, user, run):
+    """
+    Yield the user, freshly loaded by a callable wrapped with ``run``, every
+    time it is changed. Ends when the user is deleted, and fails once the
+    tokens it was authenticated with are revoked.
+    """
+    subscription = broker.subscribe(get_user_channel(user.pk))
+    queryset = get_user_model().objects.filter(pk=user.pk)
+
+    try:
+        async for message in subscription:
+            if message["token_version"] != user.token_version:
+                raise PermissionDenied("Token revoked")
+
+            changed = await run(queryset.first)()
+
+            if changed is None:
+                return
+
+            # Revoked by a change published after this one
+            if changed.token_version != user.token_version:
+                raise PermissionDenied("Token revoked")
+
+            yield changed
+    finally:
+        subscription.close()
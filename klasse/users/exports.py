@@ -0,0 +1,103 @@
+import csv
+import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = (
+    "id",
+    "email",
+    "first_name",
+    "middle_name",
+    "last_name",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "last_login",
+    "date_joined",
+    "created",
+    "modified",
+)
+
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class Echo(object):
+    """
+    File-like object returning what is written to it, so ``csv.writer`` can
+    format rows without buffering them.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields=EXPORT_FIELDS, chunk_size=None):
+    """
+    Yield the values of the given fields row by row, fetching ``chunk_size`` rows
+    at a time through a server-side cursor where the database supports it.
+    """
+    return (
+        queryset.order_by()
+        .values_list(*fields)
+        .iterator(chunk_size=chunk_size or settings.USER_EXPORT["CHUNK_SIZE"])
+    )
+
+
+def format_ndjson(rows, fields):
+    encoder = DjangoJSONEncoder()
+
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + "\n"
+
+
+def format_csv(rows, fields):
+    writer = csv.writer(Echo())
+
+    yield writer.writerow(fields)
+
+    for row in rows:
+        yield writer.writerow(
+            [
+                value.isoformat() if isinstance(value, datetime.datetime) else value
+                for value in row
+            ]
+        )
+
+
+formatters = {"ndjson": format_ndjson, "csv": format_csv}
+
+
+class Export(object):
+    """
+    Iterate over the users of a queryset as NDJSON or CSV, in pieces of
+    ``chunk_size`` rows, holding only one chunk in memory at a time. ``rows``
+    counts the rows exported so far.
+    """
+
+    def __init__(
+        self, queryset, format="ndjson", fields=EXPORT_FIELDS, chunk_size=None
+    ):
+        self.queryset = queryset
+        self.format = format
+        self.fields = fields
+        self.chunk_size = chunk_size or settings.USER_EXPORT["CHUNK_SIZE"]
+        self.rows = 0
+
+    def iter_rows(self):
+        for row in iter_rows(self.queryset, self.fields, self.chunk_size):
+            self.rows += 1
+            yield row
+
+    def __iter__(self):
+        buffer = []
+
+        for line in formatters[self.format](self.iter_rows(), self.fields):
+            buffer.append(line)
+
+            if len(buffer) >= self.chunk_size:
+                yield "".join(buffer)
+                buffer = []
+
+        if buffer:
+            yield "".join(buffer)
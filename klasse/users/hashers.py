@@ -0,0 +1,59 @@
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.utils.crypto import pbkdf2
+
+CALIBRATION_ITERATIONS = 10000
+CALIBRATION_ROUNDS = 3
+
+
+@lru_cache(maxsize=None)
+def calibrate(target_ms, min_iterations):
+    """
+    Return the number of PBKDF2-SHA256 iterations that take ``target_ms`` on this
+    machine, but never fewer than ``min_iterations``.
+    """
+    elapsed = min(
+        time_pbkdf2(CALIBRATION_ITERATIONS) for _ in range(CALIBRATION_ROUNDS)
+    )
+    iterations = int(CALIBRATION_ITERATIONS * target_ms / 1000 / elapsed)
+
+    return max(min_iterations, iterations - iterations % 1000)
+
+
+def time_pbkdf2(iterations):
+    start = time.perf_counter()
+    pbkdf2("calibration", "calibration", iterations)
+
+    return time.perf_counter() - start
+
+
+class BudgetedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 hasher with as many iterations as fit in the CPU budget set by
+    ``PASSWORD_HASHING["TARGET_MS"]``, measured on the first use in a process.
+
+    Stored hashes that are too cheap (a security problem) or too expensive (a
+    latency problem) are re-hashed on the next successful login. Hashes within
+    ``TOLERANCE`` of the target are left alone, so small differences between
+    machines don't re-hash every password.
+    """
+
+    @property
+    def iterations(self):
+        config = settings.PASSWORD_HASHING
+
+        return calibrate(config["TARGET_MS"], config["MIN_ITERATIONS"])
+
+    def must_update(self, encoded):
+        algorithm, iterations, salt, hash = encoded.split("$", 3)
+        tolerance = settings.PASSWORD_HASHING["TOLERANCE"]
+        lower = max(
+            self.iterations * (1 - tolerance),
+            settings.PASSWORD_HASHING["MIN_ITERATIONS"],
+        )
+        upper = self.iterations * (1 + tolerance)
+
+        return not lower <= int(iterations) <= upper
@@ -0,0 +1,145 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .metrics import timer
+
+
+class HashingServiceBusy(Exception):
+    pass
+
+
+def verify_password(password, encoded):
+    """
+    Return whether the password matches the encoded hash, and whether the hash
+    should be upgraded to the preferred hasher.
+    """
+    updates = []
+    is_correct = hashers.check_password(password, encoded, setter=updates.append)
+
+    return is_correct, bool(updates)
+
+
+class HashingService(object):
+    """
+    Run password hashing in a pool of processes, so hashes don't hold the GIL
+    of the server processes and their other threads keep serving requests.
+    The calling thread still waits for the result: under WSGI a login keeps
+    its request worker busy until its password is hashed.
+
+    At most ``max_pending`` hashes are queued or running at a time. Callers wait
+    up to ``timeout`` seconds for a slot before ``HashingServiceBusy`` is raised,
+    and as long for the hash. A hash keeps its slot until it is done, even when
+    its caller stopped waiting, as running hashes can't be cancelled.
+    Without workers, hashes are computed in the calling thread.
+    """
+
+    def __init__(self, workers=0, max_pending=32, timeout=5):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        # Created on first use, so the pool is started in each server process
+        # rather than inherited from the parent.
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+
+            return self._pool
+
+    def _release(self, future=None):
+        self._slots.release()
+
+    def run(self, func, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingServiceBusy("Too many passwords are being hashed")
+
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._release()
+
+        try:
+            future = self.pool.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Only hashes still queued are cancelled
+            future.cancel()
+            raise HashingServiceBusy("Hashing the password timed out")
+
+    def check_password(self, password, encoded):
+        with timer("hashing.verify"):
+            return self.run(verify_password, password, encoded)
+
+    def make_password(self, password):
+        with timer("hashing.hash"):
+            return self.run(hashers.make_password, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+@lru_cache(maxsize=None)
+def get_hashing_service():
+    config = settings.PASSWORD_HASHING
+
+    return HashingService(
+        workers=config["WORKERS"],
+        max_pending=config["MAX_PENDING"],
+        timeout=config["TIMEOUT"],
+    )
+
+
+@receiver(setting_changed)
+def reset_hashing_service(setting, **kwargs):
+    if setting == "PASSWORD_HASHING":
+        get_hashing_service().shutdown()
+        get_hashing_service.cache_clear()
+
+
+def check_password(user, password):
+    """
+    Check the user's password in the hashing service, upgrading the stored hash
+    like ``AbstractBaseUser.check_password`` does.
+    """
+    is_correct, must_update = get_hashing_service().check_password(
+        password, user.password
+    )
+
+    if is_correct and must_update:
+        # Upgrading the hash keeps the password, and the tokens
+        user.password = get_hashing_service().make_password(password)
+        user.save(update_fields=["password"])
+
+    return is_correct
+
+
+def set_password(user, password):
+    """
+    Hash the password in the hashing service, like ``set_password()``. Saving
+    the user then revokes its tokens.
+    """
+    user.password = get_hashing_service().make_password(password)
+    user._password = password
+    user._password_changed = True
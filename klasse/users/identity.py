@@ -0,0 +1,108 @@
+import threading
+
+from django.contrib.auth import get_user_model
+
+from .caching import get_primary_manager
+from .managers import get_normalized_email
+
+_lock = threading.Lock()
+
+
+class IdentityMap(object):
+    """
+    Users loaded within a single request, by primary key and by normalized
+    email, so every row is fetched at most once per request and every lookup
+    returns the same instance. Misses are loaded from the primary database,
+    never from a cache, so users looked up to authenticate them or to write
+    them are current.
+
+    Users authenticating the request may come from a cache instead, and are
+    added as snapshots. Lookups with ``current`` reload a snapshot from the
+    primary, in place, before it is written.
+    """
+
+    def __init__(self):
+        self._users = {}
+        self._emails = {}
+        self._snapshots = set()
+        # Reentrant, so concurrent lookups of a user wait for a single load
+        self._lock = threading.RLock()
+
+    def add(self, user, snapshot=False):
+        """
+        Add a user loaded elsewhere, and return the instance of the map. A
+        current row added for a snapshot updates its fields in place.
+        """
+        with self._lock:
+            instance = self._users.setdefault(user.pk, user)
+
+            if instance is user:
+                if snapshot:
+                    self._snapshots.add(user.pk)
+            elif not snapshot and user.pk in self._snapshots:
+                for field in user._meta.concrete_fields:
+                    setattr(instance, field.attname, getattr(user, field.attname))
+
+                instance._state.db = user._state.db
+                self._snapshots.discard(user.pk)
+
+            # Left deferred by users built from the claims of a token
+            if "normalized_email" not in instance.get_deferred_fields():
+                self._emails[instance.normalized_email] = instance.pk
+
+            return instance
+
+    def __len__(self):
+        return len(self._users)
+
+    def get_by_id(self, pk, current=False):
+        pk = get_user_model()._meta.pk.to_python(pk)
+
+        with self._lock:
+            user = self._users.get(pk)
+
+            if user is None or (current and pk in self._snapshots):
+                user = self.add(get_primary_manager().get(pk=pk))
+
+            return user
+
+    def get_by_email(self, email, current=False):
+        normalized_email = get_normalized_email(email)
+
+        with self._lock:
+            user = self._users.get(self._emails.get(normalized_email))
+
+            # The address may have been changed within the request
+            if (
+                user is None
+                or user.normalized_email != normalized_email
+                or (current and user.pk in self._snapshots)
+            ):
+                user = self.add(get_primary_manager().get_by_email(email))
+
+            return user
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._emails.clear()
+            self._snapshots.clear()
+
+
+def get_identity_map(request):
+    """
+    Return the identity map of a request, creating it on first use.
+    """
+    if request is None:
+        return IdentityMap()
+
+    identity_map = getattr(request, "identity_map", None)
+
+    if identity_map is None:
+        with _lock:
+            identity_map = getattr(request, "identity_map", None)
+
+            if identity_map is None:
+                identity_map = request.identity_map = IdentityMap()
+
+    return identity_map
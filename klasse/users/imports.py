@@ -0,0 +1,108 @@
+import csv
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from .managers import get_normalized_email
+from .utils import parse_name
+
+
+def read_rows(path):
+    """
+    Yield the rows of a CSV file with a header line, or of a JSON lines file.
+    """
+    with open(path, newline="") as source:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(source)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def hash_password(password):
+    return make_password(password or None)
+
+
+def get_existing_emails(emails):
+    """
+    Return which of the given normalized emails are registered.
+    """
+    return set(
+        get_user_model()
+        .objects.filter(normalized_email__in=emails)
+        .values_list("normalized_email", flat=True)
+    )
+
+
+def import_batch(rows, map_passwords=map):
+    """
+    Create the users of a batch of rows with a single insert and return the
+    number of users created. Rows whose email is already registered, or repeated
+    within the batch, are skipped.
+
+    Passwords are hashed with ``map_passwords``, which can be the ``map`` of a
+    process pool to spread the hashing over several cores.
+    """
+    User = get_user_model()
+    unique_rows = {}
+
+    for row in rows:
+        email = User.objects.normalize_email(row.get("email", "").strip())
+
+        if email:
+            unique_rows.setdefault(get_normalized_email(email), (email, row))
+
+    existing = get_existing_emails(list(unique_rows))
+    new_rows = [
+        (normalized_email, email, row)
+        for normalized_email, (email, row) in unique_rows.items()
+        if normalized_email not in existing
+    ]
+    passwords = map_passwords(
+        hash_password, [row.get("password") for _, _, row in new_rows]
+    )
+
+    # bulk_create() doesn't call save(), which normalizes the email
+    users = [
+        User(
+            email=email,
+            normalized_email=normalized_email,
+            password=password,
+            is_active=str(row.get("is_active", "")).lower() in ("1", "true", "yes"),
+            **parse_name(row.get("name", ""))
+        )
+        for (normalized_email, email, row), password in zip(new_rows, passwords)
+    ]
+
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+    except IntegrityError:
+        # Some emails were registered after the lookup above, fall back to
+        # inserting the batch row by row.
+        return sum(create_user(user) for user in users)
+
+    return len(users)
+
+
+def create_user(user):
+    try:
+        with transaction.atomic():
+            user.save(force_insert=True)
+    except IntegrityError:
+        return False
+
+    return True
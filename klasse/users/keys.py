@@ -0,0 +1,115 @@
+import json
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+from jwt.algorithms import get_default_algorithms
+from jwt.utils import base64url_encode
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+SigningKey = namedtuple("SigningKey", ("kid", "algorithm", "private_key", "public_key"))
+
+CURVES = {"secp256r1": "P-256", "secp384r1": "P-384", "secp521r1": "P-521"}
+
+
+def load_key(kid, algorithm, private_key=None, public_key=None):
+    """
+    Load a key from PEM text. Keys without a private key only verify tokens,
+    and the public key is derived from the private key when it isn't given.
+    """
+    try:
+        prepare_key = get_default_algorithms()[algorithm].prepare_key
+    except KeyError:
+        raise ImproperlyConfigured(
+            "Unsupported algorithm {} for key {}, asymmetric algorithms require "
+            "the cryptography package".format(algorithm, kid)
+        )
+
+    if private_key is not None:
+        private_key = prepare_key(private_key)
+
+    if public_key is not None:
+        public_key = prepare_key(public_key)
+    elif private_key is not None:
+        public_key = private_key.public_key()
+    else:
+        raise ImproperlyConfigured("Key {} has no public key".format(kid))
+
+    return SigningKey(kid, algorithm, private_key, public_key)
+
+
+def get_jwk(key):
+    """
+    Return the public JSON Web Key of an RSA or elliptic curve key.
+    """
+    numbers = key.public_key.public_numbers()
+
+    if hasattr(numbers, "curve"):
+        size = (numbers.curve.key_size + 7) // 8
+        jwk = {
+            "kty": "EC",
+            "crv": CURVES[numbers.curve.name],
+            "x": base64url_encode(numbers.x.to_bytes(size, "big")).decode("ascii"),
+            "y": base64url_encode(numbers.y.to_bytes(size, "big")).decode("ascii"),
+        }
+    else:
+        jwk = json.loads(get_default_algorithms()["RS256"].to_jwk(key.public_key))
+        jwk.pop("key_ops", None)
+
+    return dict(jwk, kid=key.kid, alg=key.algorithm, use="sig")
+
+
+class KeySet(object):
+    """
+    The keys tokens are verified with, keyed by their ``kid``, and the key new
+    tokens are signed with.
+    """
+
+    def __init__(self, keys=(), signing_kid=None):
+        self.keys = OrderedDict((key.kid, key) for key in keys)
+
+        if signing_kid is not None and (
+            signing_kid not in self.keys or self.keys[signing_kid].private_key is None
+        ):
+            raise ImproperlyConfigured(
+                "Signing key {} has no private key".format(signing_kid)
+            )
+
+        self.signing_key = self.keys.get(signing_kid)
+        self._jwks = {"keys": [get_jwk(key) for key in self.keys.values()]}
+
+    def get(self, kid):
+        return self.keys.get(kid)
+
+    def get_jwks(self):
+        return self._jwks
+
+
+@lru_cache(maxsize=None)
+def get_key_set():
+    """
+    Return the keys configured by ``JWT_KEYS``, loaded once per process.
+    """
+    config = settings.JWT_KEYS
+
+    return KeySet(
+        [
+            load_key(
+                key["KID"],
+                key["ALGORITHM"],
+                private_key=key.get("PRIVATE_KEY"),
+                public_key=key.get("PUBLIC_KEY"),
+            )
+            for key in config["KEYS"]
+        ],
+        signing_kid=config["SIGNING_KEY"],
+    )
+
+
+@receiver(setting_changed)
+def reset_key_set(setting, **kwargs):
+    if setting == "JWT_KEYS":
+        get_key_set.cache_clear()
@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+from promise import Promise
+from promise.dataloader import DataLoader
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+
+
+class ManyToManyLoader(DataLoader):
+    """
+    Load the related objects of a many-to-many field for a batch of primary keys
+    with a single query on the through table.
+
+    ``run`` wraps the query of a batch, e.g. to run it in the thread pool of
+    an event loop, and returns a callable returning an awaitable.
+    """
+
+    def __init__(self, field, reverse=False, run=None, **kwargs):
+        super(ManyToManyLoader, self).__init__(**kwargs)
+
+        self.run = run
+
+        self.through = field.remote_field.through
+        self.source = field.m2m_field_name()
+        self.target = field.m2m_reverse_field_name()
+        self.related_model = field.related_model
+
+        if reverse:
+            self.source, self.target = self.target, self.source
+            self.related_model = field.model
+
+    def get_queryset(self, keys):
+        ordering = []
+
+        for field in self.related_model._meta.ordering:
+            prefix = "-" if field.startswith("-") else ""
+            ordering.append("{}{}__{}".format(prefix, self.target, field.lstrip("-")))
+
+        return (
+            self.through.objects.filter(**{"{}__in".format(self.source): keys})
+            .select_related(self.target)
+            .order_by(*ordering)
+        )
+
+    def load_batch(self, keys):
+        related = defaultdict(list)
+        source_attname = "{}_id".format(self.source)
+
+        for row in self.get_queryset(keys):
+            related[getattr(row, source_attname)].append(getattr(row, self.target))
+
+        return [related[key] for key in keys]
+
+    def batch_load_fn(self, keys):
+        if self.run is None:
+            return Promise.resolve(self.load_batch(keys))
+
+        return Promise.resolve(self.run(self.load_batch)(keys))
+
+
+class Loaders(object):
+    """
+    DataLoaders shared by all resolvers of a single request, see
+    ``ManyToManyLoader`` for ``run``.
+    """
+
+    def __init__(self, run=None):
+        user_groups = get_user_model()._meta.get_field("groups")
+        user_permissions = get_user_model()._meta.get_field("user_permissions")
+        group_permissions = Group._meta.get_field("permissions")
+
+        self.user_groups = ManyToManyLoader(user_groups, run=run)
+        self.user_permissions = ManyToManyLoader(user_permissions, run=run)
+        self.group_users = ManyToManyLoader(user_groups, reverse=True, run=run)
+        self.group_permissions = ManyToManyLoader(group_permissions, run=run)
+
+
+def get_loaders(context):
+    """
+    Return the loaders of the current request, creating them on first use.
+    """
+    if context is None:
+        return Loaders()
+
+    loaders = getattr(context, "loaders", None)
+
+    if loaders is None:
+        loaders = context.loaders = Loaders()
+
+    return loaders
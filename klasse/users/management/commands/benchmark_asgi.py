@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from config.handlers import ASGIHandler
+
+
+class SlowStream(BytesIO):
+    """
+    Request body of a client taking ``latency`` seconds to send it.
+    """
+
+    def __init__(self, body, latency):
+        super(SlowStream, self).__init__(body)
+        self.latency = latency
+
+    def read(self, *args):
+        if self.latency:
+            time.sleep(self.latency)
+            self.latency = 0
+
+        return super(SlowStream, self).read(*args)
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve GraphQL requests from slow clients through the WSGI and the ASGI "
+        "application in process, and report the throughput of each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=500, help="Number of requests per run."
+        )
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Number of WSGI worker threads."
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=100,
+            help="Number of concurrent ASGI connections.",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.05,
+            help="Seconds each client takes to send its request.",
+        )
+        parser.add_argument(
+            "--query",
+            default="query { viewer { email } }",
+            help="GraphQL query to request.",
+        )
+
+    def run_wsgi(self, application, body, requests, threads, latency):
+        def call():
+            environ = {
+                "REQUEST_METHOD": "POST",
+                "PATH_INFO": "/graphql",
+                "SERVER_NAME": "localhost",
+                "SERVER_PORT": "80",
+                "REMOTE_ADDR": "127.0.0.1",
+                "CONTENT_TYPE": "application/json",
+                "CONTENT_LENGTH": str(len(body)),
+                "wsgi.input": SlowStream(body, latency),
+                "wsgi.url_scheme": "http",
+            }
+
+            return b"".join(application(environ, lambda status, headers: None))
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda _: call(), range(requests)))
+
+    def run_asgi(self, application, body, requests, concurrency, latency):
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": "POST",
+            "path": "/graphql",
+            "query_string": b"",
+            "headers": [(b"content-type", b"application/json")],
+            "server": ("localhost", 80),
+            "client": ("127.0.0.1", 0),
+        }
+
+        async def receive():
+            await asyncio.sleep(latency)
+
+            return {"type": "http.request", "body": body}
+
+        async def send(message):
+            pass
+
+        async def call(semaphore):
+            async with semaphore:
+                await application(scope)(receive, send)
+
+        async def run():
+            semaphore = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(call(semaphore) for _ in range(requests)))
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+    def report(self, name, requests, elapsed, connections):
+        self.stdout.write(
+            "{:<5} {:>6} requests {:>8.2f}s {:>8.1f} requests/s "
+            "with {} connections".format(
+                name, requests, elapsed, requests / elapsed, connections
+            )
+        )
+
+    def handle(self, *args, **options):
+        body = json.dumps({"query": options["query"]}).encode("utf-8")
+        requests, latency = options["requests"], options["latency"]
+        wsgi_application = get_wsgi_application()
+
+        start = time.perf_counter()
+        self.run_wsgi(wsgi_application, body, requests, options["threads"], latency)
+        self.report("wsgi", requests, time.perf_counter() - start, options["threads"])
+
+        asgi_application = ASGIHandler(wsgi_application)
+        concurrency = options["concurrency"]
+
+        start = time.perf_counter()
+        self.run_asgi(asgi_application, body, requests, concurrency, latency)
+        self.report("asgi", requests, time.perf_counter() - start, concurrency)
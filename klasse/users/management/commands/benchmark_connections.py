@@ -0,0 +1,107 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a query in simulated requests with a new database connection per "
+        "request, a persistent connection per thread and, when the database "
+        "engine supports it, a pool of connections shared by the threads, and "
+        "report the time per request of each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=1000, help="Number of requests per run."
+        )
+        parser.add_argument(
+            "--threads", type=int, default=4, help="Number of worker threads."
+        )
+        parser.add_argument(
+            "--database", default=DEFAULT_DB_ALIAS, help="Database to connect to."
+        )
+
+    def run(self, alias, requests, threads):
+        def worker(count):
+            connection = connections[alias]
+
+            try:
+                for _ in range(count):
+                    request_started.send(sender=self.__class__)
+
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+
+                    request_finished.send(sender=self.__class__)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(
+                target=worker, args=(requests // threads + (i < requests % threads),)
+            )
+            for i in range(threads)
+        ]
+
+        for thread in workers:
+            thread.start()
+
+        for thread in workers:
+            thread.join()
+
+    def report(self, name, requests, elapsed, connections):
+        self.stdout.write(
+            "{:<10} {:>6} requests {:>8.3f}ms/request {:>6} connections".format(
+                name, requests, elapsed * 1000 / requests, connections
+            )
+        )
+
+    def handle(self, *args, **options):
+        alias, requests = options["database"], options["requests"]
+        threads = options["threads"]
+        settings_dict = connections.databases[alias]
+
+        runs = [
+            ("new", {"CONN_MAX_AGE": 0, "POOL": None}),
+            ("persistent", {"CONN_MAX_AGE": None, "POOL": None}),
+        ]
+
+        if settings_dict["ENGINE"] == "config.db":
+            runs.append(("pooled", {"CONN_MAX_AGE": 0, "POOL": {"MAX_SIZE": threads}}))
+
+        # Pooled connections are reused, count each one once
+        created = []
+
+        def count_connection(sender, connection, **kwargs):
+            if connection.alias == alias:
+                created.append(connection.connection)
+
+        original = {key: settings_dict.get(key) for key in ("CONN_MAX_AGE", "POOL")}
+        connection_created.connect(count_connection)
+
+        try:
+            for name, overrides in runs:
+                settings_dict.update(overrides)
+                del created[:]
+
+                start = time.perf_counter()
+                self.run(alias, requests, threads)
+                self.report(
+                    name,
+                    requests,
+                    time.perf_counter() - start,
+                    len(set(map(id, created))),
+                )
+        finally:
+            connection_created.disconnect(count_connection)
+            settings_dict.update(original)
+
+            if settings_dict["ENGINE"] == "config.db":
+                from config.db.base import close_pools
+
+                close_pools()
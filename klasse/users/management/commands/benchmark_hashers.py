@@ -0,0 +1,44 @@
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Report the hashes per second of every configured password hasher."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=1.0,
+            help="Seconds spent hashing with each hasher.",
+        )
+
+    def benchmark(self, hasher, duration):
+        salt = hasher.salt()
+        # The first hash includes the calibration of budgeted hashers.
+        hasher.encode("password", salt)
+
+        hashes = 0
+        start = time.perf_counter()
+
+        while time.perf_counter() - start < duration:
+            hasher.encode("password", salt)
+            hashes += 1
+
+        return hashes, time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        for hasher in get_hashers():
+            hashes, elapsed = self.benchmark(hasher, options["duration"])
+            iterations = getattr(hasher, "iterations", None)
+
+            self.stdout.write(
+                "{:<40} {:>10.1f} hashes/s {:>8.1f} ms/hash{}".format(
+                    hasher.__class__.__name__,
+                    hashes / elapsed,
+                    elapsed / hashes * 1000,
+                    " ({} iterations)".format(iterations) if iterations else "",
+                )
+            )
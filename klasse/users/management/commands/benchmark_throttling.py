@@ -0,0 +1,79 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from config.schema import schema
+from klasse.users.metrics import get_timings, reset_timings
+
+LOGIN = """
+    mutation Login($email: String!, $password: String!) {
+        login(email: $email, password: $password) {
+            success
+        }
+    }
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a password guessing attack against a temporary user, with and "
+        "without throttling, and report the time spent hashing passwords."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--attempts",
+            type=int,
+            default=200,
+            help="Number of login attempts in each run.",
+        )
+
+    def attack(self, attempts):
+        request = RequestFactory().post("/graphql/", REMOTE_ADDR="203.0.113.1")
+        reset_timings()
+        start = time.perf_counter()
+
+        for attempt in range(attempts):
+            schema.execute(
+                LOGIN,
+                context_value=request,
+                variable_values={
+                    "email": "victim@example.com",
+                    "password": "guess-{}".format(attempt),
+                },
+            )
+
+        elapsed = time.perf_counter() - start
+        hashing = get_timings().get("login")
+
+        return elapsed, hashing.count if hashing else 0, hashing.total if hashing else 0
+
+    def report(self, name, attempts, elapsed, hashed, hashing):
+        self.stdout.write(
+            "{:<14} {:>6} attempts {:>6} hashed {:>8.2f}s hashing {:>8.2f}s total".format(
+                name, attempts, hashed, hashing, elapsed
+            )
+        )
+
+    def handle(self, *args, **options):
+        attempts = options["attempts"]
+
+        with transaction.atomic():
+            get_user_model().objects.create_user(  # nosec
+                email="victim@example.com", password="correct horse battery staple"
+            )
+
+            # Overriding the setting also starts each run with a fresh store
+            unthrottled = dict(settings.THROTTLING, RATES={})
+
+            with override_settings(THROTTLING=unthrottled):
+                self.report("unthrottled", attempts, *self.attack(attempts))
+
+            with override_settings(THROTTLING=dict(settings.THROTTLING)):
+                self.report("throttled", attempts, *self.attack(attempts))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from config.schema import schema
+from klasse.users.middleware import get_user
+from klasse.users.utils import jwt_encode_handler, jwt_payload_handler
+
+VIEWER = "query { viewer { email firstName } }"
+
+
+class Command(BaseCommand):
+    help = (
+        "Run viewer queries for temporary users, with and without the user "
+        "cache, and report the database queries per request. The token cache "
+        "is disabled, as for requests reaching a worker for the first time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=1000, help="Number of requests per run."
+        )
+        parser.add_argument(
+            "--users", type=int, default=50, help="Number of temporary users."
+        )
+
+    def run(self, tokens, requests):
+        factory = RequestFactory()
+
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+
+            for index in range(requests):
+                request = factory.post(
+                    "/graphql/", HTTP_AUTHORIZATION=tokens[index % len(tokens)]
+                )
+                request.user = get_user(request)
+                result = schema.execute(VIEWER, context_value=request)
+
+                if result.errors:
+                    raise CommandError("Query failed: {}".format(result.errors[0]))
+
+            elapsed = time.perf_counter() - start
+
+        return elapsed, len(queries)
+
+    def report(self, name, requests, elapsed, queries):
+        self.stdout.write(
+            "{:<9} {:>6} requests {:>8.2f}s {:>6} queries {:>6.2f} queries/request".format(
+                name, requests, elapsed, queries, queries / requests
+            )
+        )
+
+    def handle(self, *args, **options):
+        requests, User = options["requests"], get_user_model()
+        # Not in a transaction, which would keep users out of the cache
+        users = [
+            User.objects.create_user(
+                email="benchmark-{}@example.com".format(index), is_active=True
+            )
+            for index in range(options["users"])
+        ]
+
+        try:
+            tokens = [
+                "Bearer {}".format(jwt_encode_handler(jwt_payload_handler(user)))
+                for user in users
+            ]
+            token_cache = dict(settings.JWT_TOKEN_CACHE, BACKEND=None)
+
+            with override_settings(
+                JWT_TOKEN_CACHE=token_cache,
+                USER_CACHE=dict(settings.USER_CACHE, ENABLED=False),
+            ):
+                self.report("uncached", requests, *self.run(tokens, requests))
+
+            with override_settings(JWT_TOKEN_CACHE=token_cache):
+                self.report("cached", requests, *self.run(tokens, requests))
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
@@ -0,0 +1,45 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from klasse.users.exports import CONTENT_TYPES, Export
+
+
+class Command(BaseCommand):
+    help = "Export all users as NDJSON or CSV and report the rows per second."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(CONTENT_TYPES), default="ndjson")
+        parser.add_argument("--output", help="File to write to, defaults to stdout.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Number of rows fetched per query, defaults to USER_EXPORT.",
+        )
+
+    def write(self, export, output):
+        for chunk in export:
+            output.write(chunk)
+
+    def handle(self, *args, **options):
+        export = Export(
+            get_user_model().objects.all(),
+            options["format"],
+            chunk_size=options["chunk_size"],
+        )
+        start = time.perf_counter()
+
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                self.write(export, output)
+        else:
+            self.write(export, self.stdout)
+
+        elapsed = time.perf_counter() - start
+
+        self.stderr.write(
+            "Exported {} users in {:.2f}s ({:.0f} rows/s)".format(
+                export.rows, elapsed, export.rows / elapsed if elapsed else 0
+            )
+        )
@@ -0,0 +1,98 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from klasse.users.imports import chunked, import_batch, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import users from a CSV or JSON lines file with email, name and password."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header line, or .jsonl file.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of users inserted per query.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of processes hashing passwords, 0 hashes in-process.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording the imported rows, to resume an interrupted import.",
+        )
+
+    def read_checkpoint(self, path, source):
+        if not path or not os.path.exists(path):
+            return 0
+
+        with open(path) as checkpoint:
+            state = json.load(checkpoint)
+
+        if state["source"] != os.path.abspath(source):
+            return 0
+
+        return state["rows"]
+
+    def write_checkpoint(self, path, source, rows):
+        if not path:
+            return
+
+        with open(path + ".tmp", "w") as checkpoint:
+            json.dump({"source": os.path.abspath(source), "rows": rows}, checkpoint)
+
+        os.replace(path + ".tmp", path)
+
+    def handle(self, *args, **options):
+        source = options["path"]
+        batch_size = options["batch_size"]
+        skip = self.read_checkpoint(options["checkpoint"], source)
+        rows = islice(read_rows(source), skip, None)
+
+        if skip:
+            self.stdout.write("Resuming after {} rows".format(skip))
+
+        pool = ProcessPoolExecutor(options["workers"]) if options["workers"] else None
+        map_passwords = (
+            partial(pool.map, chunksize=max(1, batch_size // (options["workers"] * 4)))
+            if pool
+            else map
+        )
+
+        processed = created = 0
+        start = time.time()
+
+        try:
+            for batch in chunked(rows, batch_size):
+                created += import_batch(batch, map_passwords=map_passwords)
+                processed += len(batch)
+
+                self.write_checkpoint(options["checkpoint"], source, skip + processed)
+
+                elapsed = time.time() - start
+                self.stdout.write(
+                    "{} rows processed, {} users created ({:.0f} rows/s)".format(
+                        skip + processed, created, processed / elapsed if elapsed else 0
+                    )
+                )
+        finally:
+            if pool:
+                pool.shutdown()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Imported {} users, skipped {} rows".format(
+                    created, processed - created
+                )
+            )
+        )
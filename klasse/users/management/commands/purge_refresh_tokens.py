@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from klasse.users.refresh_tokens import purge_refresh_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired refresh tokens."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.REFRESH_TOKENS["PURGE_BATCH_SIZE"],
+            help="Number of refresh tokens deleted per query.",
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_refresh_tokens(batch_size=options["batch_size"])
+
+        self.stdout.write("Purged {} refresh tokens".format(purged))
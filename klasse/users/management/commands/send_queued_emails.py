@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from klasse.users.outbox import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Send the emails queued in the outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.EMAIL_OUTBOX["BATCH_SIZE"],
+            help="Number of emails sent over a single connection.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting once it is empty.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.EMAIL_OUTBOX["POLL_INTERVAL"],
+            help="Seconds to wait between polls when looping.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            sent = send_queued_emails(batch_size=options["batch_size"])
+
+            while sent:
+                total += sent
+                sent = send_queued_emails(batch_size=options["batch_size"])
+
+            if total:
+                self.stdout.write("Sent {} emails".format(total))
+
+            if not options["loop"]:
+                break
+
+            time.sleep(options["interval"])
@@ -1,7 +1,23 @@
 from django.contrib.auth.base_user import BaseUserManager
 
+from .hashing import set_password
+
+
+def get_normalized_email(email):
+    """
+    Return the form of an email address users are looked up by, so addresses
+    differing only in case or surrounding whitespace match.
+    """
+    return (email or "").strip().lower()
+
 
 class UserManager(BaseUserManager):
+    def get_by_email(self, email):
+        return self.get(normalized_email=get_normalized_email(email))
+
+    def get_by_natural_key(self, email):
+        return self.get_by_email(email)
+
     def _create_user(self, email, password, **extra_fields):
         """
         Create and save a user with the given email, and password.
@@ -12,7 +28,7 @@ class UserManager(BaseUserManager):
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
 
-        user.set_password(password)
+        set_password(user, password)
         user.save(using=self._db)
 
         return user
@@ -0,0 +1,43 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+Timing = namedtuple("Timing", ("count", "total", "max"))
+
+_timings = {}
+_lock = threading.Lock()
+
+
+def observe(name, seconds):
+    """
+    Record a duration under the given name.
+    """
+    with _lock:
+        count, total, maximum = _timings.get(name, (0, 0.0, 0.0))
+        _timings[name] = Timing(count + 1, total + seconds, max(maximum, seconds))
+
+    logger.debug("%s took %.1fms", name, seconds * 1000)
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def get_timings():
+    with _lock:
+        return dict(_timings)
+
+
+def reset_timings():
+    with _lock:
+        _timings.clear()
@@ -1,10 +1,16 @@
+import asyncio
+
 from jwt import InvalidTokenError
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.utils.encoding import smart_text
 from django.utils.functional import SimpleLazyObject
 
+from klasse.users.caching import get_user_by_email
+from klasse.users.identity import IdentityMap, get_identity_map
+from klasse.users.tokens import cache_user, get_cached_user, get_claims_user
 from klasse.users.utils import jwt_decode_handler
 
 
@@ -30,24 +36,84 @@ def get_user(request):
     if not token:
         return AnonymousUser()
 
+    identity_map = get_identity_map(request)
+
+    if settings.JWT_CLAIMS_USER["ENABLED"]:
+        try:
+            payload = jwt_decode_handler(token)
+        except InvalidTokenError:
+            return AnonymousUser()
+
+        # Tokens issued before claims were added are looked up below
+        if "ver" in payload:
+            user = get_claims_user(payload)
+
+            if user is None:
+                return AnonymousUser()
+
+            return identity_map.add(user, snapshot=True)
+
+    # Users from a cache are shared with the mutations as snapshots, which
+    # those writing them reload from the primary first
+    user = get_cached_user(token)
+
+    if user is not None:
+        return identity_map.add(user, snapshot=True)
+
     try:
         payload = jwt_decode_handler(token)
         email = payload.get("email")
-        user = get_user_model().objects.get(email=email)
 
-        return user
+        if settings.USER_CACHE["ENABLED"]:
+            user = identity_map.add(get_user_by_email(email), snapshot=True)
+        else:
+            user = identity_map.get_by_email(email)
     except (InvalidTokenError, KeyError, get_user_model().DoesNotExist):
         return AnonymousUser()
 
+    cache_user(token, user, payload)
+
+    return user
+
 
 class JWTAuthenticationMiddleware(object):
+    """
+    Authenticate requests by their JWT. Wrapping a coroutine function, as the
+    ASGI handler does, the user is loaded in the thread pool by ``request.run``
+    before the view is awaited, instead of lazily on first access.
+
+    Every request gets an identity map of the users it loads, cleared once
+    it has been handled.
+    """
+
+    # Run as is around the asynchronous view by config.handlers
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
 
     def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+
+        request.identity_map = IdentityMap()
+
         if not hasattr(request, "user"):
             request.user = SimpleLazyObject(lambda: get_user(request))
 
-        response = self.get_response(request)
+        try:
+            return self.get_response(request)
+        finally:
+            request.identity_map.clear()
+
+    async def acall(self, request):
+        request.identity_map = IdentityMap()
+
+        if not hasattr(request, "user"):
+            request.user = await request.run(get_user)(request)
 
-        return response
+        try:
+            return await self.get_response(request)
+        finally:
+            request.identity_map.clear()
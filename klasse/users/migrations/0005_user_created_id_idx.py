@@ -0,0 +1,15 @@
+# Generated by Django 2.0.6 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("users", "0004_outboxemail")]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["created", "id"], name="user_created_id_idx"),
+        )
+    ]
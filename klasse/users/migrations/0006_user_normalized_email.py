@@ -0,0 +1,107 @@
+# Generated by Django 2.0.6 on 2026-10-18 09:20
+
+import logging
+
+from django.db import IntegrityError, migrations, models, transaction
+from django.db.models import Case, Count, F, Func, Value, When
+from django.db.models.functions import Lower
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# Conflicting addresses listed in the error
+MAX_REPORTED_CONFLICTS = 100
+
+
+def check_normalized_email_conflicts(apps, schema_editor):
+    """
+    Fail before the column is added when addresses of several users only
+    differ in case or surrounding whitespace, listing them, so they can be
+    merged or changed before migrating again.
+    """
+    User = apps.get_model("users", "User")
+    db_alias = schema_editor.connection.alias
+    conflicts = list(
+        User.objects.using(db_alias)
+        .annotate(normalized=Lower(Func(F("email"), function="TRIM")))
+        .values("normalized")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .order_by("normalized")
+        .values_list("normalized", "count")[:MAX_REPORTED_CONFLICTS]
+    )
+
+    if not conflicts:
+        return
+
+    message = "Email addresses shared by several users: {}".format(
+        ", ".join("{} ({} users)".format(email, count) for email, count in conflicts)
+    )
+    logger.error(message)
+
+    raise IntegrityError(message)
+
+
+def backfill_normalized_email(apps, schema_editor):
+    """
+    Fill the normalized email of existing users in batches of primary keys,
+    each updated by a single statement and committed on its own.
+    """
+    User = apps.get_model("users", "User")
+    db_alias = schema_editor.connection.alias
+    users = User.objects.using(db_alias)
+    last_pk = None
+    count = 0
+
+    while True:
+        batch = users.filter(normalized_email__isnull=True)
+
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+
+        batch = list(batch.order_by("pk").values_list("pk", "email")[:BATCH_SIZE])
+
+        if not batch:
+            break
+
+        last_pk = batch[-1][0]
+
+        with transaction.atomic(using=db_alias):
+            users.filter(pk__in=[pk for pk, _ in batch]).update(
+                normalized_email=Case(
+                    *[
+                        When(pk=pk, then=Value(email.strip().lower()))
+                        for pk, email in batch
+                    ]
+                )
+            )
+
+        count += len(batch)
+        logger.info("Backfilled the normalized email of %d users", count)
+
+
+class Migration(migrations.Migration):
+
+    # Commit every batch of the backfill separately
+    atomic = False
+
+    dependencies = [("users", "0005_user_created_id_idx")]
+
+    operations = [
+        migrations.RunPython(
+            check_normalized_email_conflicts, migrations.RunPython.noop
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="normalized_email",
+            field=models.EmailField(
+                editable=False,
+                max_length=254,
+                null=True,
+                unique=True,
+                verbose_name="normalized email address",
+            ),
+        ),
+        migrations.RunPython(backfill_normalized_email, migrations.RunPython.noop),
+    ]
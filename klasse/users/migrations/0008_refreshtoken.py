@@ -0,0 +1,61 @@
+# Generated by Django 2.0.6 on 2026-10-18 09:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("users", "0007_user_token_version")]
+
+    operations = [
+        migrations.CreateModel(
+            name="RefreshToken",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "token_hash",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="token hash"
+                    ),
+                ),
+                (
+                    "family",
+                    models.UUIDField(
+                        db_index=True, default=uuid.uuid4, verbose_name="family"
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="created"
+                    ),
+                ),
+                (
+                    "expires",
+                    models.DateTimeField(db_index=True, verbose_name="expires"),
+                ),
+                (
+                    "revoked",
+                    models.DateTimeField(blank=True, null=True, verbose_name="revoked"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="refresh_tokens",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="refreshtoken",
+            index=models.Index(
+                fields=["user", "revoked"], name="users_refre_user_id_8730a9_idx"
+            ),
+        ),
+    ]
@@ -2,18 +2,32 @@ import uuid
 
 from django_extensions.db.models import TimeStampedModel
 
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
-from .managers import UserManager
+from .caching import invalidate_cached_user
+from .events import publish_user_changed
+from .managers import UserManager, get_normalized_email
+from .tokens import invalidate_cached_tokens, invalidate_user
 
 
 class User(TimeStampedModel, AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     middle_name = models.CharField(_("middle name"), max_length=30, blank=True)
     email = models.EmailField(_("email address"), unique=True)
+    # Users are looked up by this column, see get_normalized_email()
+    normalized_email = models.EmailField(
+        _("normalized email address"), unique=True, null=True, editable=False
+    )
     is_active = models.BooleanField(_("active"), default=False)
+    # Bumped whenever the token cache fields or the password change, revoking
+    # all tokens
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     username = None
 
@@ -22,5 +36,164 @@ class User(TimeStampedModel, AbstractUser):
 
     objects = UserManager()
 
+    class Meta(TimeStampedModel.Meta):
+        indexes = [models.Index(fields=["created", "id"], name="user_created_id_idx")]
+
+    # Changing any of these fields revokes the tokens carrying them as claims.
+    # So does setting a new password, but not rehashing the current one.
+    # Subscribers of the user are notified of revocations. Saving any field
+    # invalidates the user's cached tokens.
+    TOKEN_CACHE_FIELDS = ("email", "is_active", "is_staff")
+
+    # Set by set_password() until the user is saved
+    _password_changed = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(User, cls).from_db(db, field_names, values)
+        instance._token_cache_state = instance.get_token_cache_state()
+
+        return instance
+
+    def get_token_cache_state(self):
+        return tuple(self.__dict__.get(field) for field in self.TOKEN_CACHE_FIELDS)
+
+    def refresh_from_db(self, using=None, fields=None):
+        deferred_fields = self.get_deferred_fields()
+
+        # Accessing a deferred field loads all of them, so users built from token
+        # claims are hydrated with a single query.
+        if fields is not None and deferred_fields.issuperset(fields):
+            fields = deferred_fields
+
+        state = getattr(self, "_token_cache_state", self.get_token_cache_state())
+
+        super(User, self).refresh_from_db(using, fields)
+
+        # Loaded fields are the new reference for detecting changes
+        self._token_cache_state = tuple(
+            self.__dict__.get(field) if fields is None or field in fields else value
+            for field, value in zip(self.TOKEN_CACHE_FIELDS, state)
+        )
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+
+        if update_fields is None and self.get_deferred_fields():
+            self.refresh_from_db(fields=self.get_deferred_fields())
+
+        self.normalized_email = get_normalized_email(self.email)
+        state = self.get_token_cache_state()
+        # New users have no tokens to revoke
+        password_changed = self._password_changed and not self._state.adding
+        changed = (
+            getattr(self, "_token_cache_state", state) != state or password_changed
+        )
+
+        if changed:
+            self.token_version += 1
+
+        if update_fields is not None:
+            update_fields = set(update_fields)
+
+            if "email" in update_fields:
+                update_fields.add("normalized_email")
+
+            if changed:
+                update_fields.add("token_version")
+
+            kwargs["update_fields"] = update_fields
+
+        super(User, self).save(*args, **kwargs)
+
+        if changed:
+            invalidate_user(self)
+            # However the tokens were revoked, so subscriptions end too
+            publish_user_changed(self)
+
+        self._token_cache_state = state
+        self._password_changed = False
+
+    def set_password(self, raw_password):
+        super(User, self).set_password(raw_password)
+        self._password_changed = True
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            # Upgrading the hash keeps the password, and the tokens
+            self.password = make_password(raw_password)
+            self._password = None
+            self.save(update_fields=["password"])
+
+        return check_password(raw_password, self.password, setter)
+
+    def delete(self, *args, **kwargs):
+        invalidate_user(self)
+
+        return super(User, self).delete(*args, **kwargs)
+
     def __unicode__(self):
         return self.get_full_name()
+
+
+post_save.connect(invalidate_cached_user, sender=User)
+post_delete.connect(invalidate_cached_user, sender=User)
+post_save.connect(invalidate_cached_tokens, sender=User)
+post_delete.connect(invalidate_cached_tokens, sender=User)
+
+
+class OutboxEmail(TimeStampedModel):
+    ACTIVATION = "activation"
+    WELCOME = "welcome"
+    PASSWORD_RESET = "password_reset"
+
+    KIND_CHOICES = (
+        (ACTIVATION, _("activation")),
+        (WELCOME, _("welcome")),
+        (PASSWORD_RESET, _("password reset")),
+    )
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    STATUS_CHOICES = ((PENDING, _("pending")), (SENT, _("sent")), (FAILED, _("failed")))
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="outbox_emails"
+    )
+    kind = models.CharField(_("kind"), max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(
+        _("status"), max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(_("attempts"), default=0)
+    next_attempt = models.DateTimeField(_("next attempt"), default=timezone.now)
+    last_error = models.TextField(_("last error"), blank=True)
+    sent = models.DateTimeField(_("sent"), null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt"])]
+
+
+class RefreshToken(models.Model):
+    """
+    An opaque refresh token, of which only the SHA-256 hash is stored. Tokens
+    are single use: every refresh replaces the token by a new one of the same
+    family, and reusing a replaced token revokes the whole family.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="refresh_tokens",
+    )
+    token_hash = models.CharField(_("token hash"), max_length=64, unique=True)
+    family = models.UUIDField(_("family"), default=uuid.uuid4, db_index=True)
+    created = models.DateTimeField(_("created"), default=timezone.now)
+    expires = models.DateTimeField(_("expires"), db_index=True)
+    revoked = models.DateTimeField(_("revoked"), null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "revoked"])]
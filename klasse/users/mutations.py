@@ -1,21 +1,30 @@
 import graphene
-from jwt import InvalidTokenError
 
 from django.contrib.auth import authenticate, get_user_model
 from django.core import signing
-from django.db import IntegrityError
-
+from django.db import IntegrityError, transaction
+
+from .events import publish_user_changed
+from .hashing import HashingServiceBusy, set_password
+from .identity import get_identity_map
+from .metrics import timer
+from .models import OutboxEmail
+from .outbox import queue_email
+from .refresh_tokens import (
+    InvalidRefreshToken,
+    issue_refresh_token,
+    revoke_refresh_token,
+    revoke_user_refresh_tokens,
+    rotate_refresh_token,
+)
 from .schema import UserType
+from .throttling import Throttled, throttle
 from .utils import (
-    jwt_decode_handler,
     jwt_encode_handler,
     jwt_payload_handler,
     login_required,
     parse_name,
     password_reset_token_generator,
-    send_activation_email,
-    send_password_reset_email,
-    send_welcome_email,
 )
 
 
@@ -29,13 +38,20 @@ class Register(graphene.Mutation):
     errors = graphene.List(graphene.String)
 
     def mutate(self, info, email, password, name):
+        try:
+            throttle("register", info.context, email)
+        except Throttled as e:
+            return Register(success=False, errors=[str(e)])
+
         try:
             parsed_name = parse_name(name)
-            user = get_user_model().objects.create_user(
-                email=email, password=password, **parsed_name
-            )
 
-            send_activation_email(user)
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(
+                    email=email, password=password, **parsed_name
+                )
+
+                queue_email(user, OutboxEmail.ACTIVATION)
 
             return Register(success=user, errors=None)
         except IntegrityError:
@@ -54,11 +70,13 @@ class Activate(graphene.Mutation):
     def mutate(self, info, activation_token):
         try:
             email = signing.loads(activation_token, max_age=(60 * 12))
-            user = get_user_model().objects.get(email=email)
-            user.is_active = True
-            user.save()
+            user = get_identity_map(info.context).get_by_email(email, current=True)
 
-            send_welcome_email(user)
+            with transaction.atomic():
+                user.is_active = True
+                user.save()
+
+                queue_email(user, OutboxEmail.WELCOME)
 
             return Activate(success=True, errors=None)
         except get_user_model().DoesNotExist:
@@ -75,9 +93,20 @@ class Login(graphene.Mutation):
     success = graphene.Boolean()
     errors = graphene.List(graphene.String)
     token = graphene.String()
+    refresh_token = graphene.String()
 
-    def mutate(self, _, email, password):
-        user = authenticate(email=email, password=password)
+    def mutate(self, info, email, password):
+        # Throttle before authenticating, so rejected attempts cost no hashing
+        try:
+            throttle("login", info.context, email)
+        except Throttled as e:
+            return Login(success=False, errors=[str(e)])
+
+        try:
+            with timer("login"):
+                user = authenticate(info.context, email=email, password=password)
+        except HashingServiceBusy:
+            return Login(success=False, errors=["Too many logins, try again later"])
 
         if not user:
             return Login(success=False, errors=["Email and/or password are unknown"])
@@ -85,28 +114,57 @@ class Login(graphene.Mutation):
         payload = jwt_payload_handler(user)
         token = jwt_encode_handler(payload)
 
-        return Login(success=True, errors=None, token=token)
+        return Login(
+            success=True,
+            errors=None,
+            token=token,
+            refresh_token=issue_refresh_token(user),
+        )
 
 
 class RefreshToken(graphene.Mutation):
     class Arguments:
-        token = graphene.String(required=True)
+        refresh_token = graphene.String(required=True)
 
     success = graphene.Boolean()
     errors = graphene.List(graphene.String)
     token = graphene.String()
+    refresh_token = graphene.String()
 
-    def mutate(self, _, token):
+    def mutate(self, info, refresh_token):
         try:
-            payload = jwt_decode_handler(token)
-        except InvalidTokenError:
+            user, refresh_token = rotate_refresh_token(
+                refresh_token, identity_map=get_identity_map(info.context)
+            )
+        except InvalidRefreshToken:
             return RefreshToken(success=False, errors=["Invalid token"])
 
-        user = get_user_model().objects.get(email=payload.get("email"))
         payload = jwt_payload_handler(user)
         token = jwt_encode_handler(payload)
 
-        return RefreshToken(success=True, token=token)
+        return RefreshToken(success=True, token=token, refresh_token=refresh_token)
+
+
+class Logout(graphene.Mutation):
+    class Arguments:
+        refresh_token = graphene.String(required=True)
+
+    success = graphene.Boolean()
+
+    def mutate(self, _, refresh_token):
+        revoke_refresh_token(refresh_token)
+
+        return Logout(success=True)
+
+
+class RevokeRefreshTokens(graphene.Mutation):
+    success = graphene.Boolean()
+
+    @login_required
+    def mutate(self, info):
+        revoke_user_refresh_tokens(info.context.user)
+
+        return RevokeRefreshTokens(success=True)
 
 
 class PasswordReset(graphene.Mutation):
@@ -114,11 +172,17 @@ class PasswordReset(graphene.Mutation):
         email = graphene.String()
 
     success = graphene.Boolean()
+    errors = graphene.List(graphene.String)
 
     def mutate(self, info, email):
         try:
-            user = get_user_model().objects.get(email=email)
-            send_password_reset_email(user)
+            throttle("password_reset", info.context, email)
+        except Throttled as e:
+            return PasswordReset(success=False, errors=[str(e)])
+
+        try:
+            user = get_identity_map(info.context).get_by_email(email)
+            queue_email(user, OutboxEmail.PASSWORD_RESET)
         except get_user_model().DoesNotExist:
             pass
 
@@ -135,12 +199,12 @@ class PasswordResetConfirm(graphene.Mutation):
     success = graphene.Boolean()
     errors = graphene.List(graphene.String)
 
-    def mutate(self, _, email, password, password_repeat, password_reset_token):
+    def mutate(self, info, email, password, password_repeat, password_reset_token):
         if password != password_repeat:
             return PasswordResetConfirm(success=False, errors=["Passwords don't match"])
 
         try:
-            user = get_user_model().objects.get(email=email)
+            user = get_identity_map(info.context).get_by_email(email, current=True)
         except get_user_model().DoesNotExist:
             return PasswordResetConfirm(success=False, errors=["Unknown user"])
 
@@ -150,8 +214,15 @@ class PasswordResetConfirm(graphene.Mutation):
         if not user.is_active or not user.has_usable_password():
             return PasswordResetConfirm(success=False, errors=["Inactive user"])
 
-        user.set_password(password)
+        try:
+            set_password(user, password)
+        except HashingServiceBusy:
+            return PasswordResetConfirm(
+                success=False, errors=["Too many requests, try again later"]
+            )
+
         user.save()
+        revoke_user_refresh_tokens(user)
 
         return PasswordResetConfirm(success=True)
 
@@ -167,11 +238,16 @@ class Update(graphene.Mutation):
 
     @login_required
     def mutate(self, info, **fields):
-        user = info.context.user
+        # The user authenticating the request may be a cached snapshot, which
+        # is reloaded before it is written
+        user = get_identity_map(info.context).get_by_id(
+            info.context.user.pk, current=True
+        )
 
         for attr, value in fields.items():
             setattr(user, attr, value)
         user.save()
+        publish_user_changed(user)
 
         return Update(success=True, errors=None, user=user)
 
@@ -181,6 +257,8 @@ class UserMutation(object):
     activate = Activate.Field()
     login = Login.Field()
     refresh_token = RefreshToken.Field()
+    logout = Logout.Field()
+    revoke_refresh_tokens = RevokeRefreshTokens.Field()
     password_reset = PasswordReset.Field()
     password_reset_confirm = PasswordResetConfirm.Field()
     update = Update.Field()
@@ -0,0 +1,191 @@
+from collections import OrderedDict
+
+from graphene.utils.str_converters import to_snake_case
+from graphql.language.ast import Field, FragmentSpread, InlineFragment
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+
+def get_field_name(field):
+    """
+    Return the attribute name graphene-django uses for a model field, which is the
+    accessor name for reverse relations.
+    """
+    if field.auto_created and not field.concrete:
+        return field.get_accessor_name()
+
+    return field.name
+
+
+def get_model_fields(model):
+    return {get_field_name(field): field for field in model._meta.get_fields()}
+
+
+def iter_fields(selections, fragments):
+    for selection in selections:
+        if isinstance(selection, Field):
+            yield selection
+        elif isinstance(selection, FragmentSpread):
+            fragment = fragments[selection.name.value]
+            yield from iter_fields(fragment.selection_set.selections, fragments)
+        elif isinstance(selection, InlineFragment):
+            yield from iter_fields(selection.selection_set.selections, fragments)
+
+
+def get_selections(field_asts, fragments):
+    """
+    Group the fields selected below the given field nodes by name, with fragments
+    inlined and repeated fields merged.
+    """
+    selections = OrderedDict()
+
+    for field_ast in field_asts:
+        if field_ast.selection_set is None:
+            continue
+
+        for field in iter_fields(field_ast.selection_set.selections, fragments):
+            selections.setdefault(field.name.value, []).append(field)
+
+    return selections
+
+
+def get_related_lookups(model, selections, fragments, prefix=""):
+    """
+    Return the ``only()``, ``select_related()`` and ``prefetch_related()``
+    lookups for the selected fields of a model. ``only`` is ``None`` when a field
+    that isn't backed by the model is selected, as its resolver might need any
+    column.
+    """
+    model_fields = get_model_fields(model)
+    only = {prefix + model._meta.pk.name}
+    select_related = []
+    prefetch_related = []
+
+    for name, field_asts in selections.items():
+        if name.startswith("__"):
+            continue
+
+        field = model_fields.get(to_snake_case(name))
+
+        if field is None:
+            only = None
+            continue
+
+        if not field.is_relation:
+            if only is not None:
+                only.add(prefix + field.name)
+            continue
+
+        nested = get_selections(field_asts, fragments)
+
+        if field.concrete and (field.many_to_one or field.one_to_one):
+            lookup = prefix + field.name
+            nested_only, nested_select, nested_prefetch = get_related_lookups(
+                field.related_model, nested, fragments, prefix=lookup + "__"
+            )
+
+            select_related.append(lookup)
+            select_related.extend(nested_select)
+
+            if only is not None:
+                only.add(lookup)
+                only.update(nested_only or ())
+
+            for prefetch in nested_prefetch:
+                prefetch.add_prefix(lookup)
+                prefetch_related.append(prefetch)
+        else:
+            queryset = optimize(
+                field.related_model._default_manager.all(), nested, fragments
+            )
+            prefetch_related.append(
+                Prefetch(prefix + get_field_name(field), queryset=queryset)
+            )
+
+    return only, select_related, prefetch_related
+
+
+def optimize(queryset, selections, fragments, fields=()):
+    """
+    Apply the lookups for the selected fields to a queryset, always loading the
+    given ``fields``.
+    """
+    only, select_related, prefetch_related = get_related_lookups(
+        queryset.model, selections, fragments
+    )
+
+    if only is not None:
+        queryset = queryset.only(*only.union(fields))
+
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+
+    return queryset
+
+
+def optimize_queryset(queryset, info):
+    """
+    Restrict a root queryset to the columns and relations requested by the
+    selection set of the field being resolved.
+    """
+    return optimize(
+        queryset, get_selections(info.field_asts, info.fragments), info.fragments
+    )
+
+
+def optimize_connection_queryset(queryset, info, fields=()):
+    """
+    Like ``optimize_queryset``, for the nodes of the Relay connection field being
+    resolved.
+    """
+    edges = get_selections(info.field_asts, info.fragments).get("edges", [])
+    nodes = get_selections(edges, info.fragments).get("node", [])
+
+    return optimize(
+        queryset, get_selections(nodes, info.fragments), info.fragments, fields
+    )
+
+
+def get_prefetched(instance, name):
+    """
+    Return the related objects prefetched by the optimizer, or ``None`` when the
+    relation wasn't prefetched.
+    """
+    manager = getattr(instance, name)
+    cache = getattr(instance, "_prefetched_objects_cache", {})
+
+    if manager.prefetch_cache_name not in cache:
+        return None
+
+    return list(cache[manager.prefetch_cache_name])
+
+
+def optimize_instance(instance, info):
+    """
+    Like ``optimize_queryset``, for an instance that is already loaded, such as
+    the user of the request: the requested columns it deferred are loaded with
+    a single query, and the requested relations are prefetched onto it.
+    """
+    model = instance._meta.model
+    only, select_related, prefetch_related = get_related_lookups(
+        model, get_selections(info.field_asts, info.fragments), info.fragments
+    )
+    deferred = instance.get_deferred_fields()
+    fields = [
+        field.name
+        for field in model._meta.concrete_fields
+        if field.attname in deferred and (only is None or field.name in only)
+    ]
+
+    # Along with the primary key, which tells the user model not to load every
+    # deferred field as it does when one of them is accessed
+    if fields:
+        instance.refresh_from_db(fields=[model._meta.pk.name] + fields)
+
+    if select_related or prefetch_related:
+        prefetch_related_objects([instance], *select_related, *prefetch_related)
+
+    return instance
@@ -0,0 +1,127 @@
+import datetime
+import logging
+import threading
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+from .utils import send_activation_email, send_password_reset_email, send_welcome_email
+
+logger = logging.getLogger(__name__)
+
+senders = {
+    OutboxEmail.ACTIVATION: send_activation_email,
+    OutboxEmail.WELCOME: send_welcome_email,
+    OutboxEmail.PASSWORD_RESET: send_password_reset_email,
+}
+
+
+def queue_email(user, kind):
+    """
+    Queue an email for the user in the current transaction. It is rendered and
+    sent by the outbox worker once the transaction has been committed.
+    """
+    email = OutboxEmail.objects.create(user=user, kind=kind)
+
+    transaction.on_commit(notify_worker)
+
+    return email
+
+
+def get_retry_delay(attempts):
+    return datetime.timedelta(
+        seconds=settings.EMAIL_OUTBOX["RETRY_DELAY"] * 2 ** (attempts - 1)
+    )
+
+
+def send_queued_emails(batch_size=None):
+    """
+    Send a batch of due emails over a single connection and return the number
+    of emails sent. Failed emails are retried with exponential backoff until
+    ``MAX_ATTEMPTS`` is reached.
+    """
+    config = settings.EMAIL_OUTBOX
+    now = timezone.now()
+    sent = 0
+
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .select_related("user")
+            .filter(status=OutboxEmail.PENDING, next_attempt__lte=now)
+            .order_by("next_attempt")[: batch_size or config["BATCH_SIZE"]]
+        )
+
+        if not emails:
+            return 0
+
+        with get_connection() as connection:
+            for email in emails:
+                email.attempts += 1
+
+                try:
+                    senders[email.kind](email.user, connection=connection)
+                except Exception as e:
+                    logger.warning("Sending %s email failed: %s", email.kind, e)
+
+                    email.last_error = str(e)
+
+                    if email.attempts >= config["MAX_ATTEMPTS"]:
+                        email.status = OutboxEmail.FAILED
+                    else:
+                        email.next_attempt = now + get_retry_delay(email.attempts)
+                else:
+                    email.status = OutboxEmail.SENT
+                    email.sent = timezone.now()
+                    sent += 1
+
+                email.save()
+
+    return sent
+
+
+class OutboxWorker(threading.Thread):
+    """
+    Background thread that drains the outbox whenever an email is queued, and
+    at least every ``POLL_INTERVAL`` seconds for retries.
+    """
+
+    daemon = True
+
+    def __init__(self):
+        super(OutboxWorker, self).__init__(name="outbox-worker")
+        self.wake_up = threading.Event()
+
+    def run(self):
+        while True:
+            self.wake_up.wait(settings.EMAIL_OUTBOX["POLL_INTERVAL"])
+            self.wake_up.clear()
+
+            try:
+                while send_queued_emails():
+                    pass
+            except Exception:
+                logger.exception("Outbox worker failed to send emails")
+            finally:
+                close_old_connections()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def notify_worker():
+    global _worker
+
+    if settings.EMAIL_OUTBOX["WORKER"] != "thread":
+        return
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker()
+            _worker.start()
+
+    _worker.wake_up.set()
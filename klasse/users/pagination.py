@@ -0,0 +1,112 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+
+from graphql.error import GraphQLError
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPaginator(object):
+    """
+    Paginate a queryset on a unique ordering, filtering on the values of the
+    ordering fields of the cursor instead of using ``OFFSET``, so every page is
+    read from the index at the same cost.
+    """
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+    def encode_cursor(self, instance):
+        values = [
+            instance._meta.get_field(name).value_to_string(instance)
+            for name in self.ordering
+        ]
+
+        return urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, model, cursor):
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode("ascii")).decode())
+
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError(cursor)
+
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise GraphQLError("Invalid cursor")
+
+        if None in values:
+            raise GraphQLError("Invalid cursor")
+
+        return values
+
+    def get_filter(self, values, lookup):
+        """
+        Return the condition for the rows after (``gt``) or before (``lt``) the
+        given values of the ordering fields.
+        """
+        conditions = [
+            Q(**dict(zip(self.ordering[:index], values[:index])))
+            & Q(**{"{}__{}".format(self.ordering[index], lookup): values[index]})
+            for index in range(len(self.ordering))
+        ]
+
+        # The redundant bound on the first field lets the database seek the index
+        first = Q(**{"{}__{}e".format(self.ordering[0], lookup): values[0]})
+
+        return first & reduce(lambda a, b: a | b, conditions)
+
+    def get_page_size(self, first, last):
+        config = settings.GRAPHQL_PAGINATION
+
+        if first is not None and last is not None:
+            raise GraphQLError("Pass either first or last")
+
+        size = first if first is not None else last
+
+        if size is None:
+            return config["DEFAULT_PAGE_SIZE"]
+
+        if not 0 < size <= config["MAX_PAGE_SIZE"]:
+            raise GraphQLError(
+                "Page size must be between 1 and {}".format(config["MAX_PAGE_SIZE"])
+            )
+
+        return size
+
+    def paginate(self, queryset, first=None, after=None, last=None, before=None):
+        """
+        Return the page of instances along with whether there are instances
+        before and after it. Like the Relay specification allows, only the
+        direction of pagination is checked for more instances.
+        """
+        size = self.get_page_size(first, last)
+        backwards = last is not None
+
+        if after is not None:
+            values = self.decode_cursor(queryset.model, after)
+            queryset = queryset.filter(self.get_filter(values, "gt"))
+
+        if before is not None:
+            values = self.decode_cursor(queryset.model, before)
+            queryset = queryset.filter(self.get_filter(values, "lt"))
+
+        if backwards:
+            queryset = queryset.order_by(*("-" + name for name in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        instances = list(queryset[: size + 1])
+        has_more = len(instances) > size
+        instances = instances[:size]
+
+        if backwards:
+            return instances[::-1], has_more, False
+
+        return instances, False, has_more
@@ -0,0 +1,138 @@
+import datetime
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .identity import IdentityMap
+from .models import RefreshToken
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def issue_refresh_token(user, family=None, now=None):
+    """
+    Create a refresh token for the user, starting a new family unless one is
+    given, and return the opaque token. Only its hash is stored.
+    """
+    now = now or timezone.now()
+    token = secrets.token_urlsafe(32)
+
+    RefreshToken.objects.create(
+        user=user,
+        token_hash=hash_token(token),
+        family=family or RefreshToken._meta.get_field("family").get_default(),
+        created=now,
+        expires=now + datetime.timedelta(seconds=settings.REFRESH_TOKENS["LIFETIME"]),
+    )
+
+    return token
+
+
+def rotate_refresh_token(token, now=None, identity_map=None):
+    """
+    Revoke a refresh token and return its user along with the token replacing
+    it. Presenting a token that was already replaced means it leaked, so its
+    whole family is revoked.
+
+    The user is looked up in ``identity_map``, so a user the request already
+    loaded isn't fetched again.
+    """
+    now = now or timezone.now()
+
+    if identity_map is None:
+        identity_map = IdentityMap()
+
+    queryset = RefreshToken.objects.all()
+
+    # Join the user, unless the request may have loaded it already
+    if not identity_map:
+        queryset = queryset.select_related("user")
+
+    try:
+        refresh_token = queryset.get(token_hash=hash_token(token))
+    except RefreshToken.DoesNotExist:
+        raise InvalidRefreshToken("Invalid refresh token")
+
+    if refresh_token.expires <= now:
+        raise InvalidRefreshToken("Invalid refresh token")
+
+    if RefreshToken.user.is_cached(refresh_token):
+        user = identity_map.add(refresh_token.user)
+    else:
+        user = identity_map.get_by_id(refresh_token.user_id)
+
+    if not user.is_active:
+        raise InvalidRefreshToken("Inactive user")
+
+    with transaction.atomic():
+        # Only one of concurrent refreshes with the same token wins the update
+        rotated = RefreshToken.objects.filter(
+            pk=refresh_token.pk, revoked__isnull=True
+        ).update(revoked=now)
+
+        if rotated:
+            return user, issue_refresh_token(user, refresh_token.family, now)
+
+    revoke_family(refresh_token.family, now)
+
+    raise InvalidRefreshToken("Refresh token reused")
+
+
+def revoke_refresh_token(token, now=None):
+    """
+    Revoke the family of a refresh token, ending the session it belongs to.
+    """
+    family = (
+        RefreshToken.objects.filter(token_hash=hash_token(token))
+        .values_list("family", flat=True)
+        .first()
+    )
+
+    if family is not None:
+        revoke_family(family, now)
+
+
+def revoke_family(family, now=None):
+    return RefreshToken.objects.filter(family=family, revoked__isnull=True).update(
+        revoked=now or timezone.now()
+    )
+
+
+def revoke_user_refresh_tokens(user, now=None):
+    """
+    Revoke all refresh tokens of the user with a single update.
+    """
+    return RefreshToken.objects.filter(user=user, revoked__isnull=True).update(
+        revoked=now or timezone.now()
+    )
+
+
+def purge_refresh_tokens(batch_size=None, now=None):
+    """
+    Delete expired refresh tokens in batches, returning the number deleted.
+    Replaced tokens are kept until they expire to detect their reuse.
+    """
+    batch_size = batch_size or settings.REFRESH_TOKENS["PURGE_BATCH_SIZE"]
+    now = now or timezone.now()
+    total = 0
+
+    while True:
+        pks = list(
+            RefreshToken.objects.filter(expires__lte=now).values_list("pk", flat=True)[
+                :batch_size
+            ]
+        )
+
+        if not pks:
+            return total
+
+        total += RefreshToken.objects.filter(pk__in=pks).delete()[0]
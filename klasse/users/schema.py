@@ -1,7 +1,21 @@
+import graphene
 from graphene_django.types import DjangoObjectType
 
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, Permission
+
+from .events import iter_user_changes
+from .loaders import get_loaders
+from .managers import get_normalized_email
+from .optimizer import get_prefetched, optimize_connection_queryset
+from .pagination import KeysetPaginator
+from .utils import login_required, staff_required
+
+
+class PermissionType(DjangoObjectType):
+    class Meta:
+        model = Permission
+        only_fields = ("id", "name", "codename")
 
 
 class GroupType(DjangoObjectType):
@@ -9,7 +23,129 @@ class GroupType(DjangoObjectType):
         model = Group
         filter_fields = ("name",)
 
+    # Expected size of list fields, see config.complexity
+    field_costs = {"permissions": {"multiplier": 20}, "user_set": {"multiplier": 100}}
+
+    def resolve_permissions(self, info):
+        prefetched = get_prefetched(self, "permissions")
+
+        if prefetched is not None:
+            return prefetched
+
+        return get_loaders(info.context).group_permissions.load(self.pk)
+
+    def resolve_user_set(self, info):
+        prefetched = get_prefetched(self, "user_set")
+
+        if prefetched is not None:
+            return prefetched
+
+        return get_loaders(info.context).group_users.load(self.pk)
+
 
 class UserType(DjangoObjectType):
     class Meta:
         model = get_user_model()
+        exclude_fields = ("password", "normalized_email", "token_version")
+
+    # Expected size of list fields, see config.complexity
+    field_costs = {"groups": {"multiplier": 5}, "user_permissions": {"multiplier": 20}}
+
+    # Seconds responses may be cached for, see config.response_cache. Only the
+    # columns invalidate the cache when they change, not the relations.
+    field_max_ages = dict.fromkeys(
+        (
+            "id",
+            "email",
+            "first_name",
+            "middle_name",
+            "last_name",
+            "is_active",
+            "is_staff",
+            "is_superuser",
+            "last_login",
+            "date_joined",
+            "created",
+            "modified",
+        ),
+        60,
+    )
+
+    def resolve_groups(self, info):
+        prefetched = get_prefetched(self, "groups")
+
+        if prefetched is not None:
+            return prefetched
+
+        return get_loaders(info.context).user_groups.load(self.pk)
+
+    def resolve_user_permissions(self, info):
+        prefetched = get_prefetched(self, "user_permissions")
+
+        if prefetched is not None:
+            return prefetched
+
+        return get_loaders(info.context).user_permissions.load(self.pk)
+
+
+class UserConnection(graphene.relay.Connection):
+    class Meta:
+        node = UserType
+
+
+users_paginator = KeysetPaginator(("created", "id"))
+
+
+class UserQuery(object):
+    users = graphene.relay.ConnectionField(
+        UserConnection,
+        is_active=graphene.Boolean(),
+        email_starts_with=graphene.String(),
+    )
+
+    @staff_required
+    def resolve_users(self, info, **args):
+        queryset = get_user_model().objects.all()
+
+        if args.get("is_active") is not None:
+            queryset = queryset.filter(is_active=args["is_active"])
+
+        if args.get("email_starts_with"):
+            queryset = queryset.filter(
+                normalized_email__startswith=get_normalized_email(
+                    args["email_starts_with"]
+                )
+            )
+
+        users, has_previous_page, has_next_page = users_paginator.paginate(
+            optimize_connection_queryset(queryset, info, users_paginator.ordering),
+            first=args.get("first"),
+            after=args.get("after"),
+            last=args.get("last"),
+            before=args.get("before"),
+        )
+        edges = [
+            UserConnection.Edge(node=user, cursor=users_paginator.encode_cursor(user))
+            for user in users
+        ]
+
+        return UserConnection(
+            edges=edges,
+            page_info=graphene.relay.PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_previous_page,
+                has_next_page=has_next_page,
+            ),
+        )
+
+
+class UserSubscription(object):
+    viewer_changed = graphene.Field(UserType)
+
+    @login_required
+    def resolve_viewer_changed(self, info):
+        # The broker and the thread pool runner are set by config.subscriptions
+        return iter_user_changes(
+            info.context.broker, info.context.user, info.context.run
+        )
@@ -0,0 +1,35 @@
+from unittest import mock
+
+import pytest
+
+from klasse.users.backends import ModelBackend
+from klasse.users.hashing import HashingService
+
+
+def test_authenticate(user):
+    user.is_active = True
+    user.save()
+
+    backend = ModelBackend()
+
+    assert backend.authenticate(None, email=user.email, password="password") == user
+    assert backend.authenticate(None, email=user.email, password="wrong") is None
+
+
+def test_authenticate_inactive_user(user):
+    backend = ModelBackend()
+
+    assert backend.authenticate(None, email=user.email, password="password") is None
+
+
+@pytest.mark.django_db
+def test_authenticate_unknown_user():
+    backend = ModelBackend()
+
+    with mock.patch.object(HashingService, "make_password") as make_password:
+        assert (
+            backend.authenticate(None, email="unknown@example.com", password="x")
+            is None
+        )
+
+    make_password.assert_called_once_with("x")
@@ -0,0 +1,191 @@
+import threading
+import time
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from klasse.users.caching import (
+    get_id_key,
+    get_user_by_email,
+    get_user_by_id,
+    single_flight,
+)
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def count_queries(function, *args):
+    with CaptureQueriesContext(connection) as queries:
+        result = function(*args)
+
+    return result, len(queries)
+
+
+def test_get_user_by_id(user):
+    cached, queries = count_queries(get_user_by_id, user.pk)
+
+    assert cached == user
+    assert queries == 1
+
+    cached, queries = count_queries(get_user_by_id, user.pk)
+
+    assert cached == user
+    assert cached.email == user.email
+    assert queries == 0
+
+
+def test_get_user_by_email(user):
+    cached, queries = count_queries(get_user_by_email, " User@Example.com")
+
+    assert cached == user
+    assert queries == 2
+
+    cached, queries = count_queries(get_user_by_email, "user@example.com")
+
+    assert cached == user
+    assert queries == 0
+
+
+def test_unknown_user(django_user_model, user):
+    with pytest.raises(django_user_model.DoesNotExist):
+        get_user_by_email("unknown@example.com")
+
+    with pytest.raises(django_user_model.DoesNotExist):
+        get_user_by_id(django_user_model().pk)
+
+
+def test_invalidated_on_save(user):
+    get_user_by_id(user.pk)
+
+    user.first_name = "Mark"
+    user.save()
+
+    assert get_user_by_id(user.pk).first_name == "Mark"
+
+
+def test_invalidated_on_delete(django_user_model, user):
+    get_user_by_email(user.email)
+
+    user.delete()
+
+    with pytest.raises(django_user_model.DoesNotExist):
+        get_user_by_id(user.pk)
+
+    with pytest.raises(django_user_model.DoesNotExist):
+        get_user_by_email(user.email)
+
+
+def test_email_moved_to_another_user(django_user_model, user):
+    get_user_by_email(user.email)
+
+    user.email = "moved@example.com"
+    user.save()
+    other = django_user_model.objects.create_user(email="user@example.com")
+
+    assert get_user_by_email("user@example.com") == other
+    assert get_user_by_email("moved@example.com") == user
+
+
+def test_stale_read_is_ignored(user, user_cache):
+    """
+    A snapshot loaded before a change and written back after it is ignored.
+    """
+    get_user_by_id(user.pk)
+    entry = user_cache.get(get_id_key(user.pk))
+
+    user.first_name = "Mark"
+    user.save()
+    user_cache.set(get_id_key(user.pk), entry)
+
+    assert get_user_by_id(user.pk).first_name == "Mark"
+
+
+def test_not_cached_in_transaction(user):
+    with transaction.atomic():
+        get_user_by_id(user.pk)
+
+    _, queries = count_queries(get_user_by_id, user.pk)
+
+    assert queries == 1
+
+
+def test_disabled(settings, user):
+    settings.USER_CACHE = dict(settings.USER_CACHE, ENABLED=False)
+
+    get_user_by_email(user.email)
+    _, queries = count_queries(get_user_by_email, user.email)
+
+    assert queries == 1
+
+
+def test_single_flight(user_cache):
+    loads = []
+
+    def load():
+        loads.append(None)
+        time.sleep(0.05)
+        user_cache.set("key", "value")
+
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(
+                single_flight("key", lambda: user_cache.get("key"), load)
+            )
+        )
+        for _ in range(8)
+    ]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert results == ["value"] * 8
+
+
+def test_single_flight_lock_timeout(settings, user_cache):
+    settings.USER_CACHE = dict(settings.USER_CACHE, LOCK_TIMEOUT=0.05)
+    user_cache.add("key:lock", True)
+
+    assert single_flight("key", lambda: None, lambda: "value") == "value"
+
+
+def test_viewer(client, user, token, settings):
+    settings.JWT_TOKEN_CACHE = dict(settings.JWT_TOKEN_CACHE, BACKEND=None)
+    user.is_active = True
+    user.save()
+
+    def viewer():
+        return client.post(
+            "/graphql",
+            '{"query": "{ viewer { email } }"}',
+            content_type="application/json",
+            HTTP_AUTHORIZATION=token,
+        )
+
+    _, queries = count_queries(viewer)
+    response, cached_queries = count_queries(viewer)
+
+    assert response.json()["data"] == {"viewer": {"email": user.email}}
+    assert queries == 2
+    assert cached_queries == 0
+
+
+def test_benchmark_command():
+    stdout = StringIO()
+
+    call_command("benchmark_user_cache", requests=20, users=2, stdout=stdout)
+
+    uncached, cached = [line.split() for line in stdout.getvalue().splitlines()]
+
+    assert uncached[0] == "uncached" and uncached[4] == "20"
+    assert cached[0] == "cached" and cached[4] == "4"
@@ -0,0 +1,105 @@
+import csv
+import json
+from io import StringIO
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+
+from klasse.users.exports import EXPORT_FIELDS, Export
+from klasse.users.tests.factories import UserFactory
+
+
+@pytest.fixture
+def users(db):
+    return UserFactory.create_batch(5)
+
+
+def test_export_ndjson(users, django_assert_num_queries):
+    export = Export(get_user_model().objects.all(), chunk_size=2)
+
+    with django_assert_num_queries(1):
+        chunks = list(export)
+
+    rows = [json.loads(line) for line in "".join(chunks).splitlines()]
+
+    assert len(chunks) == 3
+    assert export.rows == 5
+    assert {row["email"] for row in rows} == {user.email for user in users}
+    assert set(rows[0]) == set(EXPORT_FIELDS)
+    assert "password" not in rows[0]
+
+
+def test_export_csv(users):
+    user = users[0]
+    user.first_name = 'Jean, "Jr"\nJunior'
+    user.save()
+
+    export = Export(get_user_model().objects.all(), "csv", chunk_size=2)
+    rows = list(csv.DictReader(StringIO("".join(export))))
+
+    assert export.rows == 5
+    assert len(rows) == 5
+    assert {row["email"]: row["first_name"] for row in rows}[user.email] == (
+        user.first_name
+    )
+    assert {row["email"]: row["created"] for row in rows}[user.email] == (
+        user.created.isoformat()
+    )
+
+
+def test_export_is_lazy(users, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        iter(Export(get_user_model().objects.all()))
+
+
+def test_export_view(client, user, token, users):
+    user.is_staff = True
+    user.save()
+
+    response = client.get(
+        reverse("export_users"), {"format": "csv"}, HTTP_AUTHORIZATION=token
+    )
+    content = b"".join(response.streaming_content).decode()
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/csv"
+    assert len(list(csv.DictReader(StringIO(content)))) == 6
+
+
+def test_export_view_unknown_format(client, user, token):
+    user.is_staff = True
+    user.save()
+
+    response = client.get(
+        reverse("export_users"), {"format": "xml"}, HTTP_AUTHORIZATION=token
+    )
+
+    assert response.status_code == 400
+
+
+def test_export_view_not_staff(client, user, token):
+    response = client.get(reverse("export_users"), HTTP_AUTHORIZATION=token)
+
+    assert response.status_code == 403
+
+
+def test_export_command(users, tmpdir):
+    output = tmpdir.join("users.ndjson")
+    stderr = StringIO()
+
+    call_command("export_users", output=str(output), chunk_size=2, stderr=stderr)
+
+    assert len(output.readlines()) == 5
+    assert stderr.getvalue().startswith("Exported 5 users in ")
+    assert "rows/s" in stderr.getvalue()
+
+
+def test_export_command_stdout(users):
+    stdout = StringIO()
+
+    call_command("export_users", format="csv", stdout=stdout, stderr=StringIO())
+
+    assert len(stdout.getvalue().splitlines()) == 6
@@ -0,0 +1,76 @@
+from io import StringIO
+
+import pytest
+
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management import call_command
+
+from klasse.users.hashers import BudgetedPBKDF2PasswordHasher, calibrate
+from klasse.users.hashing import check_password
+
+
+@pytest.fixture
+def budgeted_hasher(settings):
+    settings.PASSWORD_HASHERS = ("klasse.users.hashers.BudgetedPBKDF2PasswordHasher",)
+    settings.PASSWORD_HASHING = dict(
+        settings.PASSWORD_HASHING, TARGET_MS=2, TOLERANCE=0.25, MIN_ITERATIONS=1000
+    )
+
+    return get_hasher()
+
+
+def test_calibrate():
+    assert calibrate(2, 1000) % 1000 == 0
+    assert calibrate(20, 1000) > calibrate(2, 1000)
+    assert calibrate(2, 10 ** 9) == 10 ** 9
+
+
+def test_iterations(budgeted_hasher):
+    assert isinstance(budgeted_hasher, BudgetedPBKDF2PasswordHasher)
+    assert budgeted_hasher.iterations == calibrate(2, 1000)
+
+
+def test_must_update(budgeted_hasher):
+    salt = budgeted_hasher.salt()
+    iterations = budgeted_hasher.iterations
+
+    on_target = budgeted_hasher.encode("password", salt)
+    too_cheap = budgeted_hasher.encode("password", salt, iterations // 2)
+    too_expensive = budgeted_hasher.encode("password", salt, iterations * 2)
+    below_minimum = budgeted_hasher.encode("password", salt, 500)
+
+    assert not budgeted_hasher.must_update(on_target)
+    assert budgeted_hasher.must_update(too_cheap)
+    assert budgeted_hasher.must_update(too_expensive)
+    assert budgeted_hasher.must_update(below_minimum)
+
+
+def test_login_rehashes_off_target_hash(budgeted_hasher, user):
+    user.password = budgeted_hasher.encode(
+        "password", budgeted_hasher.salt(), budgeted_hasher.iterations * 4
+    )
+    user.save()
+
+    assert check_password(user, "password")
+
+    user.refresh_from_db()
+
+    assert int(user.password.split("$")[1]) == budgeted_hasher.iterations
+
+
+def test_create_user_uses_budget(budgeted_hasher, django_user_model):
+    user = django_user_model.objects.create_user(
+        email="budget@example.com", password="password"
+    )
+
+    assert not budgeted_hasher.must_update(user.password)
+    assert make_password("password").startswith("pbkdf2_sha256$")
+
+
+def test_benchmark_hashers_command(budgeted_hasher):
+    stdout = StringIO()
+
+    call_command("benchmark_hashers", duration=0.01, stdout=stdout)
+
+    assert "BudgetedPBKDF2PasswordHasher" in stdout.getvalue()
+    assert "hashes/s" in stdout.getvalue()
@@ -0,0 +1,153 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from django.contrib.auth.hashers import make_password
+
+from klasse.users.hashing import (
+    HashingService,
+    HashingServiceBusy,
+    check_password,
+    get_hashing_service,
+    set_password,
+    verify_password,
+)
+from klasse.users.metrics import get_timings, reset_timings
+
+
+def test_verify_password():
+    encoded = make_password("password")
+
+    assert verify_password("password", encoded) == (True, False)
+    assert verify_password("wrong", encoded) == (False, False)
+
+
+@pytest.fixture
+def sha1_hasher(settings):
+    settings.PASSWORD_HASHERS = (
+        "django.contrib.auth.hashers.MD5PasswordHasher",
+        "django.contrib.auth.hashers.SHA1PasswordHasher",
+    )
+
+
+def test_verify_password_must_update(sha1_hasher):
+    encoded = make_password("password", hasher="sha1")
+
+    assert verify_password("password", encoded) == (True, True)
+
+
+def test_hashing_service_in_process():
+    service = HashingService(workers=0)
+    encoded = service.make_password("password")
+
+    assert service.check_password("password", encoded) == (True, False)
+    assert service._pool is None
+
+
+def test_hashing_service_process_pool():
+    service = HashingService(workers=1)
+
+    try:
+        encoded = service.make_password("password")
+
+        assert service.check_password("password", encoded) == (True, False)
+        assert service._pool is not None
+    finally:
+        service.shutdown()
+
+
+def test_hashing_service_busy():
+    service = HashingService(workers=0, max_pending=1, timeout=0.01)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait()
+
+    thread = threading.Thread(target=service.run, args=(slow_hash,))
+    thread.start()
+    started.wait()
+
+    try:
+        with pytest.raises(HashingServiceBusy):
+            service.make_password("password")
+    finally:
+        release.set()
+        thread.join()
+
+    assert service.make_password("password")
+
+
+def test_hashing_service_timeout_keeps_slot():
+    service = HashingService(workers=1, max_pending=1, timeout=0.2)
+
+    try:
+        # Start the worker process
+        assert service.run(pow, 2, 2) == 4
+
+        with pytest.raises(HashingServiceBusy):
+            service.run(time.sleep, 1)
+
+        # The timed out hash is still running
+        with pytest.raises(HashingServiceBusy):
+            service.run(pow, 2, 2)
+
+        time.sleep(1)
+
+        assert service.run(pow, 2, 2) == 4
+    finally:
+        service.shutdown()
+
+
+def test_hashing_service_timings():
+    reset_timings()
+
+    service = HashingService(workers=0)
+    service.check_password("password", service.make_password("password"))
+
+    timings = get_timings()
+
+    assert timings["hashing.hash"].count == 1
+    assert timings["hashing.verify"].count == 1
+
+
+def test_get_hashing_service(settings):
+    settings.PASSWORD_HASHING = {"WORKERS": 2, "MAX_PENDING": 4, "TIMEOUT": 1}
+
+    assert get_hashing_service().workers == 2
+
+
+def test_check_password_upgrades_hash(sha1_hasher, user):
+    user.password = make_password("password", hasher="sha1")
+    user.save()
+
+    assert check_password(user, "password")
+
+    user.refresh_from_db()
+
+    assert user.password.startswith("md5$")
+
+
+def test_check_password_upgrade_keeps_tokens(sha1_hasher, django_user_model, user):
+    for check in (check_password, django_user_model.check_password):
+        user.password = make_password("password", hasher="sha1")
+        user.save()
+
+        assert check(user, "password")
+
+    user.refresh_from_db()
+
+    assert user.password.startswith("md5$")
+    assert user.token_version == 0
+
+
+def test_set_password(user):
+    with mock.patch(
+        "klasse.users.hashing.HashingService.make_password", return_value="encoded"
+    ):
+        set_password(user, "password")
+
+    assert user.password == "encoded"
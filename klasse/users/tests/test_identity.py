@@ -0,0 +1,310 @@
+import json
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from klasse.users.caching import get_user_by_id
+from klasse.users.identity import IdentityMap, get_identity_map
+from klasse.users.middleware import get_user
+from klasse.users.refresh_tokens import issue_refresh_token
+from klasse.users.utils import password_reset_token_generator
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def uncached(settings):
+    settings.JWT_TOKEN_CACHE = dict(settings.JWT_TOKEN_CACHE, BACKEND=None)
+    settings.USER_CACHE = dict(settings.USER_CACHE, ENABLED=False)
+
+
+def count_user_queries(queries):
+    return len([query for query in queries if 'FROM "users_user"' in query["sql"]])
+
+
+def test_get_by_email(user, uncached):
+    identity_map = IdentityMap()
+
+    with CaptureQueriesContext(connection) as queries:
+        found = identity_map.get_by_email(" User@Example.com")
+
+        assert identity_map.get_by_email("user@example.com") is found
+        assert identity_map.get_by_id(str(user.pk)) is found
+
+    assert found == user
+    assert len(queries) == 1
+
+
+def test_get_by_id(user, uncached):
+    identity_map = IdentityMap()
+    found = identity_map.get_by_id(user.pk)
+
+    with CaptureQueriesContext(connection) as queries:
+        assert identity_map.get_by_email(user.email) is found
+
+    assert len(queries) == 0
+
+
+def test_add_keeps_loaded_instance(django_user_model, user):
+    identity_map = IdentityMap()
+
+    assert identity_map.add(user) is user
+    assert identity_map.add(django_user_model.objects.get(pk=user.pk)) is user
+
+
+def test_snapshot(django_user_model, user):
+    identity_map = IdentityMap()
+    snapshot = django_user_model.objects.get(pk=user.pk)
+    snapshot.first_name = "Mark"
+
+    assert identity_map.add(snapshot, snapshot=True) is snapshot
+
+    with CaptureQueriesContext(connection) as queries:
+        assert identity_map.get_by_id(user.pk) is snapshot
+        assert identity_map.get_by_email(user.email) is snapshot
+
+    assert len(queries) == 0
+    assert snapshot.first_name == "Mark"
+
+    with CaptureQueriesContext(connection) as queries:
+        assert identity_map.get_by_id(user.pk, current=True) is snapshot
+        assert identity_map.get_by_email(user.email, current=True) is snapshot
+
+    assert len(queries) == 1
+    assert snapshot.first_name == "John"
+
+
+def test_snapshot_replaced_by_row(django_user_model, user):
+    identity_map = IdentityMap()
+    snapshot = django_user_model.objects.only("id", "email").get(pk=user.pk)
+    identity_map.add(snapshot, snapshot=True)
+
+    assert identity_map.add(django_user_model.objects.get(pk=user.pk)) is snapshot
+    assert not snapshot.get_deferred_fields()
+
+    with CaptureQueriesContext(connection) as queries:
+        assert identity_map.get_by_email(user.email, current=True) is snapshot
+
+    assert len(queries) == 0
+
+
+def test_changed_email(django_user_model, user):
+    identity_map = IdentityMap()
+    identity_map.add(user)
+
+    user.email = "moved@example.com"
+    user.save()
+    other = django_user_model.objects.create_user(email="user@example.com")
+
+    assert identity_map.get_by_email("user@example.com") == other
+    assert identity_map.get_by_email("moved@example.com") is user
+
+
+def test_unknown_user(django_user_model):
+    with pytest.raises(django_user_model.DoesNotExist):
+        IdentityMap().get_by_email("unknown@example.com")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_primary(django_user_model, user, user_cache):
+    get_user_by_id(user.pk)
+    # Without signals, so the cached snapshot is stale
+    django_user_model.objects.filter(pk=user.pk).update(first_name="Mark")
+
+    assert get_user_by_id(user.pk).first_name == "John"
+    assert IdentityMap().get_by_id(user.pk).first_name == "Mark"
+
+
+def test_clear(user):
+    identity_map = IdentityMap()
+    identity_map.add(user)
+    identity_map.clear()
+
+    assert identity_map.get_by_id(user.pk) is not user
+
+
+def test_threads(user):
+    identity_map = IdentityMap()
+    loads = []
+
+    def get_by_email(email):
+        loads.append(email)
+        time.sleep(0.05)
+
+        return user
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(identity_map.get_by_email(user.email))
+        )
+        for _ in range(8)
+    ]
+
+    with mock.patch("klasse.users.identity.get_primary_manager") as manager:
+        manager.return_value.get_by_email = get_by_email
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+    assert len(loads) == 1
+    assert results == [user] * 8
+
+
+def test_get_identity_map(rf):
+    request = rf.get("/")
+
+    assert get_identity_map(request) is get_identity_map(request)
+    assert get_identity_map(None) is not get_identity_map(None)
+
+
+def test_request(client, user, token, uncached):
+    """
+    The user authenticating a request is fetched once, and shared with the
+    mutations looking it up.
+    """
+    user.is_active = True
+    user.save()
+
+    query = """
+        mutation PasswordResetConfirm($token: String!) {
+            update(firstName: "Mark") {
+                success
+            }
+            passwordResetConfirm(
+                email: "user@example.com",
+                password: "p@ssword!",
+                passwordRepeat: "p@ssword!",
+                passwordResetToken: $token
+            ) {
+                success
+            }
+        }
+    """
+    data = {
+        "query": query,
+        "variables": {"token": password_reset_token_generator.make_token(user)},
+    }
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(
+            reverse("graphql"),
+            json.dumps(data),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=token,
+        )
+
+    assert response.json()["data"] == {
+        "update": {"success": True},
+        "passwordResetConfirm": {"success": True},
+    }
+    assert count_user_queries(queries) == 1
+    assert not response.wsgi_request.identity_map._users
+
+
+def post(client, query, variables, token):
+    return client.post(
+        reverse("graphql"),
+        json.dumps({"query": query, "variables": variables}),
+        content_type="application/json",
+        HTTP_AUTHORIZATION=token,
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_login_reads_primary(client, django_user_model, user, user_cache):
+    user.is_active = True
+    user.save()
+    get_user_by_id(user.pk)
+    # Without signals, so the cached snapshot is stale
+    django_user_model.objects.filter(pk=user.pk).update(is_active=False)
+
+    query = """
+        mutation {
+            login(email: "user@example.com", password: "password") {
+                success
+            }
+        }
+    """
+    response = post(client, query, {}, "")
+
+    assert response.json()["data"] == {"login": {"success": False}}
+
+
+def test_refresh_token(client, user, token, uncached):
+    """
+    The user of a refresh token is not fetched again when the request already
+    loaded it.
+    """
+    user.is_active = True
+    user.save()
+
+    query = """
+        mutation RefreshToken($refreshToken: String!) {
+            update(firstName: "Mark") {
+                success
+            }
+            refreshToken(refreshToken: $refreshToken) {
+                success
+            }
+        }
+    """
+    variables = {"refreshToken": issue_refresh_token(user)}
+
+    with CaptureQueriesContext(connection) as queries:
+        response = post(client, query, variables, token)
+
+    assert response.json()["data"] == {
+        "update": {"success": True},
+        "refreshToken": {"success": True},
+    }
+    assert count_user_queries(queries) == 1
+    assert not any("JOIN" in query["sql"] for query in queries)
+
+
+def test_cached_user(rf, user, token):
+    """
+    Users authenticating requests from a cache are shared with the mutations.
+    """
+    for _ in range(2):
+        request = rf.get("/", HTTP_AUTHORIZATION=token)
+        authenticated = get_user(request)
+
+        with CaptureQueriesContext(connection) as queries:
+            identity_map = get_identity_map(request)
+
+            assert identity_map.get_by_id(user.pk) is authenticated
+            assert identity_map.get_by_email(user.email) is authenticated
+
+        assert len(queries) == 0
+
+
+def test_cached_user_update(client, user, token):
+    """
+    Users authenticating requests from a cache are reloaded by the mutations
+    writing them.
+    """
+    post(client, "query { viewer { email } }", {}, token)
+
+    query = """
+        mutation {
+            update(firstName: "Mark") {
+                success
+            }
+        }
+    """
+
+    with CaptureQueriesContext(connection) as queries:
+        response = post(client, query, {}, token)
+
+    assert response.json()["data"] == {"update": {"success": True}}
+    assert count_user_queries(queries) == 1
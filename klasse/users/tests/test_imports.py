@@ -0,0 +1,134 @@
+import json
+from io import StringIO
+from unittest import mock
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from klasse.users.imports import chunked, import_batch, read_rows
+
+ROWS = [
+    {"email": "jane@EXAMPLE.com", "name": "Jane Doe", "password": "secret"},
+    {"email": "john@example.com", "name": "John Q. Public", "is_active": "true"},
+    {"email": "jane@example.com", "name": "Jane Again", "password": "other"},
+]
+
+
+@pytest.fixture
+def csv_file(tmpdir):
+    source = tmpdir.join("users.csv")
+    source.write(
+        "email,name,password,is_active\n"
+        + "\n".join(
+            "{},{},{},{}".format(
+                row["email"],
+                row["name"],
+                row.get("password", ""),
+                row.get("is_active", ""),
+            )
+            for row in ROWS
+        )
+    )
+
+    return str(source)
+
+
+@pytest.fixture
+def jsonl_file(tmpdir):
+    source = tmpdir.join("users.jsonl")
+    source.write("\n".join(json.dumps(row) for row in ROWS))
+
+    return str(source)
+
+
+def test_read_rows(csv_file, jsonl_file):
+    assert [row["email"] for row in read_rows(csv_file)] == [
+        row["email"] for row in ROWS
+    ]
+    assert list(read_rows(jsonl_file)) == ROWS
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.django_db
+def test_import_batch(django_assert_num_queries):
+    with django_assert_num_queries(4):
+        assert import_batch(ROWS) == 2
+
+    jane = get_user_model().objects.get(email="jane@example.com")
+    john = get_user_model().objects.get(email="john@example.com")
+
+    assert jane.check_password("secret")
+    assert (jane.first_name, jane.last_name) == ("Jane", "Doe")
+    assert not jane.is_active
+    assert not john.has_usable_password()
+    assert john.middle_name == "Q."
+    assert john.is_active
+
+
+def test_import_batch_existing_email(user):
+    assert import_batch([{"email": user.email, "name": "John Doe"}]) == 0
+    assert import_batch([{"email": " USER@example.com", "name": "John Doe"}]) == 0
+
+
+@pytest.mark.django_db
+def test_import_batch_normalized_email():
+    assert import_batch([{"email": "Jane.Doe@Example.com", "name": "Jane"}]) == 1
+
+    jane = get_user_model().objects.get()
+
+    assert jane.email == "Jane.Doe@example.com"
+    assert jane.normalized_email == "jane.doe@example.com"
+
+
+@pytest.mark.django_db
+def test_import_batch_conflict():
+    get_user_model().objects.create_user(email="jane@example.com")
+
+    # Jane registers between the lookup of existing emails and the insert.
+    with mock.patch("klasse.users.imports.get_existing_emails", return_value=set()):
+        assert import_batch(ROWS) == 1
+
+    assert get_user_model().objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_import_users_command(csv_file):
+    stdout = StringIO()
+
+    call_command("import_users", csv_file, batch_size=2, workers=2, stdout=stdout)
+
+    assert get_user_model().objects.count() == 2
+    assert "Imported 2 users, skipped 1 rows" in stdout.getvalue()
+    assert "rows/s" in stdout.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_users_command_checkpoint(jsonl_file, tmpdir):
+    checkpoint = str(tmpdir.join("checkpoint.json"))
+
+    call_command(
+        "import_users",
+        jsonl_file,
+        batch_size=1,
+        workers=0,
+        checkpoint=checkpoint,
+        stdout=StringIO(),
+    )
+
+    with open(checkpoint) as f:
+        assert json.load(f)["rows"] == 3
+
+    get_user_model().objects.all().delete()
+
+    stdout = StringIO()
+    call_command(
+        "import_users", jsonl_file, workers=0, checkpoint=checkpoint, stdout=stdout
+    )
+
+    assert "Resuming after 3 rows" in stdout.getvalue()
+    assert get_user_model().objects.count() == 0
@@ -0,0 +1,199 @@
+import json
+
+import jwt
+import pytest
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jwt.algorithms import ECAlgorithm, RSAAlgorithm
+
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import reverse
+
+from klasse.users.keys import KeySet, get_jwk, get_key_set, load_key
+from klasse.users.utils import jwt_decode_handler, jwt_encode_handler
+
+
+def private_pem(key):
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode("ascii")
+
+
+def public_pem(key):
+    return (
+        key.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        .decode("ascii")
+    )
+
+
+@pytest.fixture(scope="module")
+def rsa_key():
+    return rsa.generate_private_key(65537, 2048, default_backend())
+
+
+@pytest.fixture(scope="module")
+def ec_key():
+    return ec.generate_private_key(ec.SECP256R1(), default_backend())
+
+
+@pytest.fixture
+def jwt_keys(settings, rsa_key, ec_key):
+    settings.JWT_KEYS = dict(
+        settings.JWT_KEYS,
+        SIGNING_KEY="2018-07",
+        KEYS=[
+            {
+                "KID": "2018-07",
+                "ALGORITHM": "RS256",
+                "PRIVATE_KEY": private_pem(rsa_key),
+            },
+            {"KID": "2018-06", "ALGORITHM": "ES256", "PUBLIC_KEY": public_pem(ec_key)},
+        ],
+    )
+
+    return settings.JWT_KEYS
+
+
+def test_load_key_derives_public_key(rsa_key):
+    key = load_key("a", "RS256", private_key=private_pem(rsa_key))
+
+    assert key.public_key.public_numbers() == rsa_key.public_key().public_numbers()
+
+
+def test_load_key_without_keys():
+    with pytest.raises(ImproperlyConfigured):
+        load_key("a", "RS256")
+
+
+def test_load_key_unsupported_algorithm(rsa_key):
+    with pytest.raises(ImproperlyConfigured):
+        load_key("a", "XX256", private_key=private_pem(rsa_key))
+
+
+def test_key_set_signing_key_without_private_key(ec_key):
+    key = load_key("a", "ES256", public_key=public_pem(ec_key))
+
+    with pytest.raises(ImproperlyConfigured):
+        KeySet([key], signing_kid="a")
+
+    with pytest.raises(ImproperlyConfigured):
+        KeySet([key], signing_kid="b")
+
+
+def test_get_jwk(rsa_key, ec_key):
+    rsa_jwk = get_jwk(load_key("a", "RS256", private_key=private_pem(rsa_key)))
+    ec_jwk = get_jwk(load_key("b", "ES256", private_key=private_pem(ec_key)))
+
+    assert rsa_jwk["kty"] == "RSA"
+    assert (rsa_jwk["kid"], rsa_jwk["alg"], rsa_jwk["use"]) == ("a", "RS256", "sig")
+    assert "d" not in rsa_jwk
+    assert ec_jwk["kty"] == "EC"
+    assert ec_jwk["crv"] == "P-256"
+    assert (ec_jwk["kid"], ec_jwk["alg"], ec_jwk["use"]) == ("b", "ES256", "sig")
+    assert "d" not in ec_jwk
+
+    assert (
+        RSAAlgorithm.from_jwk(json.dumps(rsa_jwk)).public_numbers()
+        == rsa_key.public_key().public_numbers()
+    )
+
+    # PyJWT can't load EC keys from JWKs yet, compare the coordinates instead
+    numbers = ec_key.public_key().public_numbers()
+    assert jwt.utils.base64url_decode(ec_jwk["x"]) == numbers.x.to_bytes(32, "big")
+    assert jwt.utils.base64url_decode(ec_jwk["y"]) == numbers.y.to_bytes(32, "big")
+
+
+def test_get_key_set_is_cached(jwt_keys):
+    assert get_key_set() is get_key_set()
+    assert get_key_set().signing_key.kid == "2018-07"
+
+
+def test_encode_with_signing_key(jwt_keys, rsa_key):
+    token = jwt_encode_handler({"email": "john@doe.com"})
+
+    assert jwt.get_unverified_header(token) == {
+        "alg": "RS256",
+        "kid": "2018-07",
+        "typ": "JWT",
+    }
+    assert jwt.decode(token, rsa_key.public_key(), algorithms=["RS256"]) == {
+        "email": "john@doe.com"
+    }
+    assert jwt_decode_handler(token) == {"email": "john@doe.com"}
+
+
+def test_decode_with_verification_key(jwt_keys, ec_key):
+    # Tokens signed with a key that was rotated out verify until it's removed
+    token = jwt.encode(
+        {"email": "john@doe.com"},
+        ECAlgorithm(ECAlgorithm.SHA256).prepare_key(private_pem(ec_key)),
+        algorithm="ES256",
+        headers={"kid": "2018-06"},
+    ).decode("utf-8")
+
+    assert jwt_decode_handler(token) == {"email": "john@doe.com"}
+
+
+def test_decode_unknown_kid(jwt_keys, ec_key):
+    token = jwt.encode(
+        {"email": "john@doe.com"},
+        private_pem(ec_key),
+        algorithm="ES256",
+        headers={"kid": "2018-05"},
+    ).decode("utf-8")
+
+    with pytest.raises(jwt.InvalidTokenError):
+        jwt_decode_handler(token)
+
+
+def test_decode_rejects_other_algorithm(jwt_keys, rsa_key):
+    # A token claiming a key id can't pick the algorithm it's verified with
+    token = jwt.encode(
+        {"email": "john@doe.com"},
+        private_pem(rsa_key),
+        algorithm="RS512",
+        headers={"kid": "2018-07"},
+    ).decode("utf-8")
+
+    with pytest.raises(jwt.InvalidTokenError):
+        jwt_decode_handler(token)
+
+
+def test_decode_hs256(jwt_keys, settings):
+    token = jwt.encode(
+        {"email": "john@doe.com"}, settings.SECRET_KEY, algorithm="HS256"
+    ).decode("utf-8")
+
+    assert jwt_decode_handler(token) == {"email": "john@doe.com"}
+
+    settings.JWT_KEYS = dict(jwt_keys, ACCEPT_HS256=False)
+
+    with pytest.raises(jwt.InvalidTokenError):
+        jwt_decode_handler(token)
+
+
+def test_encode_without_signing_key():
+    token = jwt_encode_handler({"email": "john@doe.com"})
+
+    assert "kid" not in jwt.get_unverified_header(token)
+    assert jwt_decode_handler(token) == {"email": "john@doe.com"}
+
+
+def test_jwks_view(jwt_keys, client):
+    response = client.get(reverse("jwks"))
+
+    assert response.status_code == 200
+    assert response["Cache-Control"] == "public, max-age=300"
+    assert [key["kid"] for key in response.json()["keys"]] == ["2018-07", "2018-06"]
+
+
+def test_jwks_view_without_keys(client):
+    response = client.get(reverse("jwks"))
+
+    assert response.json() == {"keys": []}
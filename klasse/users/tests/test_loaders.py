@@ -0,0 +1,117 @@
+import pytest
+from promise import Promise
+
+from django.contrib.auth.models import Permission
+
+from klasse.users.loaders import Loaders, get_loaders
+from klasse.users.tests.factories import GroupFactory, UserFactory
+
+
+def load_many(loader, keys):
+    # Loads are only batched while a promise chain is being resolved, as they
+    # are during query execution.
+    return Promise.resolve(None).then(lambda _: loader.load_many(keys)).get()
+
+
+@pytest.fixture
+def permissions(db):
+    return list(Permission.objects.all()[:2])
+
+
+@pytest.fixture
+def groups(permissions):
+    groups = GroupFactory.create_batch(2)
+
+    for group in groups:
+        group.permissions.set(permissions)
+
+    return groups
+
+
+@pytest.fixture
+def users(groups, permissions):
+    users = UserFactory.create_batch(3)
+
+    for user in users:
+        user.groups.set(groups)
+        user.user_permissions.set(permissions)
+
+    return users
+
+
+def test_get_loaders(rf):
+    request = rf.request()
+
+    assert get_loaders(request) is get_loaders(request)
+    assert isinstance(get_loaders(None), Loaders)
+
+
+def test_user_groups_loader(users, groups, django_assert_num_queries):
+    loader = Loaders().user_groups
+
+    with django_assert_num_queries(1):
+        result = load_many(loader, [user.pk for user in users])
+
+    assert result == [groups] * len(users)
+
+
+def test_group_users_loader(users, groups, django_assert_num_queries):
+    loader = Loaders().group_users
+
+    with django_assert_num_queries(1):
+        result = load_many(loader, [group.pk for group in groups])
+
+    assert [set(group_users) for group_users in result] == [set(users)] * len(groups)
+
+
+@pytest.mark.django_db
+def test_loader_missing_key():
+    loader = Loaders().user_permissions
+
+    assert loader.load("00000000-0000-0000-0000-000000000000").get() == []
+
+
+def test_nested_query_batched(
+    schema, rf, user, users, groups, permissions, django_assert_num_queries
+):
+    request = rf.request()
+    request.user = user
+
+    user.groups.set(groups)
+
+    query = """
+        query {
+            viewer {
+                groups {
+                    name
+                    permissions {
+                        codename
+                    }
+                    userSet {
+                        email
+                        groups {
+                            name
+                        }
+                        userPermissions {
+                            codename
+                        }
+                    }
+                }
+            }
+        }
+    """
+
+    # Every level of the tree is fetched with a single query per loader, no matter
+    # how many users and groups are resolved.
+    with django_assert_num_queries(5):
+        result = schema.execute(query, context_value=request)
+
+    assert not result.errors
+
+    viewer_groups = result.data["viewer"]["groups"]
+
+    assert len(viewer_groups) == len(groups)
+    assert len(viewer_groups[0]["userSet"]) == len(users) + 1
+    assert viewer_groups[0]["permissions"] == [
+        {"codename": permission.codename} for permission in permissions
+    ]
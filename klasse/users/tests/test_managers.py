@@ -2,6 +2,8 @@ import pytest
 
 from django.contrib.auth import get_user_model
 
+from klasse.users.managers import get_normalized_email
+
 
 @pytest.mark.django_db
 def test_create_user():
@@ -43,3 +45,20 @@ def test_create_superuser_superuser_error():
         get_user_model().objects.create_superuser(
             email="user@example.com", password="password", is_superuser=False
         )
+
+
+def test_get_normalized_email():
+    assert get_normalized_email(" Jane.Doe@Example.COM ") == "jane.doe@example.com"
+    assert get_normalized_email(None) == ""
+
+
+def test_get_by_email(user, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert get_user_model().objects.get_by_email(" USER@Example.com") == user
+
+    with pytest.raises(get_user_model().DoesNotExist):
+        get_user_model().objects.get_by_email("other@example.com")
+
+
+def test_get_by_natural_key(user):
+    assert get_user_model().objects.get_by_natural_key("User@example.com") == user
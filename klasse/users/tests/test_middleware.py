@@ -12,11 +12,11 @@ def test_missing_header(client):
         }
     """
 
-    expected = {"data": {"viewer": None}}
+    expected = {"viewer": None}
 
     url = "{}?{}".format(reverse("graphql"), urlencode({"query": query}))
     response = client.get(url)
-    result = response.json()
+    result = response.json()["data"]
 
     assert response.status_code == 200
     assert result == expected
@@ -31,11 +31,11 @@ def test_invalid_header(client, token):
         }
     """
 
-    expected = {"data": {"viewer": None}}
+    expected = {"viewer": None}
 
     url = "{}?{}".format(reverse("graphql"), urlencode({"query": query}))
     response = client.get(url, HTTP_AUTHORIZATION=token.replace("Bearer", "JWT"))
-    result = response.json()
+    result = response.json()["data"]
 
     assert response.status_code == 200
     assert result == expected
@@ -50,11 +50,11 @@ def test_invalid_token(client):
         }
     """
 
-    expected = {"data": {"viewer": None}}
+    expected = {"viewer": None}
 
     url = "{}?{}".format(reverse("graphql"), urlencode({"query": query}))
     response = client.get(url, HTTP_AUTHORIZATION="Bearer some.invalid.token")
-    result = response.json()
+    result = response.json()["data"]
 
     assert response.status_code == 200
     assert result == expected
@@ -69,11 +69,56 @@ def test_authenticated_user(client, user, token):
         }
     """
 
-    expected = {"data": {"viewer": {"email": user.email}}}
+    expected = {"viewer": {"email": user.email}}
 
     url = "{}?{}".format(reverse("graphql"), urlencode({"query": query}))
     response = client.get(url, HTTP_AUTHORIZATION=token)
-    result = response.json()
+    result = response.json()["data"]
 
     assert response.status_code == 200
     assert result == expected
+
+
+def test_authenticated_user_cached(client, user, token, django_assert_num_queries):
+    query = """
+        query {
+            viewer {
+                email
+            }
+        }
+    """
+
+    url = "{}?{}".format(reverse("graphql"), urlencode({"query": query}))
+    client.get(url, HTTP_AUTHORIZATION=token)
+
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_AUTHORIZATION=token)
+
+    assert response.json()["data"] == {"viewer": {"email": user.email}}
+
+
+def test_claims_user(client, user, token, settings, django_assert_num_queries):
+    settings.JWT_CLAIMS_USER = dict(settings.JWT_CLAIMS_USER, ENABLED=True)
+
+    query = """
+        query {
+            viewer {
+                email
+            }
+        }
+    """
+
+    url = "{}?{}".format(reverse("graphql"), urlencode({"query": query}))
+    client.get(url, HTTP_AUTHORIZATION=token)
+
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_AUTHORIZATION=token)
+
+    assert response.json()["data"] == {"viewer": {"email": user.email}}
+
+    user.is_active = True
+    user.save()
+
+    response = client.get(url, HTTP_AUTHORIZATION=token)
+
+    assert response.json()["data"] == {"viewer": None}
@@ -0,0 +1,74 @@
+from importlib import import_module
+
+import pytest
+
+from django.apps import apps
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from klasse.users.models import User
+from klasse.users.tests.factories import UserFactory
+
+migration = import_module("klasse.users.migrations.0006_user_normalized_email")
+
+
+def create_users(emails):
+    # Rows from before the migration, which save() would have normalized
+    for email in emails:
+        User.objects.filter(pk=UserFactory().pk).update(
+            email=email, normalized_email=None
+        )
+
+
+def test_check_normalized_email_conflicts(db, caplog):
+    create_users(
+        [
+            "Anna@example.com",
+            "bob@example.com",
+            "Carl@example.com",
+            "carl@example.com",
+            " CARL@example.com",
+            "Dora@example.com",
+            "dora@example.com",
+        ]
+    )
+
+    with pytest.raises(IntegrityError) as e:
+        migration.check_normalized_email_conflicts(apps, connection.schema_editor())
+
+    message = (
+        "Email addresses shared by several users: "
+        "carl@example.com (3 users), dora@example.com (2 users)"
+    )
+    assert str(e.value) == message
+    assert message in caplog.text
+
+
+def test_check_normalized_email_no_conflicts(db):
+    create_users(["Anna@example.com", "bob@example.com"])
+
+    migration.check_normalized_email_conflicts(apps, connection.schema_editor())
+
+
+def test_backfill_normalized_email(db, monkeypatch):
+    monkeypatch.setattr(migration, "BATCH_SIZE", 2)
+
+    emails = [
+        "Anna@example.com",
+        "bob@example.com",
+        " Carl@example.com",
+        "dora@example.com",
+        "Eve@Example.com",
+    ]
+    create_users(emails)
+
+    with CaptureQueriesContext(connection) as queries:
+        migration.backfill_normalized_email(apps, connection.schema_editor())
+
+    updates = [query for query in queries if query["sql"].startswith("UPDATE")]
+
+    assert dict(User.objects.values_list("email", "normalized_email")) == {
+        email: email.strip().lower() for email in emails
+    }
+    # A single statement per batch
+    assert len(updates) == 3
@@ -1,3 +1,7 @@
+import pytest
+
+from django.db import IntegrityError
+
 from klasse.users.models import User
 
 
@@ -10,3 +14,17 @@ def test_user_unicode():
     )
 
     assert user.__unicode__() == "John Doe"
+
+
+def test_user_normalized_email(user):
+    assert user.normalized_email == "user@example.com"
+
+    user.email = "John.Doe@example.com"
+    user.save()
+
+    assert User.objects.get(pk=user.pk).normalized_email == "john.doe@example.com"
+
+
+def test_user_normalized_email_unique(user):
+    with pytest.raises(IntegrityError):
+        User.objects.create_user(email="USER@example.com")
@@ -1,15 +1,19 @@
+import json
 from unittest import mock
 
 import pytest
 
 from django.core import signing
-
-from klasse.users.utils import (
-    generate_activation_token,
-    jwt_encode_handler,
-    jwt_payload_handler,
-    password_reset_token_generator,
+from django.urls import reverse
+
+from klasse.users.hashing import HashingServiceBusy
+from klasse.users.outbox import send_queued_emails
+from klasse.users.refresh_tokens import (
+    InvalidRefreshToken,
+    issue_refresh_token,
+    rotate_refresh_token,
 )
+from klasse.users.utils import generate_activation_token, password_reset_token_generator
 
 
 @pytest.mark.django_db
@@ -35,6 +39,10 @@ def test_register_mutation_success(schema, mailoutbox):
 
     assert not result.errors
     assert result.data == expected
+    assert len(mailoutbox) == 0
+
+    send_queued_emails()
+
     assert len(mailoutbox) == 1
 
 
@@ -84,6 +92,8 @@ def test_register_snapshot(schema, snapshot, mailoutbox):
 
     result = schema.execute(query, variable_values=variables)
 
+    send_queued_emails()
+
     snapshot.assert_match(result.data)
     snapshot.assert_match(mailoutbox[0].subject)
 
@@ -112,6 +122,10 @@ def test_activate_mutation_success(schema, user, mailoutbox):
     assert result.data == expected
 
     assert user.is_active
+    assert len(mailoutbox) == 0
+
+    send_queued_emails()
+
     assert len(mailoutbox) == 1
 
 
@@ -181,6 +195,8 @@ def test_activate_mutation_snapshot(schema, user, mailoutbox, snapshot):
 
     result = schema.execute(query, variable_values=variables)
 
+    send_queued_emails()
+
     snapshot.assert_match(result.data)
     snapshot.assert_match(mailoutbox[0].subject)
 
@@ -265,40 +281,43 @@ def test_login_snapshot(schema, user, snapshot):
 
 
 def test_refresh_token_success(schema, user):
-    payload = jwt_payload_handler(user)
-    token = jwt_encode_handler(payload)
+    user.is_active = True
+    user.save()
 
     query = """
-        mutation RefreshToken($token: String!) {
-            refreshToken(token: $token) {
+        mutation RefreshToken($refreshToken: String!) {
+            refreshToken(refreshToken: $refreshToken) {
                 success
                 token
+                refreshToken
             }
         }
     """
 
-    variables = {"token": token}
-
-    expected = {"refreshToken": {"success": True, "token": "sample.jwt.token"}}
+    refresh_token = issue_refresh_token(user)
+    variables = {"refreshToken": refresh_token}
 
     with mock.patch("klasse.users.utils.jwt.encode", return_value=b"sample.jwt.token"):
         result = schema.execute(query, variable_values=variables)
 
     assert not result.errors
-    assert result.data == expected
+    assert result.data["refreshToken"]["success"]
+    assert result.data["refreshToken"]["token"] == "sample.jwt.token"
+    assert result.data["refreshToken"]["refreshToken"] not in (None, refresh_token)
 
 
+@pytest.mark.django_db
 def test_refresh_token_error(schema):
     query = """
-        mutation RefreshToken($token: String!) {
-            refreshToken(token: $token) {
+        mutation RefreshToken($refreshToken: String!) {
+            refreshToken(refreshToken: $refreshToken) {
                 success
                 errors
             }
         }
     """
 
-    variables = {"token": "invalid.jwt.token"}
+    variables = {"refreshToken": "invalid"}
 
     expected = {"refreshToken": {"success": False, "errors": ["Invalid token"]}}
 
@@ -308,6 +327,75 @@ def test_refresh_token_error(schema):
     assert result.data == expected
 
 
+def test_login_mutation_refresh_token(schema, user):
+    user.is_active = True
+    user.save()
+
+    query = """
+        mutation Login($email: String!, $password: String!) {
+            login(email: $email, password: $password) {
+                refreshToken
+            }
+        }
+    """
+
+    variables = {"email": "user@example.com", "password": "password"}
+
+    result = schema.execute(query, variable_values=variables)
+
+    assert not result.errors
+    refresh_token = result.data["login"]["refreshToken"]
+    assert rotate_refresh_token(refresh_token)[0] == user
+
+
+def test_logout_mutation(schema, user):
+    user.is_active = True
+    user.save()
+    refresh_token = issue_refresh_token(user)
+
+    query = """
+        mutation Logout($refreshToken: String!) {
+            logout(refreshToken: $refreshToken) {
+                success
+            }
+        }
+    """
+
+    result = schema.execute(query, variable_values={"refreshToken": refresh_token})
+
+    assert not result.errors
+    assert result.data == {"logout": {"success": True}}
+
+    with pytest.raises(InvalidRefreshToken):
+        rotate_refresh_token(refresh_token)
+
+
+def test_revoke_refresh_tokens_mutation(schema, rf, user):
+    user.is_active = True
+    user.save()
+    refresh_tokens = [issue_refresh_token(user), issue_refresh_token(user)]
+
+    query = """
+        mutation {
+            revokeRefreshTokens {
+                success
+            }
+        }
+    """
+
+    request = rf.request()
+    request.user = user
+
+    result = schema.execute(query, context_value=request)
+
+    assert not result.errors
+    assert result.data == {"revokeRefreshTokens": {"success": True}}
+
+    for refresh_token in refresh_tokens:
+        with pytest.raises(InvalidRefreshToken):
+            rotate_refresh_token(refresh_token)
+
+
 def test_password_reset_mutation_success(schema, user, mailoutbox):
     user.is_active = True
     user.save()
@@ -328,6 +416,10 @@ def test_password_reset_mutation_success(schema, user, mailoutbox):
 
     assert not result.errors
     assert result.data == expected
+    assert len(mailoutbox) == 0
+
+    send_queued_emails()
+
     assert len(mailoutbox) == 1
 
 
@@ -349,6 +441,7 @@ def test_password_reset_mutation_error(schema, mailoutbox):
 
     assert not result.errors
     assert result.data == expected
+    assert send_queued_emails() == 0
     assert len(mailoutbox) == 0
 
 
@@ -384,11 +477,15 @@ def test_password_reset_confirm_mutation_success(schema, user):
 
     expected = {"passwordResetConfirm": {"success": True, "errors": None}}
 
+    refresh_token = issue_refresh_token(user)
     result = schema.execute(query, variable_values=variables)
 
     assert not result.errors
     assert result.data == expected
 
+    with pytest.raises(InvalidRefreshToken):
+        rotate_refresh_token(refresh_token)
+
 
 def test_password_reset_confirm_mutation_matching_passwords_error(schema, user):
     user.is_active = True
@@ -564,3 +661,144 @@ def test_update_mutation_success(schema, rf, user):
 
     assert not result.errors
     assert result.data == expected
+
+
+def test_login_mutation_busy(schema, user):
+    query = """
+        mutation Login($email: String!, $password: String!) {
+            login(email: $email, password: $password) {
+                success
+                errors
+            }
+        }
+    """
+
+    variables = {"email": "user@example.com", "password": "password"}
+
+    expected = {
+        "login": {"success": False, "errors": ["Too many logins, try again later"]}
+    }
+
+    with mock.patch(
+        "klasse.users.hashing.HashingService.run", side_effect=HashingServiceBusy
+    ):
+        result = schema.execute(query, variable_values=variables)
+
+    assert not result.errors
+    assert result.data == expected
+
+
+def test_login_mutation_throttled(schema, user, settings):
+    settings.THROTTLING = dict(settings.THROTTLING, RATES={"login": {"email": "1/m"}})
+
+    query = """
+        mutation Login($email: String!, $password: String!) {
+            login(email: $email, password: $password) {
+                success
+                errors
+            }
+        }
+    """
+
+    variables = {"email": "user@example.com", "password": "wrong"}
+
+    schema.execute(query, variable_values=variables)
+
+    with mock.patch("klasse.users.mutations.authenticate") as authenticate:
+        result = schema.execute(query, variable_values=variables)
+
+    assert not result.errors
+    assert not result.data["login"]["success"]
+    assert result.data["login"]["errors"][0].startswith("Too many attempts")
+    assert not authenticate.called
+
+
+@pytest.mark.django_db
+def test_password_reset_mutation_throttled(schema, user, settings, mailoutbox):
+    settings.THROTTLING = dict(
+        settings.THROTTLING, RATES={"password_reset": {"email": "1/h"}}
+    )
+
+    query = """
+        mutation PasswordReset($email: String!) {
+            passwordReset(email: $email) {
+                success
+                errors
+            }
+        }
+    """
+
+    variables = {"email": "user@example.com"}
+
+    schema.execute(query, variable_values=variables)
+    result = schema.execute(query, variable_values=variables)
+    send_queued_emails()
+
+    assert not result.errors
+    assert not result.data["passwordReset"]["success"]
+    assert len(mailoutbox) == 1
+
+
+def test_register_mutation_throttled(schema, rf, settings):
+    settings.THROTTLING = dict(settings.THROTTLING, RATES={"register": {"ip": "0/h"}})
+
+    query = """
+        mutation Register($email: String!, $password: String!, $name: String!) {
+            register(email: $email, password: $password, name: $name) {
+                success
+                errors
+            }
+        }
+    """
+
+    variables = {"email": "user@example.com", "password": "password", "name": "Jo"}
+    request = rf.post("/graphql/", REMOTE_ADDR="203.0.113.1")
+
+    result = schema.execute(query, context_value=request, variable_values=variables)
+
+    assert not result.errors
+    assert not result.data["register"]["success"]
+
+
+def test_login_mutation_email_case(schema, user):
+    user.is_active = True
+    user.save()
+
+    query = """
+        mutation Login($email: String!, $password: String!) {
+            login(email: $email, password: $password) {
+                success
+            }
+        }
+    """
+
+    variables = {"email": " User@Example.com", "password": "password"}
+
+    result = schema.execute(query, variable_values=variables)
+
+    assert not result.errors
+    assert result.data == {"login": {"success": True}}
+
+
+def test_update_mutation_cached_user(client, user, token):
+    """
+    Updates write the current row, not the snapshot of the token cache, and
+    the next requests see them.
+    """
+
+    def post(query):
+        return client.post(
+            reverse("graphql"),
+            json.dumps({"query": query}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=token,
+        ).json()
+
+    post('mutation { update(firstName: "Jane") { success } }')
+    post('mutation { update(lastName: "Smith") { success } }')
+    user.refresh_from_db()
+
+    assert (user.first_name, user.last_name) == ("Jane", "Smith")
+    assert post("query { viewer { firstName } }")["data"] == {
+        "viewer": {"firstName": "Jane"}
+    }
@@ -0,0 +1,162 @@
+import pytest
+from graphql import parse
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from klasse.users.optimizer import get_selections, optimize
+from klasse.users.tests.factories import GroupFactory, UserFactory
+
+
+def get_columns(sql):
+    columns, _ = sql.split(" FROM ", 1)
+
+    return set(columns.replace("SELECT ", "", 1).split(", "))
+
+
+@pytest.fixture
+def users(db):
+    group = GroupFactory()
+    users = UserFactory.create_batch(3)
+
+    for user in users:
+        user.groups.add(group)
+
+    return users
+
+
+@pytest.fixture
+def staff_request(rf, users):
+    request = rf.request()
+    request.user = users[0]
+    request.user.is_staff = True
+    request.user.save()
+
+    return request
+
+
+def test_only_requested_columns(schema, staff_request, users):
+    query = """
+        query {
+            users {
+                edges {
+                    node {
+                        email
+                        ...Name
+                    }
+                }
+            }
+        }
+
+        fragment Name on UserType {
+            firstName
+            __typename
+        }
+    """
+
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query, context_value=staff_request)
+
+    assert not result.errors
+    assert len(result.data["users"]["edges"]) == len(users)
+    assert len(queries) == 1
+    assert '"first_name"' in queries[0]["sql"]
+    assert '"last_name"' not in queries[0]["sql"]
+    assert '"password"' not in queries[0]["sql"]
+
+
+def test_prefetch_many_to_many(schema, staff_request, django_assert_num_queries):
+    query = """
+        query {
+            users {
+                edges {
+                    node {
+                        email
+                        groups {
+                            name
+                        }
+                    }
+                }
+            }
+        }
+    """
+
+    with django_assert_num_queries(2):
+        result = schema.execute(query, context_value=staff_request)
+
+    assert not result.errors
+    assert [len(edge["node"]["groups"]) for edge in result.data["users"]["edges"]] == [
+        1,
+        1,
+        1,
+    ]
+
+
+def test_viewer(schema, staff_request, django_assert_num_queries):
+    query = """
+        query {
+            viewer {
+                email
+                groups {
+                    name
+                    userSet {
+                        email
+                    }
+                }
+            }
+        }
+    """
+
+    with django_assert_num_queries(2):
+        result = schema.execute(query, context_value=staff_request)
+
+    assert not result.errors
+    assert len(result.data["viewer"]["groups"][0]["userSet"]) == 3
+    assert "groups" in staff_request.user._prefetched_objects_cache
+
+
+def test_viewer_deferred_columns(schema, staff_request, users):
+    query = """
+        query {
+            viewer {
+                email
+                firstName
+                lastName
+            }
+        }
+    """
+    staff_request.user = (
+        get_user_model().objects.only("id", "email").get(pk=users[0].pk)
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        result = schema.execute(query, context_value=staff_request)
+
+    assert not result.errors
+    assert result.data["viewer"]["lastName"] == users[0].last_name
+    assert len(queries) == 1
+    assert get_columns(queries[0]["sql"]) == {
+        '"users_user"."id"',
+        '"users_user"."first_name"',
+        '"users_user"."last_name"',
+    }
+
+
+def test_unknown_field_loads_all_columns():
+    document = parse(
+        """
+        query {
+            users {
+                email
+                fullName
+            }
+        }
+        """
+    )
+    field_asts = document.definitions[0].selection_set.selections
+    queryset = optimize(
+        get_user_model().objects.all(), get_selections(field_asts, {}), {}
+    )
+
+    assert queryset.query.deferred_loading == (frozenset(), True)
@@ -0,0 +1,113 @@
+import datetime
+from unittest import mock
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from klasse.users.models import OutboxEmail
+from klasse.users.outbox import (
+    get_retry_delay,
+    notify_worker,
+    queue_email,
+    send_queued_emails,
+)
+
+
+def test_queue_email(user, mailoutbox):
+    email = queue_email(user, OutboxEmail.ACTIVATION)
+
+    assert email.status == OutboxEmail.PENDING
+    assert len(mailoutbox) == 0
+
+
+def test_send_queued_emails(user, mailoutbox):
+    queue_email(user, OutboxEmail.ACTIVATION)
+    queue_email(user, OutboxEmail.WELCOME)
+
+    with mock.patch("klasse.users.outbox.get_connection") as get_connection:
+        get_connection.return_value.__enter__.return_value = None
+
+        assert send_queued_emails() == 2
+
+    get_connection.assert_called_once_with()
+    assert len(mailoutbox) == 2
+    assert not OutboxEmail.objects.filter(status=OutboxEmail.PENDING).exists()
+    assert OutboxEmail.objects.filter(sent__isnull=False).count() == 2
+
+
+def test_send_queued_emails_batch_size(user, mailoutbox):
+    for _ in range(3):
+        queue_email(user, OutboxEmail.WELCOME)
+
+    assert send_queued_emails(batch_size=2) == 2
+    assert send_queued_emails(batch_size=2) == 1
+    assert send_queued_emails(batch_size=2) == 0
+    assert len(mailoutbox) == 3
+
+
+def test_send_queued_emails_not_due(user, mailoutbox):
+    email = queue_email(user, OutboxEmail.WELCOME)
+    email.next_attempt = timezone.now() + datetime.timedelta(minutes=1)
+    email.save()
+
+    assert send_queued_emails() == 0
+    assert len(mailoutbox) == 0
+
+
+def test_send_queued_emails_retry(settings, user, mailoutbox):
+    settings.EMAIL_OUTBOX = dict(settings.EMAIL_OUTBOX, MAX_ATTEMPTS=2)
+
+    email = queue_email(user, OutboxEmail.WELCOME)
+
+    with mock.patch.dict(
+        "klasse.users.outbox.senders",
+        {OutboxEmail.WELCOME: mock.Mock(side_effect=IOError("Connection refused"))},
+    ):
+        assert send_queued_emails() == 0
+
+        email.refresh_from_db()
+
+        assert email.status == OutboxEmail.PENDING
+        assert email.attempts == 1
+        assert email.last_error == "Connection refused"
+        assert email.next_attempt > timezone.now()
+
+        OutboxEmail.objects.update(next_attempt=timezone.now())
+
+        assert send_queued_emails() == 0
+
+    email.refresh_from_db()
+
+    assert email.status == OutboxEmail.FAILED
+    assert email.attempts == 2
+    assert send_queued_emails() == 0
+
+
+def test_get_retry_delay(settings):
+    settings.EMAIL_OUTBOX = dict(settings.EMAIL_OUTBOX, RETRY_DELAY=10)
+
+    assert get_retry_delay(1) == datetime.timedelta(seconds=10)
+    assert get_retry_delay(3) == datetime.timedelta(seconds=40)
+
+
+def test_notify_worker(settings):
+    settings.EMAIL_OUTBOX = dict(settings.EMAIL_OUTBOX, WORKER="thread")
+
+    with mock.patch("klasse.users.outbox._worker", None), mock.patch(
+        "klasse.users.outbox.OutboxWorker"
+    ) as worker:
+        notify_worker()
+
+    worker.return_value.start.assert_called_once_with()
+    worker.return_value.wake_up.set.assert_called_once_with()
+
+
+@pytest.mark.django_db
+def test_send_queued_emails_command(user, mailoutbox):
+    queue_email(user, OutboxEmail.WELCOME)
+
+    call_command("send_queued_emails", batch_size=1)
+
+    assert len(mailoutbox) == 1
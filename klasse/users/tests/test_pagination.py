@@ -0,0 +1,102 @@
+import datetime
+
+import pytest
+from graphql.error import GraphQLError
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from klasse.users.pagination import KeysetPaginator
+from klasse.users.tests.factories import UserFactory
+
+paginator = KeysetPaginator(("created", "id"))
+
+
+@pytest.fixture
+def users(db):
+    now = timezone.now()
+    # Two users share a timestamp, so their order is decided by the id
+    offsets = [0, 1, 1, 2, 3]
+
+    users = [
+        UserFactory(created=now + datetime.timedelta(seconds=offset))
+        for offset in offsets
+    ]
+
+    return sorted(users, key=lambda user: (user.created, user.id))
+
+
+def queryset():
+    return get_user_model().objects.all()
+
+
+def test_paginate_forwards(users):
+    pages = []
+    after = None
+    has_next_page = True
+
+    while has_next_page:
+        page, has_previous_page, has_next_page = paginator.paginate(
+            queryset(), first=2, after=after
+        )
+        after = paginator.encode_cursor(page[-1])
+        pages.append(page)
+
+        assert not has_previous_page
+
+    assert pages == [users[0:2], users[2:4], users[4:]]
+
+
+def test_paginate_backwards(users):
+    pages = []
+    before = None
+    has_previous_page = True
+
+    while has_previous_page:
+        page, has_previous_page, has_next_page = paginator.paginate(
+            queryset(), last=2, before=before
+        )
+        before = paginator.encode_cursor(page[0])
+        pages.append(page)
+
+        assert not has_next_page
+
+    assert pages == [users[3:], users[1:3], users[:1]]
+
+
+def test_paginate_between(users):
+    page, _, has_next_page = paginator.paginate(
+        queryset(),
+        after=paginator.encode_cursor(users[0]),
+        before=paginator.encode_cursor(users[4]),
+    )
+
+    assert page == users[1:4]
+    assert not has_next_page
+
+
+def test_paginate_without_offset(users, django_assert_num_queries):
+    with django_assert_num_queries(1) as context:
+        paginator.paginate(queryset(), first=2, after=paginator.encode_cursor(users[2]))
+
+    assert "OFFSET" not in context.captured_queries[0]["sql"]
+
+
+def test_page_size(db, settings):
+    settings.GRAPHQL_PAGINATION = {"DEFAULT_PAGE_SIZE": 2, "MAX_PAGE_SIZE": 3}
+
+    assert paginator.get_page_size(None, None) == 2
+    assert paginator.get_page_size(3, None) == 3
+    assert paginator.get_page_size(None, 1) == 1
+
+    for first, last in [(0, None), (4, None), (None, -1), (1, 1)]:
+        with pytest.raises(GraphQLError):
+            paginator.get_page_size(first, last)
+
+
+@pytest.mark.parametrize(
+    "cursor", ["", "not base64!", "bnVsbA==", "WyJ4Il0=", "WyJ4IiwgIjEiXQ=="]
+)
+def test_invalid_cursor(db, cursor):
+    with pytest.raises(GraphQLError):
+        paginator.paginate(queryset(), after=cursor)
@@ -0,0 +1,131 @@
+import datetime
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from klasse.users.models import RefreshToken
+from klasse.users.refresh_tokens import (
+    InvalidRefreshToken,
+    hash_token,
+    issue_refresh_token,
+    purge_refresh_tokens,
+    revoke_refresh_token,
+    revoke_user_refresh_tokens,
+    rotate_refresh_token,
+)
+from klasse.users.tests.factories import UserFactory
+
+
+@pytest.fixture
+def active_user(user):
+    user.is_active = True
+    user.save()
+
+    return user
+
+
+def test_issue_refresh_token_stores_hash(active_user):
+    token = issue_refresh_token(active_user)
+    refresh_token = RefreshToken.objects.get()
+
+    assert refresh_token.token_hash == hash_token(token)
+    assert token not in refresh_token.token_hash
+    assert refresh_token.revoked is None
+    assert refresh_token.expires > timezone.now()
+
+
+def test_rotate_refresh_token(active_user):
+    token = issue_refresh_token(active_user)
+    user, new_token = rotate_refresh_token(token)
+
+    old, new = RefreshToken.objects.order_by("id")
+
+    assert user == active_user
+    assert new_token != token
+    assert old.revoked is not None
+    assert new.revoked is None
+    assert new.family == old.family
+
+
+def test_rotate_refresh_token_reuse_revokes_family(active_user):
+    token = issue_refresh_token(active_user)
+    other_token = issue_refresh_token(active_user)
+    _, new_token = rotate_refresh_token(token)
+
+    with pytest.raises(InvalidRefreshToken):
+        rotate_refresh_token(token)
+
+    # The legitimate client lost its session, other sessions are untouched
+    with pytest.raises(InvalidRefreshToken):
+        rotate_refresh_token(new_token)
+
+    assert rotate_refresh_token(other_token)[0] == active_user
+
+
+def test_rotate_refresh_token_expired(active_user):
+    token = issue_refresh_token(active_user)
+
+    with pytest.raises(InvalidRefreshToken):
+        rotate_refresh_token(token, now=timezone.now() + datetime.timedelta(days=15))
+
+
+def test_rotate_refresh_token_unknown(db):
+    with pytest.raises(InvalidRefreshToken):
+        rotate_refresh_token("unknown")
+
+
+def test_rotate_refresh_token_inactive_user(user):
+    token = issue_refresh_token(user)
+
+    with pytest.raises(InvalidRefreshToken):
+        rotate_refresh_token(token)
+
+
+def test_revoke_refresh_token(active_user):
+    token = issue_refresh_token(active_user)
+    _, new_token = rotate_refresh_token(token)
+
+    revoke_refresh_token(token)
+
+    with pytest.raises(InvalidRefreshToken):
+        rotate_refresh_token(new_token)
+
+
+def test_revoke_user_refresh_tokens(active_user, django_assert_num_queries):
+    other_token = issue_refresh_token(UserFactory(is_active=True))
+
+    for _ in range(3):
+        issue_refresh_token(active_user)
+
+    with django_assert_num_queries(1):
+        assert revoke_user_refresh_tokens(active_user) == 3
+
+    assert not RefreshToken.objects.filter(
+        user=active_user, revoked__isnull=True
+    ).exists()
+    assert rotate_refresh_token(other_token)
+
+
+def test_purge_refresh_tokens(active_user):
+    now = timezone.now()
+
+    for _ in range(5):
+        issue_refresh_token(active_user, now=now - datetime.timedelta(days=15))
+
+    token = issue_refresh_token(active_user, now=now)
+
+    assert purge_refresh_tokens(batch_size=2, now=now) == 5
+    assert RefreshToken.objects.get().token_hash == hash_token(token)
+
+
+def test_purge_refresh_tokens_command(active_user):
+    issue_refresh_token(active_user, now=timezone.now() - datetime.timedelta(days=15))
+    out = StringIO()
+
+    call_command("purge_refresh_tokens", stdout=out)
+
+    assert out.getvalue() == "Purged 1 refresh tokens\n"
+    assert not RefreshToken.objects.exists()
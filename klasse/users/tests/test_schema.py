@@ -1,3 +1,8 @@
+import pytest
+
+from klasse.users.tests.factories import UserFactory
+
+
 def test_viewer_query(schema, rf, user):
     request = rf.request()
     request.user = user
@@ -33,3 +38,90 @@ def test_viewer_snapshot(schema, rf, user, snapshot):
     result = schema.execute(query, context_value=request)
 
     snapshot.assert_match(result.data)
+
+
+@pytest.mark.parametrize("field", ["password", "normalizedEmail", "tokenVersion"])
+def test_user_type_private_fields(schema, field):
+    assert field not in schema.get_type("UserType").fields
+
+
+USERS_QUERY = """
+    query Users($first: Int, $after: String, $isActive: Boolean, $email: String) {
+        users(
+            first: $first
+            after: $after
+            isActive: $isActive
+            emailStartsWith: $email
+        ) {
+            edges {
+                cursor
+                node {
+                    email
+                }
+            }
+            pageInfo {
+                endCursor
+                hasNextPage
+            }
+        }
+    }
+"""
+
+
+@pytest.fixture
+def staff_request(rf, user):
+    user.is_staff = True
+    user.save()
+
+    request = rf.request()
+    request.user = user
+
+    return request
+
+
+def test_users_query(schema, staff_request, django_assert_num_queries):
+    UserFactory(email="anna@example.com", is_active=True)
+    UserFactory(email="bob@example.com")
+    UserFactory(email="anton@example.com", is_active=True)
+
+    variables = {"first": 1, "isActive": True, "email": "an"}
+
+    with django_assert_num_queries(1):
+        result = schema.execute(
+            USERS_QUERY, context_value=staff_request, variable_values=variables
+        )
+
+    assert not result.errors
+
+    users = result.data["users"]
+
+    assert [edge["node"]["email"] for edge in users["edges"]] == ["anna@example.com"]
+    assert users["pageInfo"]["hasNextPage"]
+    assert users["pageInfo"]["endCursor"] == users["edges"][0]["cursor"]
+
+    variables["after"] = users["pageInfo"]["endCursor"]
+    result = schema.execute(
+        USERS_QUERY, context_value=staff_request, variable_values=variables
+    )
+    users = result.data["users"]
+
+    assert [edge["node"]["email"] for edge in users["edges"]] == ["anton@example.com"]
+    assert not users["pageInfo"]["hasNextPage"]
+
+
+def test_users_query_not_staff(schema, rf, user):
+    request = rf.request()
+    request.user = user
+
+    result = schema.execute(USERS_QUERY, context_value=request)
+
+    assert result.errors[0].message == "Not allowed"
+    assert result.data["users"] is None
+
+
+def test_users_query_page_size(schema, staff_request):
+    result = schema.execute(
+        USERS_QUERY, context_value=staff_request, variable_values={"first": 1000}
+    )
+
+    assert result.errors[0].message == "Page size must be between 1 and 100"
@@ -0,0 +1,182 @@
+import sys
+from io import StringIO
+from unittest import mock
+
+import pytest
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+
+from klasse.users.throttling import (
+    DjangoThrottleStore,
+    LocalThrottleStore,
+    RedisThrottleStore,
+    Throttled,
+    get_client_ip,
+    get_throttle_store,
+    hit,
+    parse_rate,
+    throttle,
+)
+
+
+@pytest.fixture
+def rates(settings):
+    settings.THROTTLING = dict(
+        settings.THROTTLING, RATES={"login": {"ip": "4/m", "email": "2/m"}}
+    )
+
+
+def test_parse_rate():
+    assert parse_rate("5/m") == (5, 60)
+    assert parse_rate("10/hour") == (10, 3600)
+
+
+def test_local_store():
+    store = LocalThrottleStore()
+
+    assert store.get("key") is None
+    assert store.incr("key", 60) == 1
+    assert store.incr("key", 60) == 2
+    assert store.get("key") == 2
+
+    with mock.patch("klasse.users.throttling.time.time", return_value=10 ** 10):
+        assert store.get("key") is None
+        assert store.incr("key", 60) == 1
+
+
+def test_local_store_max_entries():
+    store = LocalThrottleStore(max_entries=2)
+    store.incr("a", 60)
+    store.incr("b", 60)
+    store.incr("a", 60)
+    store.incr("c", 60)
+
+    # The least recently incremented counter is evicted
+    assert list(store._counters) == ["a", "c"]
+    assert store.get("a") == 2
+
+
+def test_django_store(user_cache):
+    cache = user_cache
+    store = DjangoThrottleStore()
+
+    assert store.incr("key", 60) == 1
+    assert store.incr("key", 60) == 2
+    assert store.get("key") == 2
+
+    cache.set("other", "value")
+    store.clear()
+
+    assert store.get("key") is None
+    assert store.incr("key", 60) == 1
+    assert cache.get("other") == "value"
+
+
+def test_redis_store():
+    redis = mock.Mock()
+    client = redis.Redis.from_url.return_value
+    client.pipeline.return_value.execute.return_value = [3, True]
+    client.get.return_value = b"3"
+
+    with mock.patch.dict(sys.modules, {"redis": redis}):
+        store = RedisThrottleStore(url="redis://cache:6379/1")
+
+    assert store.incr("key", 60) == 3
+    client.pipeline.return_value.incr.assert_called_once_with("throttle:key")
+    client.pipeline.return_value.expire.assert_called_once_with("throttle:key", 60)
+    assert store.get("key") == 3
+    redis.Redis.from_url.assert_called_once_with("redis://cache:6379/1")
+
+
+def test_redis_store_missing_package():
+    with mock.patch.dict(sys.modules, {"redis": None}):
+        with pytest.raises(ImproperlyConfigured):
+            RedisThrottleStore()
+
+
+def test_get_throttle_store(settings):
+    settings.THROTTLING = dict(
+        settings.THROTTLING,
+        STORE="klasse.users.throttling.DjangoThrottleStore",
+        OPTIONS={"ALIAS": "default", "KEY_PREFIX": "attempts"},
+    )
+
+    store = get_throttle_store()
+
+    assert isinstance(store, DjangoThrottleStore)
+    assert store.key_prefix == "attempts"
+
+
+def test_hit_sliding_window():
+    assert hit("key", "2/m", now=120) == 0
+    assert hit("key", "2/m", now=150) == 0
+    assert hit("key", "2/m", now=170) == 11
+
+    # Half of the previous minute still counts towards the window
+    assert hit("key", "2/m", now=210) == 31
+    # Rejected attempts count too, so the client has to slow down
+    assert hit("key", "2/m", now=230) == 11
+    assert hit("key", "2/m", now=290) == 0
+
+
+def test_throttle_by_email(rf, rates):
+    request = rf.post("/graphql/")
+
+    throttle("login", request, "user@example.com")
+    throttle("login", request, " User@Example.com")
+
+    with pytest.raises(Throttled) as e:
+        throttle("login", request, "user@example.com")
+
+    assert e.value.wait > 0
+    throttle("login", request, "other@example.com")
+
+
+def test_throttle_by_ip(rf, rates):
+    request = rf.post("/graphql/", REMOTE_ADDR="203.0.113.1")
+
+    for index in range(4):
+        throttle("login", request, "user{}@example.com".format(index))
+
+    with pytest.raises(Throttled):
+        throttle("login", request, "user@example.com")
+
+    throttle("login", rf.post("/graphql/"), "user@example.com")
+
+
+@pytest.mark.parametrize(
+    "header, proxies, forwarded_for, ip",
+    [
+        (None, 1, "198.51.100.1", "203.0.113.1"),
+        ("HTTP_X_FORWARDED_FOR", 1, "198.51.100.1, 198.51.100.2", "198.51.100.2"),
+        ("HTTP_X_FORWARDED_FOR", 2, "198.51.100.1, 198.51.100.2", "198.51.100.1"),
+        ("HTTP_X_FORWARDED_FOR", 2, "198.51.100.2", "203.0.113.1"),
+        ("HTTP_X_FORWARDED_FOR", 1, None, "203.0.113.1"),
+    ],
+)
+def test_get_client_ip(rf, settings, header, proxies, forwarded_for, ip):
+    settings.THROTTLING = dict(
+        settings.THROTTLING, CLIENT_IP_HEADER=header, TRUSTED_PROXIES=proxies
+    )
+    extra = {"HTTP_X_FORWARDED_FOR": forwarded_for} if forwarded_for else {}
+    request = rf.post("/graphql/", REMOTE_ADDR="203.0.113.1", **extra)
+
+    assert get_client_ip(request) == ip
+
+
+def test_throttle_unknown_scope(rates):
+    for _ in range(10):
+        throttle("register", None, "user@example.com")
+
+
+@pytest.mark.django_db
+def test_benchmark_command(rates):
+    stdout = StringIO()
+
+    call_command("benchmark_throttling", attempts=5, stdout=stdout)
+
+    unthrottled, throttled = stdout.getvalue().splitlines()
+
+    assert unthrottled.split()[:5] == ["unthrottled", "5", "attempts", "5", "hashed"]
+    assert throttled.split()[:5] == ["throttled", "5", "attempts", "2", "hashed"]
@@ -0,0 +1,280 @@
+import time
+from unittest import mock
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from klasse.users.hashing import set_password
+from klasse.users.tokens import (
+    DjangoTokenCache,
+    LocalTokenCache,
+    cache_user,
+    get_cached_user,
+    get_claims_user,
+    get_token_cache,
+    get_token_version,
+)
+from klasse.users.utils import jwt_encode_handler, jwt_payload_handler
+
+
+@pytest.fixture
+def payload(user):
+    return jwt_payload_handler(user)
+
+
+@pytest.fixture
+def jwt_token(payload):
+    return jwt_encode_handler(payload)
+
+
+def test_local_token_cache_expiry():
+    token_cache = LocalTokenCache()
+    token_cache.set("key", "value", 60)
+
+    assert token_cache.get("key") == "value"
+
+    token_cache.set("key", "value", -1)
+
+    assert token_cache.get("key") is None
+
+
+def test_local_token_cache_eviction():
+    token_cache = LocalTokenCache(max_entries=2)
+    token_cache.set("a", 1, 60)
+    token_cache.set("b", 2, 60)
+    token_cache.get("a")
+    token_cache.set("c", 3, 60)
+
+    assert token_cache.get("a") == 1
+    assert token_cache.get("b") is None
+    assert token_cache.get("c") == 3
+
+
+def test_django_token_cache():
+    token_cache = DjangoTokenCache()
+    token_cache.set("key", "value", 60)
+
+    assert token_cache.get("key") == "value"
+
+    token_cache.delete("key")
+
+    assert token_cache.get("key") is None
+
+
+def test_django_token_cache_clear(user_cache):
+    token_cache = DjangoTokenCache()
+    token_cache.set("key", "value", 60)
+    user_cache.set("other", "value")
+
+    token_cache.clear()
+
+    assert token_cache.get("key") is None
+    assert user_cache.get("other") == "value"
+
+
+def test_get_token_cache_disabled(settings):
+    settings.JWT_TOKEN_CACHE = {"BACKEND": None}
+
+    assert get_token_cache() is None
+
+
+def test_get_token_cache_local_backend(settings):
+    settings.JWT_TOKEN_CACHE = {
+        "BACKEND": "klasse.users.tokens.LocalTokenCache",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10},
+    }
+
+    assert isinstance(get_token_cache(), LocalTokenCache)
+    assert get_token_cache().max_entries == 10
+
+
+def test_get_token_cache_django_backend():
+    assert isinstance(get_token_cache(), DjangoTokenCache)
+
+
+def test_cached_user(user, jwt_token, payload, django_assert_num_queries):
+    cache_user(jwt_token, user, payload)
+
+    with django_assert_num_queries(0):
+        cached_user = get_cached_user(jwt_token)
+
+    assert cached_user == user
+    assert cached_user.email == user.email
+    assert cached_user.password == user.password
+
+
+def test_cached_user_reads_generation_once(user, jwt_token, payload):
+    with mock.patch.object(
+        DjangoTokenCache, "get_generation", autospec=True, return_value=1
+    ) as get_generation:
+        cache_user(jwt_token, user, payload)
+        get_generation.reset_mock()
+
+        assert get_cached_user(jwt_token) == user
+
+    assert get_generation.call_count == 1
+
+
+def test_cached_user_expires_with_token(user, jwt_token, payload):
+    payload["exp"] = time.time() - 1
+
+    cache_user(jwt_token, user, payload)
+
+    assert get_cached_user(jwt_token) is None
+
+
+@pytest.mark.parametrize(
+    "field, value", [("email", "other@example.com"), ("is_active", True)]
+)
+def test_cached_user_invalidated(user, jwt_token, payload, field, value):
+    user = get_user_model().objects.get(pk=user.pk)
+    cache_user(jwt_token, user, payload)
+
+    setattr(user, field, value)
+    user.save()
+
+    assert get_cached_user(jwt_token) is None
+
+
+def test_cached_user_invalidated_by_other_fields(user, jwt_token, payload):
+    user = get_user_model().objects.get(pk=user.pk)
+    cache_user(jwt_token, user, payload)
+
+    user.first_name = "Jane"
+    user.save()
+
+    assert get_cached_user(jwt_token) is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cached_user_invalidated_on_commit(user, jwt_token, payload):
+    with transaction.atomic():
+        user.first_name = "Jane"
+        user.save()
+
+        # Cached by another request before the change is committed
+        cache_user(jwt_token, get_user_model().objects.get(pk=user.pk), payload)
+
+    assert get_cached_user(jwt_token) is None
+
+
+def test_cached_user_invalidated_on_delete(user, jwt_token, payload):
+    cache_user(jwt_token, user, payload)
+
+    user.delete()
+
+    assert get_cached_user(jwt_token) is None
+
+
+def test_payload_claims(user, payload):
+    assert payload["user_id"] == str(user.pk)
+    assert payload["is_active"] is False
+    assert payload["is_staff"] is False
+    assert payload["ver"] == 0
+
+
+@pytest.mark.parametrize(
+    "field, value", [("email", "other@example.com"), ("is_staff", True)]
+)
+def test_token_version_bumped(user, field, value):
+    setattr(user, field, value)
+    user.save()
+
+    assert get_user_model().objects.get(pk=user.pk).token_version == 1
+
+    user.first_name = "Jane"
+    user.save(update_fields=["first_name"])
+
+    assert get_user_model().objects.get(pk=user.pk).token_version == 1
+
+
+def test_token_version_bumped_by_set_password(user, jwt_token, payload):
+    cache_user(jwt_token, user, payload)
+
+    user.set_password("other")
+    user.save()
+
+    assert get_user_model().objects.get(pk=user.pk).token_version == 1
+    assert get_cached_user(jwt_token) is None
+
+    set_password(user, "another")
+    user.save(update_fields=["password"])
+
+    assert get_user_model().objects.get(pk=user.pk).token_version == 2
+
+
+def test_token_version_update_fields(user):
+    user.email = "Other@Example.com"
+    user.save(update_fields=["email"])
+
+    user = get_user_model().objects.get(pk=user.pk)
+
+    assert (user.normalized_email, user.token_version) == ("other@example.com", 1)
+
+
+def test_get_token_version(user, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert get_token_version(user.pk) == 0
+
+    with django_assert_num_queries(0):
+        assert get_token_version(user.pk) == 0
+
+    user.is_active = True
+    user.save()
+
+    assert get_token_version(user.pk) == 1
+
+
+def test_get_token_version_unknown_user(db):
+    assert get_token_version("00000000-0000-0000-0000-000000000000") is None
+
+
+def test_claims_user(user, payload, django_assert_num_queries):
+    get_token_version(user.pk)
+
+    with django_assert_num_queries(0):
+        claims_user = get_claims_user(payload)
+
+        assert claims_user.pk == user.pk
+        assert claims_user.email == user.email
+        assert not claims_user.is_staff
+        assert claims_user.is_authenticated
+
+    with django_assert_num_queries(1):
+        assert claims_user.first_name == "John"
+        assert claims_user.last_name == "Doe"
+        assert claims_user.check_password("password")
+
+
+def test_claims_user_save(user, payload):
+    claims_user = get_claims_user(payload)
+    claims_user.first_name = "Jane"
+    claims_user.save()
+
+    user.refresh_from_db()
+
+    assert (user.first_name, user.last_name) == ("Jane", "Doe")
+    assert user.token_version == 0
+    assert get_claims_user(payload) is not None
+
+
+def test_claims_user_revoked(user, payload):
+    user.set_password("other")
+    user.save()
+
+    assert get_claims_user(payload) is None
+
+
+def test_claims_user_deleted(user, payload):
+    user.delete()
+
+    assert get_claims_user(payload) is None
+
+
+def test_claims_user_without_claims(user, payload):
+    del payload["ver"]
+
+    assert get_claims_user(payload) is None
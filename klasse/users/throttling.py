@@ -0,0 +1,243 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+class Throttled(Exception):
+    def __init__(self, wait):
+        self.wait = wait
+        super(Throttled, self).__init__(
+            "Too many attempts, try again in {} seconds".format(wait)
+        )
+
+
+class LocalThrottleStore(object):
+    """
+    In-process counters, only shared by the threads of a single worker. At
+    most ``max_entries`` counters are kept, evicting the least recently
+    incremented ones.
+    """
+
+    def __init__(self, max_entries=100000, **options):
+        self.max_entries = max_entries
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def incr(self, key, timeout):
+        now = time.time()
+
+        with self._lock:
+            value, expires_at = self._counters.pop(key, (0, 0))
+
+            if expires_at <= now:
+                value, expires_at = 0, now + timeout
+
+            self._counters[key] = (value + 1, expires_at)
+
+            while len(self._counters) > self.max_entries:
+                self._counters.popitem(last=False)
+
+            return value + 1
+
+    def get(self, key):
+        with self._lock:
+            value, expires_at = self._counters.get(key, (None, 0))
+
+        return value if expires_at > time.time() else None
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class DjangoThrottleStore(object):
+    """
+    Counters kept in one of the configured Django ``CACHES``, cleared by
+    generation like ``klasse.users.tokens.DjangoTokenCache``.
+    """
+
+    def __init__(self, alias="default", key_prefix="throttle", **options):
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def generation_key(self):
+        return "{}:generation".format(self.key_prefix)
+
+    def get_generation(self):
+        generation = self.cache.get(self.generation_key)
+
+        if generation is None:
+            generation = uuid.uuid4().hex
+
+            if not self.cache.add(self.generation_key, generation, None):
+                generation = self.cache.get(self.generation_key)
+
+        return generation
+
+    def make_key(self, key):
+        return "{}:{}:{}".format(self.key_prefix, self.get_generation(), key)
+
+    def incr(self, key, timeout):
+        key = self.make_key(key)
+
+        self.cache.add(key, 0, timeout)
+
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # The counter expired between add() and incr()
+            self.cache.set(key, 1, timeout)
+
+            return 1
+
+    def get(self, key):
+        return self.cache.get(self.make_key(key))
+
+    def clear(self):
+        self.cache.set(self.generation_key, uuid.uuid4().hex, None)
+
+
+class RedisThrottleStore(object):
+    """
+    Counters kept in any server speaking the Redis protocol. Requires the
+    ``redis`` package.
+    """
+
+    def __init__(
+        self, url="redis://localhost:6379/0", key_prefix="throttle", **options
+    ):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RedisThrottleStore requires the redis package")
+
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+
+    def make_key(self, key):
+        return "{}:{}".format(self.key_prefix, key)
+
+    def incr(self, key, timeout):
+        pipeline = self.client.pipeline()
+        pipeline.incr(self.make_key(key))
+        pipeline.expire(self.make_key(key), timeout)
+
+        return pipeline.execute()[0]
+
+    def get(self, key):
+        value = self.client.get(self.make_key(key))
+
+        return int(value) if value is not None else None
+
+    def clear(self):
+        for key in self.client.scan_iter(self.make_key("*")):
+            self.client.delete(key)
+
+
+@lru_cache(maxsize=None)
+def get_throttle_store():
+    config = settings.THROTTLING
+    backend = import_string(config["STORE"])
+    options = {key.lower(): value for key, value in config.get("OPTIONS", {}).items()}
+
+    return backend(**options)
+
+
+@receiver(setting_changed)
+def reset_throttle_store(setting, **kwargs):
+    if setting == "THROTTLING":
+        get_throttle_store.cache_clear()
+
+
+def parse_rate(rate):
+    """
+    Parse a rate like ``"5/m"`` into the number of requests and the period in
+    seconds.
+    """
+    limit, period = rate.split("/")
+
+    return int(limit), PERIODS[period[0]]
+
+
+def hit(key, rate, now=None):
+    """
+    Count a request against a sliding window and return the seconds to wait
+    when the rate is exceeded, or ``0``.
+
+    The window is approximated from the counters of the current and previous
+    fixed periods, weighing the previous one by how much of it still overlaps
+    the window.
+    """
+    store = get_throttle_store()
+    limit, period = parse_rate(rate)
+    now = time.time() if now is None else now
+    window = int(now // period)
+
+    current = store.incr("{}:{}".format(key, window), period * 2)
+    previous = store.get("{}:{}".format(key, window - 1)) or 0
+    elapsed = (now % period) / period
+
+    if previous * (1 - elapsed) + current <= limit:
+        return 0
+
+    return int(period - now % period) + 1
+
+
+def get_client_ip(request):
+    """
+    Return the IP address of the client. Behind ``TRUSTED_PROXIES`` reverse
+    proxies, each appending the address of its client to the
+    ``CLIENT_IP_HEADER``, it is the address appended by the outermost one:
+    clients can forge the addresses before it.
+    """
+    config = settings.THROTTLING
+    header, proxies = config["CLIENT_IP_HEADER"], config["TRUSTED_PROXIES"]
+
+    if header and proxies:
+        addresses = [
+            address.strip()
+            for address in request.META.get(header, "").split(",")
+            if address.strip()
+        ]
+
+        if len(addresses) >= proxies:
+            return addresses[-proxies]
+
+    return request.META.get("REMOTE_ADDR")
+
+
+def throttle(scope, request=None, email=None):
+    """
+    Raise ``Throttled`` when the client's IP address or the email address made
+    too many requests for the scope, as configured in ``THROTTLING["RATES"]``.
+    """
+    rates = settings.THROTTLING["RATES"].get(scope, {})
+    keys = {"ip": get_client_ip(request) if request is not None else None}
+
+    if email:
+        keys["email"] = email.strip().lower()
+
+    wait = 0
+
+    for kind, rate in rates.items():
+        if keys.get(kind):
+            wait = max(wait, hit("{}:{}:{}".format(scope, kind, keys[kind]), rate))
+
+    if wait:
+        raise Throttled(wait)
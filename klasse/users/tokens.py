@@ -0,0 +1,309 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.signals import setting_changed
+from django.db import router, transaction
+from django.dispatch import receiver
+from django.utils.encoding import force_bytes
+from django.utils.module_loading import import_string
+
+
+class LocalTokenCache(object):
+    """
+    In-process LRU cache with per-entry expiry, shared by all threads of a worker.
+    Invalidations don't reach other workers, so only use it with a single
+    worker process.
+    """
+
+    def __init__(self, max_entries=10000, **options):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value, expires_at = self._entries[key]
+            except KeyError:
+                return None
+
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (value, time.time() + timeout)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @contextmanager
+    def lookup(self):
+        yield
+
+
+class DjangoTokenCache(object):
+    """
+    Token cache stored in one of the configured Django ``CACHES``, so entries are
+    shared between workers. Keys carry the generation of the token cache, so
+    clearing it only replaces the generation instead of clearing the whole
+    cache.
+    """
+
+    def __init__(self, alias="default", key_prefix="jwt-token", **options):
+        self.alias = alias
+        self.key_prefix = key_prefix
+        self._local = threading.local()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def generation_key(self):
+        return "{}:generation".format(self.key_prefix)
+
+    def get_generation(self):
+        generation = self.cache.get(self.generation_key)
+
+        if generation is None:
+            generation = uuid.uuid4().hex
+
+            if not self.cache.add(self.generation_key, generation, None):
+                generation = self.cache.get(self.generation_key)
+
+        return generation
+
+    def make_key(self, key):
+        generation = getattr(self._local, "generation", None) or self.get_generation()
+
+        return "{}:{}:{}".format(self.key_prefix, generation, key)
+
+    @contextmanager
+    def lookup(self):
+        """
+        Read the generation once for all the keys used within the block.
+        """
+        self._local.generation = self.get_generation()
+
+        try:
+            yield
+        finally:
+            self._local.generation = None
+
+    def get(self, key):
+        return self.cache.get(self.make_key(key))
+
+    def set(self, key, value, timeout):
+        self.cache.set(self.make_key(key), value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+    def clear(self):
+        self.cache.set(self.generation_key, uuid.uuid4().hex, None)
+
+
+@lru_cache(maxsize=None)
+def get_token_cache():
+    """
+    Return the token cache configured by ``JWT_TOKEN_CACHE``, or ``None`` when
+    caching is disabled.
+    """
+    config = settings.JWT_TOKEN_CACHE
+
+    if not config.get("BACKEND"):
+        return None
+
+    backend = import_string(config["BACKEND"])
+    options = {key.lower(): value for key, value in config.get("OPTIONS", {}).items()}
+
+    return backend(**options)
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    if setting == "JWT_TOKEN_CACHE":
+        get_token_cache.cache_clear()
+
+
+def get_token_key(token):
+    return "token:{}".format(hashlib.sha256(force_bytes(token)).hexdigest())
+
+
+def get_version_key(pk):
+    return "version:{}".format(pk)
+
+
+def get_cached_user(token):
+    """
+    Rebuild the user a token was verified for, without hitting the database.
+    Entries are dropped as soon as the user's version has been bumped.
+    """
+    token_cache = get_token_cache()
+
+    if token_cache is None:
+        return None
+
+    with token_cache.lookup():
+        entry = token_cache.get(get_token_key(token))
+
+        if entry is None:
+            return None
+
+        pk, version, db, field_names, values = entry
+
+        if version != token_cache.get(get_version_key(pk)):
+            return None
+
+    return get_user_model().from_db(db, field_names, values)
+
+
+def cache_user(token, user, payload):
+    """
+    Store a snapshot of the user for a verified token. The entry never outlives
+    the token's ``exp`` claim.
+    """
+    token_cache = get_token_cache()
+
+    if token_cache is None:
+        return
+
+    timeout = settings.JWT_TOKEN_CACHE["TIMEOUT"]
+
+    if "exp" in payload:
+        timeout = min(timeout, payload["exp"] - time.time())
+
+    if timeout <= 0:
+        return
+
+    version_key = get_version_key(user.pk)
+    field_names = [field.attname for field in user._meta.concrete_fields]
+    values = [getattr(user, field_name) for field_name in field_names]
+
+    with token_cache.lookup():
+        version = token_cache.get(version_key)
+
+        if version is None:
+            version = uuid.uuid4().hex
+            token_cache.set(version_key, version, settings.JWT_TOKEN_CACHE["TIMEOUT"])
+
+        token_cache.set(
+            get_token_key(token),
+            (user.pk, version, user._state.db, field_names, values),
+            timeout,
+        )
+
+
+def get_token_version_key(pk):
+    return "jwt-version:{}".format(pk)
+
+
+def get_token_version(pk):
+    """
+    Return the token version of a user, or ``None`` for an unknown user. The
+    version is cached in ``JWT_CLAIMS_USER["CACHE_ALIAS"]``, which must be
+    shared by all workers for revocations to reach them.
+    """
+    config = settings.JWT_CLAIMS_USER
+    cache = caches[config["CACHE_ALIAS"]]
+    version = cache.get(get_token_version_key(pk))
+
+    if version is None:
+        version = (
+            get_user_model()
+            .objects.filter(pk=pk)
+            .values_list("token_version", flat=True)
+            .first()
+        )
+
+        if version is not None:
+            cache.set(get_token_version_key(pk), version, config["TIMEOUT"])
+
+    return version
+
+
+def get_claims_user(payload):
+    """
+    Build the user of a token from its claims, or return ``None`` when the
+    token has been revoked. Other fields are deferred, and loaded with a single
+    query when one of them is accessed.
+    """
+    User = get_user_model()
+
+    try:
+        pk = User._meta.pk.to_python(payload["user_id"])
+        claims = {
+            "id": pk,
+            "email": payload["email"],
+            "is_active": payload["is_active"],
+            "is_staff": payload["is_staff"],
+            "token_version": payload["ver"],
+        }
+    except (KeyError, ValidationError):
+        return None
+
+    if get_token_version(pk) != claims["token_version"]:
+        return None
+
+    fields = [
+        field.attname for field in User._meta.concrete_fields if field.attname in claims
+    ]
+
+    return User.from_db(
+        router.db_for_read(User), fields, [claims[field] for field in fields]
+    )
+
+
+def invalidate_cached_tokens(sender, instance, **kwargs):
+    """
+    Receiver of ``post_save`` and ``post_delete``, invalidating every cached
+    token of the user, so no snapshot predates a change to any of its fields.
+    """
+    token_cache = get_token_cache()
+
+    if token_cache is None:
+        return
+
+    version_key = get_version_key(instance.pk)
+
+    # Delete it again once the change is committed, in case the previous row
+    # was read and cached by another request in between.
+    token_cache.delete(version_key)
+    transaction.on_commit(lambda: token_cache.delete(version_key))
+
+
+def invalidate_user(user):
+    """
+    Invalidate the cached version that tokens with claims are checked against.
+    """
+    version_key = get_token_version_key(user.pk)
+    cache = caches[settings.JWT_CLAIMS_USER["CACHE_ALIAS"]]
+
+    # Forget the version again once the change is committed, in case it was
+    # read from the database and cached by another request in between.
+    cache.delete(version_key)
+    transaction.on_commit(lambda: cache.delete(version_key))
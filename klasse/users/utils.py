@@ -11,6 +11,7 @@ from django.core import signing
 from django.core.exceptions import PermissionDenied
 
 from klasse.users.emails import ActivationEmail, PasswordResetEmail, WelcomeEmail
+from klasse.users.keys import get_key_set
 
 password_reset_token_generator = PasswordResetTokenGenerator()
 
@@ -28,17 +29,52 @@ def login_required(func):
     return decorator
 
 
+def staff_required(func):
+    @wraps(func)
+    def decorator(cls, info, *args, **kwargs):
+        if not info.context.user.is_staff:
+            raise PermissionDenied("Not allowed")
+
+        return func(cls, info, *args, **kwargs)
+
+    return decorator
+
+
 def jwt_encode_handler(payload):
-    return jwt.encode(payload, secret_key, algorithm="HS256").decode("utf-8")
+    key = get_key_set().signing_key
+
+    if key is None:
+        return jwt.encode(payload, secret_key, algorithm="HS256").decode("utf-8")
+
+    return jwt.encode(
+        payload, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid}
+    ).decode("utf-8")
 
 
 def jwt_decode_handler(token):
-    return jwt.decode(token, secret_key, algorithm="HS256")
+    kid = jwt.get_unverified_header(token).get("kid")
+
+    if kid is None:
+        if not settings.JWT_KEYS["ACCEPT_HS256"]:
+            raise jwt.InvalidTokenError("Token has no key id")
+
+        return jwt.decode(token, secret_key, algorithms=["HS256"])
+
+    key = get_key_set().get(kid)
+
+    if key is None:
+        raise jwt.InvalidTokenError("Unknown key id")
+
+    return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
 
 
 def jwt_payload_handler(user):
     return {
+        "user_id": str(user.pk),
         "email": user.email,
+        "is_active": user.is_active,
+        "is_staff": user.is_staff,
+        "ver": user.token_version,
         "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=30),
         "orig_iat": timegm(datetime.datetime.utcnow().utctimetuple()),
     }
@@ -62,26 +98,28 @@ def parse_name(name):
     )
 
 
-def send_activation_email(user):
+def send_activation_email(user, connection=None):
     activation_email = ActivationEmail(
-        context={"user": user, "activation_token": generate_activation_token(user)}
+        context={"user": user, "activation_token": generate_activation_token(user)},
+        connection=connection,
     )
 
     activation_email.send(to=[user.email])
 
 
-def send_welcome_email(user):
-    welcome_email = WelcomeEmail(context={"user": user})
+def send_welcome_email(user, connection=None):
+    welcome_email = WelcomeEmail(context={"user": user}, connection=connection)
 
     welcome_email.send(to=[user.email])
 
 
-def send_password_reset_email(user):
+def send_password_reset_email(user, connection=None):
     password_reset_email = PasswordResetEmail(
         context={
             "user": user,
             "password_reset_token": generate_password_reset_token(user),
-        }
+        },
+        connection=connection,
     )
 
     password_reset_email.send(to=[user.email])
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import (
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+from .exports import CONTENT_TYPES, Export
+from .keys import get_key_set
+
+
+@require_GET
+def export_users(request):
+    """
+    Stream all users as NDJSON, or as CSV with ``?format=csv``. Staff only.
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+
+    format = request.GET.get("format", "ndjson")
+
+    if format not in CONTENT_TYPES:
+        return HttpResponseBadRequest("Unknown format.")
+
+    response = StreamingHttpResponse(
+        Export(get_user_model().objects.all(), format),
+        content_type=CONTENT_TYPES[format],
+    )
+    response["Content-Disposition"] = 'attachment; filename="users.{}"'.format(format)
+
+    return response
+
+
+@require_GET
+def jwks(request):
+    """
+    Serve the public keys tokens are verified with as a JSON Web Key Set.
+    """
+    response = JsonResponse(get_key_set().get_jwks())
+    patch_cache_control(
+        response, public=True, max_age=settings.JWT_KEYS["JWKS_MAX_AGE"]
+    )
+
+    return response